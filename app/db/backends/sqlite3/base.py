@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from app.db.pool import ManagedConnectionMixin
+
+
+class DatabaseWrapper(ManagedConnectionMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,185 @@
+import os
+import threading
+from collections import deque
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    In-process pool of idle DB-API connections of a database alias, shared by the threads of a
+    worker. Connections are only kept while they're outside of a transaction.
+    """
+
+    def __init__(self, alias, max_size):
+        self.alias = alias
+        self.max_size = max_size
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.returned = 0
+
+    def get(self, connect, is_usable=None):
+        """
+        The function checks out an idle connection, the ones failing the health check are
+        discarded. A new connection is opened when the pool is empty.
+
+        :param connect: A callable opening a new DB-API connection
+        :param is_usable: An optional callable checking an idle connection still works
+        :return: a DB-API connection.
+        """
+        while True:
+            with self._lock:
+                raw = self._idle.pop() if self._idle else None
+            if raw is None:
+                break
+            if is_usable is None or is_usable(raw):
+                self.reused += 1
+                return raw
+            self.discard(raw)
+        connection = connect()
+        self.created += 1
+        return connection
+
+    def put(self, raw):
+        """
+        The function returns a connection to the pool, it's closed when the pool is full.
+
+        :param raw: The DB-API connection
+        """
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(raw)
+                self.returned += 1
+                return
+        self.discard(raw)
+
+    def discard(self, raw):
+        self.discarded += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw in idle:
+            self.discard(raw)
+
+    def to_dict(self):
+        return {
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "created": self.created,
+            "reused": self.reused,
+            "returned": self.returned,
+            "discarded": self.discarded,
+        }
+
+
+def get_pool(alias, max_size):
+    """
+    The function returns the pool of a database alias in the current process, forked workers
+    never share the connections of their parent.
+
+    :param alias: The database alias
+    :param max_size: The maximum amount of idle connections the pool keeps
+    :return: a `ConnectionPool` instance.
+    """
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(alias, max_size)
+    return pool
+
+
+def pool_stats():
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for (owner, _), pool in _pools.items() if owner == pid]
+    return {pool.alias: pool.to_dict() for pool in pools}
+
+
+class ManagedConnectionMixin:
+    """
+    Connection management added to the django database backends (`app.db.backends.*`), configured
+    on the `DATABASES` entries:
+
+    * `HEALTH_CHECKS`: a persistent connection is checked (and reopened if broken) before its first
+      use on every request, like django 4.1 `CONN_HEALTH_CHECKS`
+    * `POOL_SIZE`: closed connections are returned to an in-process pool of the alias instead of
+      being closed, the next connection of any thread of the worker reuses them
+    """
+
+    health_check_done = False
+
+    @property
+    def pool_size(self):
+        return self.settings_dict.get("POOL_SIZE") or 0
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get("HEALTH_CHECKS", False)
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_size:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(self.alias, self.pool_size)
+        return pool.get(
+            lambda: super(ManagedConnectionMixin, self).get_new_connection(conn_params),
+            self.raw_connection_usable if self.health_checks else None,
+        )
+
+    def connect(self):
+        super().connect()
+        # A new or checked out connection doesn't need another check on this request
+        self.health_check_done = True
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_checks
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+    def _cursor(self, name=None):
+        # Checked before the first query of every request, like django 4.1 does
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and the end of every request
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def _close(self):
+        reusable = (
+            self.pool_size
+            and self.connection is not None
+            and not self.in_atomic_block
+            and not self.errors_occurred
+            and self.autocommit
+        )
+        if not reusable:
+            return super()._close()
+        get_pool(self.alias, self.pool_size).put(self.connection)
+
+    @staticmethod
+    def raw_connection_usable(raw):
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            return False
+        return True
@@ -0,0 +1,78 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Cookie pinning the reads of a client to the primary for a while after it writes
+PRIMARY_PIN_COOKIE = "db_primary_pin"
+
+PRIMARY = "default"
+
+# Whether the reads of the current request can be served by a replica
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    The function allows (or forbids) the reads run inside the block to go to the replicas.
+
+    :param enabled: False to force the reads of the block to the primary
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def can_read_replica(request):
+    """
+    The function decides if the reads of a request can be served by a replica, only the GET
+    requests of clients that didn't write in the last `DATABASE_REPLICA_STICKY_SECONDS` can.
+
+    :param request: The HTTP request
+    :return: a boolean.
+    """
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and request.method in ("GET", "HEAD")
+        and PRIMARY_PIN_COOKIE not in request.COOKIES
+    )
+
+
+def pin_to_primary(response):
+    """
+    The function gives read-your-writes consistency to the client of a successful write, its
+    reads go to the primary until the replicas had time to catch up.
+
+    :param response: The HTTP response of the write
+    """
+    if settings.DATABASE_REPLICAS and settings.DATABASE_REPLICA_STICKY_SECONDS:
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            "1",
+            max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+
+
+class ReplicaRouter:
+    """
+    Sends the reads allowed by `replica_reads` to one of the `DATABASE_REPLICAS` aliases, every
+    other query goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _replica_reads.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary
+        return True
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket has no upper bound
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Timings of the request being served, the executor threads of the async views share it because
+# they run with a copy of the request context
+current_request = ContextVar("current_request", default=None)
+
+
+class RequestTimings:
+    """
+    Measurements of a single request, the DB ones are accumulated by `track_query`.
+    """
+
+    __slots__ = ("started", "db_seconds", "queries")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+def track_query(execute, sql, params, many, context):
+    """
+    The function is a `connection.execute_wrapper` adding the time of every statement to the
+    timings of the current request, statements run outside of a request are left alone.
+    """
+    timings = current_request.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_seconds += time.perf_counter() - started
+        timings.queries += 1
+
+
+@contextmanager
+def measuring(timings):
+    token = current_request.set(timings)
+    try:
+        yield timings
+    finally:
+        current_request.reset(token)
+
+
+def iterate_within(iterable, context):
+    """
+    The function iterates over the body of a streaming response entering `context()` while every
+    chunk is produced, so the statements run after the view returned (e.g. a server-side cursor
+    read while the response is sent) are still attributed to the request.
+
+    :param iterable: The streamed content
+    :param context: A callable returning the context manager to enter
+    :return: a generator with the chunks of the iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        # The context isn't held across a `yield`, the chunks can be sent from another context
+        with context():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class ViewMetrics:
+    """
+    Aggregated measurements of the requests served by a view, the latencies are kept as a fixed
+    size histogram so the memory doesn't grow with the traffic.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.wall_seconds = 0.0
+        self.max_wall_seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.response_bytes = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, wall, db, queries, rows, response_bytes, status):
+        self.requests += 1
+        self.errors += status >= 500
+        self.wall_seconds += wall
+        self.max_wall_seconds = max(self.max_wall_seconds, wall)
+        self.db_seconds += db
+        self.queries += queries
+        self.rows += rows or 0
+        self.response_bytes += response_bytes or 0
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, wall * 1000)] += 1
+
+    def percentile(self, fraction):
+        """
+        The function estimates a latency percentile as the upper bound of the histogram bucket
+        holding it.
+
+        :param fraction: The percentile as a fraction, e.g. 0.99
+        :return: the latency in milliseconds, the maximum one for the unbounded bucket.
+        """
+        target = fraction * self.requests
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return LATENCY_BUCKETS_MS[index]
+                break
+        return round(self.max_wall_seconds * 1000, 2)
+
+    def to_dict(self):
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_ms": round(self.wall_seconds / requests * 1000, 2),
+            "max_ms": round(self.max_wall_seconds * 1000, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "avg_db_ms": round(self.db_seconds / requests * 1000, 2),
+            "avg_queries": round(self.queries / requests, 2),
+            "rows": self.rows,
+            "response_bytes": self.response_bytes,
+            "histogram": {
+                **{
+                    f"le_{bound}ms": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram)
+                },
+                "inf": self.histogram[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process metrics of every view, aggregated per worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, wall, db, queries, rows, response_bytes, status):
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.add(wall, db, queries, rows, response_bytes, status)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def to_dict(self):
+        with self._lock:
+            return {view: metrics.to_dict() for view, metrics in self._views.items()}
+
+
+registry = MetricsRegistry()
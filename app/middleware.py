@@ -1,4 +1,22 @@
+import asyncio
+import time
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from app.metrics import (
+    RequestTimings,
+    current_request,
+    iterate_within,
+    measuring,
+    registry,
+    track_query,
+)
 
 
 def is_registered(exception):
@@ -8,14 +26,8 @@ def is_registered(exception):
         return False
 
 
-class RequestExceptionHandler:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        response = self.get_response(request)
-        return response
-
+# MiddlewareMixin makes the handler usable by both the WSGI and the ASGI (async) request paths
+class RequestExceptionHandler(MiddlewareMixin):
     def process_exception(self, request, exception):
         if is_registered(exception):
             status = exception.status_code
@@ -28,3 +40,109 @@ class RequestExceptionHandler:
             exception_dict["success"] = False
 
         return JsonResponse(exception_dict, status=status)
+
+
+class RequestTimingMiddleware:
+    """
+    Measures the wall time, DB time, query count, rows serialized and response bytes of every
+    request, they're aggregated per view class in `app.metrics.registry` and sent back on a
+    `Server-Timing` header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(
+            install_query_tracker, dispatch_uid="request_timing_query_tracker"
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        # The connections opened before the middleware was loaded don't have the tracker yet
+        for connection in connections.all():
+            install_query_tracker(connection=connection)
+        timings = RequestTimings()
+        token = current_request.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_request.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        if response.streaming:
+            # The body is produced (and its rows read) while it's sent, the request is recorded once
+            # it's sent and the headers are already gone by then
+            response.streaming_content = self.measure_stream(
+                request, response, timings, response.streaming_content
+            )
+            return response
+        wall = self.add_metrics(request, response, timings, len(response.content))
+        if settings.SERVER_TIMING_HEADER:
+            db_ms, wall_ms = timings.db_seconds * 1000, wall * 1000
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.2f};desc="{timings.queries} queries", '
+                f"app;dur={wall_ms - db_ms:.2f}, total;dur={wall_ms:.2f}"
+            )
+        return response
+
+    def measure_stream(self, request, response, timings, content):
+        sent = 0
+        try:
+            for chunk in iterate_within(content, lambda: measuring(timings)):
+                sent += len(chunk)
+                yield chunk
+        finally:
+            self.add_metrics(request, response, timings, sent)
+
+    @staticmethod
+    def add_metrics(request, response, timings, response_bytes):
+        wall = time.perf_counter() - timings.started
+        registry.record(
+            view_name(request),
+            wall,
+            timings.db_seconds,
+            timings.queries,
+            getattr(response, "rows", None),
+            response_bytes,
+            response.status_code,
+        )
+        return wall
+
+
+def install_query_tracker(sender=None, connection=None, **kwargs):
+    # The wrapper objects survive reconnections, add the tracker only once. It goes first so the
+    # `execute_wrapper()` blocks active while the connection opens still pop their own wrapper
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_query)
+
+
+def view_name(request):
+    """
+    The function returns the name the metrics of a request are aggregated under, the class of
+    class-based views and the function name of the others.
+
+    :param request: The HTTP request
+    :return: a string with the view name, `unresolved` when no URL matched.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    view = getattr(match.func, "view_class", match.func)
+    return view.__name__
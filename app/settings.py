@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.middleware.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -109,17 +110,177 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# The `app.db.backends` engines add connection health checks and an optional in-process pool
+# (`app.db.pool`) to the django ones:
+# * RDS_CONN_MAX_AGE: seconds a connection is kept between requests, 0 closes it after every one
+# * RDS_CONN_HEALTH_CHECKS: check a kept connection works before its first query of every request
+# * RDS_POOL_SIZE: idle connections each worker keeps to reuse once closed, 0 disables the pool
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "app.db.backends.postgresql",
         "NAME": os.environ.get("RDS_DB_NAME"),
         "USER": os.environ.get("RDS_USERNAME"),
         "PASSWORD": os.environ.get("RDS_PASSWORD"),
         "HOST": os.environ.get("RDS_HOSTNAME", "postgres-db"),
         "PORT": os.environ.get("RDS_PORT", 5432),
+        "CONN_MAX_AGE": int(os.environ.get("RDS_CONN_MAX_AGE", 60)),
+        "HEALTH_CHECKS": (
+            os.environ.get("RDS_CONN_HEALTH_CHECKS", "true").lower() == "true"
+        ),
+        "POOL_SIZE": int(os.environ.get("RDS_POOL_SIZE", 0)),
+        "OPTIONS": {"connect_timeout": int(os.environ.get("RDS_CONNECT_TIMEOUT", 5))},
     }
 }
 
+# Read traffic gets its own alias (and pool) when RDS_READ_HOSTNAME (e.g. a read replica) or
+# RDS_READ_POOL_SIZE is set
+if os.environ.get("RDS_READ_HOSTNAME") or os.environ.get("RDS_READ_POOL_SIZE"):
+    DATABASES["read"] = {
+        **DATABASES["default"],
+        "HOST": os.environ.get("RDS_READ_HOSTNAME", DATABASES["default"]["HOST"]),
+        "PORT": os.environ.get("RDS_READ_PORT", DATABASES["default"]["PORT"]),
+        "POOL_SIZE": int(
+            os.environ.get("RDS_READ_POOL_SIZE", DATABASES["default"]["POOL_SIZE"])
+        ),
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Aliases serving the reads of the GET requests, the clients that write are pinned to the primary
+# for DATABASE_REPLICA_STICKY_SECONDS so they read their own writes
+DATABASE_ROUTERS = ["app.db.router.ReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 5)
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# The model versions behind the ETags and the cache invalidation live in this cache, `locmem` is
+# per process so every worker of a multi-process deployment needs the shared `file` (one host) or
+# `database` (run `manage.py createcachetable`) backend
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "database": "django.core.cache.backends.db.DatabaseCache",
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[os.environ.get("CACHE_BACKEND", "locmem")],
+        "LOCATION": os.environ.get("CACHE_LOCATION", "sprocket-api"),
+    }
+}
+
+# Seconds the serialized body of a single factory/sprocket is cached, writes invalidate it
+DETAIL_CACHE_TIMEOUT = int(os.environ.get("DETAIL_CACHE_TIMEOUT", 300))
+
+# Seconds an exact count of a paginated list is reused, writes invalidate it before that
+COUNT_CACHE_TIMEOUT = int(os.environ.get("COUNT_CACHE_TIMEOUT", 60))
+
+
+# JSON encoder used to render the API responses: auto (orjson when installed), orjson or json
+JSON_ENCODER_BACKEND = os.environ.get("JSON_ENCODER_BACKEND", "auto")
+
+
+# Amount of production rows written per statement by the bulk loader
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 5000))
+
+
+# Maximum amount of production events an ingest request can carry
+INGEST_MAX_EVENTS = int(os.environ.get("INGEST_MAX_EVENTS", 10000))
+
+
+# Queue the ingested rows on an in-process buffer written by a background thread, instead of
+# writing them within the request
+INGEST_WRITE_BEHIND = os.environ.get("INGEST_WRITE_BEHIND", "false").lower() == "true"
+
+# Rows the write-behind buffer holds before answering 429, rows written per flush and maximum
+# seconds a row waits to be written
+INGEST_BUFFER_MAX_SIZE = int(os.environ.get("INGEST_BUFFER_MAX_SIZE", 100000))
+INGEST_BUFFER_FLUSH_SIZE = int(os.environ.get("INGEST_BUFFER_FLUSH_SIZE", 5000))
+INGEST_BUFFER_FLUSH_INTERVAL = float(
+    os.environ.get("INGEST_BUFFER_FLUSH_INTERVAL", 1.0)
+)
+
+# Failed flushes are retried after 0.5s, 1s, 2s... (`INGEST_BUFFER_RETRY_BACKOFF` doubled on every
+# retry), after `INGEST_BUFFER_MAX_RETRIES` the rows are written one by one and the failing ones
+# are dead-lettered
+INGEST_BUFFER_MAX_RETRIES = int(os.environ.get("INGEST_BUFFER_MAX_RETRIES", 5))
+INGEST_BUFFER_RETRY_BACKOFF = float(os.environ.get("INGEST_BUFFER_RETRY_BACKOFF", 0.5))
+
+
+# Amount of rows fetched per round trip by the streaming exports
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+
+# Refresh the production rollups on every write, when disabled the touched buckets are marked as
+# dirty and refreshed by `manage.py refresh_rollups`
+ROLLUP_REFRESH_ON_WRITE = (
+    os.environ.get("ROLLUP_REFRESH_ON_WRITE", "true").lower() == "true"
+)
+
+# Answer the aggregations from the rollup tables whenever they can
+ROLLUP_ROUTING_ENABLED = (
+    os.environ.get("ROLLUP_ROUTING_ENABLED", "true").lower() == "true"
+)
+
+# Keep a columnar copy of the production (a chunk of packed arrays per factory, sprocket and day)
+# in sync with the rollups, the chart and aggregation endpoints read it instead of the rows
+COLUMNAR_STORAGE_ENABLED = (
+    os.environ.get("COLUMNAR_STORAGE_ENABLED", "false").lower() == "true"
+)
+
+
+# Monthly partitions of the production table created ahead of time by
+# `manage.py manage_production_partitions` (PostgreSQL only), and months kept attached when it's
+# given a retention
+PRODUCTION_PARTITION_MONTHS_AHEAD = int(
+    os.environ.get("PRODUCTION_PARTITION_MONTHS_AHEAD", 3)
+)
+PRODUCTION_PARTITION_RETENTION_MONTHS = int(
+    os.environ.get("PRODUCTION_PARTITION_RETENTION_MONTHS", 0)
+)
+
+
+# Production rows embedded by `GET /api/factory/<id>?include=recent_production`
+FACTORY_RECENT_PRODUCTION_SIZE = int(
+    os.environ.get("FACTORY_RECENT_PRODUCTION_SIZE", 10)
+)
+
+
+# Maximum amount of records a batch create/update request can carry
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 1000))
+
+
+# Serve the API with the native async views under ASGI (`app.asgi`), experimental: WSGI stays the
+# recommended deployment since the async stack isn't faster on Django 3.2 (see the README)
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "false").lower() == "true"
+
+# Threads running the database work of the async views, it bounds the concurrent queries
+ASYNC_DB_WORKERS = int(os.environ.get("ASYNC_DB_WORKERS", 8))
+
+
+# Aggregate the timings of every request per view (`GET /api/metrics/`), and send them back on a
+# `Server-Timing` header
+REQUEST_METRICS_ENABLED = (
+    os.environ.get("REQUEST_METRICS_ENABLED", "true").lower() == "true"
+)
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", "true").lower() == "true"
+
+
+# Debug/CI mode recording the statements of every API request, the slow ones and the shapes
+# repeated `QUERY_INSPECTOR_REPEATED_THRESHOLD` times (N+1) are logged and reported per endpoint
+# by `GET /api/metrics/`
+QUERY_INSPECTOR_ENABLED = (
+    os.environ.get("QUERY_INSPECTOR_ENABLED", "false").lower() == "true"
+)
+QUERY_INSPECTOR_SLOW_MS = float(os.environ.get("QUERY_INSPECTOR_SLOW_MS", 100))
+QUERY_INSPECTOR_REPEATED_THRESHOLD = int(
+    os.environ.get("QUERY_INSPECTOR_REPEATED_THRESHOLD", 5)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
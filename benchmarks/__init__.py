@@ -0,0 +1,32 @@
+import os
+
+
+def setup_django():
+    """
+    The function configures django for the benchmark scripts the same way `manage.py` does.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    import django
+
+    django.setup()
+
+
+def use_sqlite(path):
+    """
+    The function points the default database to a SQLite file, for running the benchmarks without
+    the PostgreSQL service.
+
+    :param path: The path of the SQLite database file
+    """
+    from django.conf import settings
+    from django.db import connections
+
+    settings.DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+    }
+    # Drop the connection settings (and the unused connection) read while setting django up
+    connections.__dict__.pop("settings", None)
+    connections._settings = None
+    if hasattr(connections._connections, "default"):
+        del connections["default"]
@@ -0,0 +1,180 @@
+"""
+In-process load test of the API under WSGI and ASGI.
+
+Fires `--requests` GET requests with `--concurrency` requests in flight against three stacks:
+
+* wsgi: the WSGI handler with one thread per concurrent request (like threaded gunicorn workers)
+* asgi[sync]: the ASGI handler with the sync views (every request hops to django's sync thread)
+* asgi[async]: the ASGI handler with the native async views (`ASYNC_VIEWS=true`)
+
+and reports requests/sec together with the p50/p99 latency. `--db-latency-ms` adds a delay to
+every query to simulate the network round trip to a remote database, `--sqlite` runs against a
+temporary SQLite database loaded with the fixtures instead of the configured one.
+
+    python -m benchmarks.async_load --sqlite --requests 2000 --concurrency 64 --db-latency-ms 5
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks import setup_django, use_sqlite
+
+
+def add_db_latency(milliseconds):
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def on_connection_created(sender, connection, **kwargs):
+        # The wrapper objects survive reconnections, add the delay only once
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(on_connection_created, weak=False)
+
+
+def reload_urls(async_views):
+    from django.conf import settings
+    from django.urls import clear_url_caches
+
+    import app.urls
+    import sprocket.urls
+
+    settings.ASYNC_VIEWS = async_views
+    importlib.reload(sprocket.urls)
+    importlib.reload(app.urls)
+    clear_url_caches()
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def run_wsgi(url, total, concurrency):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test.client import RequestFactory
+
+    handler = WSGIHandler()
+    parts = urlsplit(url)
+
+    def request():
+        environ = RequestFactory()._base_environ(
+            PATH_INFO=parts.path, QUERY_STRING=parts.query, REQUEST_METHOD="GET"
+        )
+        started = time.perf_counter()
+        response = handler(environ, lambda status, headers: None)
+        b"".join(response)
+        response.close()
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        latencies = list(pool.map(lambda _: request(), range(total)))
+        return summarize(latencies, time.perf_counter() - started)
+
+
+async def asgi_request(application, parts):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    assert status == [200], status
+    return time.perf_counter() - started
+
+
+def run_asgi(url, total, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    application = ASGIHandler()
+    parts = urlsplit(url)
+
+    async def load():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                return await asgi_request(application, parts)
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(request() for _ in range(total)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    return asyncio.run(load())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="/api/factory/sprockets?size=10")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.management import call_command
+
+    # DEBUG keeps every query in memory
+    settings.DEBUG = False
+    if args.sqlite:
+        use_sqlite(os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"))
+        call_command("migrate", verbosity=0)
+        call_command("build_factory_data", verbosity=0)
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms)
+
+    results = {}
+    reload_urls(async_views=False)
+    results["wsgi"] = run_wsgi(args.url, args.requests, args.concurrency)
+    results["asgi[sync]"] = run_asgi(args.url, args.requests, args.concurrency)
+    reload_urls(async_views=True)
+    results["asgi[async]"] = run_asgi(args.url, args.requests, args.concurrency)
+
+    for name, result in results.items():
+        print(
+            f"{name:<12} {result['rps']:>9} req/s "
+            f"p50 {result['p50_ms']:>8} ms p99 {result['p99_ms']:>8} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Storage and read benchmark of the columnar production chunks against the production rows.
+
+Loads a synthetic dataset (see `benchmarks.datagen`) with `COLUMNAR_STORAGE_ENABLED`, prints the
+size of the production table and of the chunks table, then times `--requests` chart
+(`GET /api/factory/<id>/chart`) and minute aggregation requests served from each of them.
+
+    python -m benchmarks.columnar --sqlite --factories 5 --sprockets 4 --points 5000
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.datagen import add_dataset_arguments, generate, prepare_database
+
+
+def table_bytes(connection, table):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s::regclass)", [table])
+        else:
+            # Every page of the table and its indexes, `dbstat` is built in the usual SQLite builds
+            cursor.execute(
+                "SELECT SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m "
+                "ON m.name = s.name WHERE m.tbl_name = %s",
+                [table],
+            )
+        return cursor.fetchone()[0]
+
+
+def time_requests(client, url, params, total):
+    latencies = []
+    for _ in range(total):
+        started = time.perf_counter()
+        response = client.get(url, params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.content
+    return statistics.median(latencies), response.json()["source"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_dataset_arguments(parser)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    prepare_database(args)
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+
+    from sprocket.models import Factory, ProductionChunk, SprocketProduction
+
+    settings.COLUMNAR_STORAGE_ENABLED = True
+    settings.ROLLUP_ROUTING_ENABLED = False
+    if args.sqlite:
+        print(generate(args.factories, args.sprockets, args.points, args.seed))
+    for model in (SprocketProduction, ProductionChunk):
+        print(
+            f"{model._meta.db_table:<30} {model.objects.count():>9} rows "
+            f"{table_bytes(connection, model._meta.db_table) / 1024:>10.0f} KiB"
+        )
+
+    client = Client()
+    requests = {
+        "chart": (f"/api/factory/{Factory.objects.first().id}/chart", {}),
+        "aggregate": ("/api/factory/sprockets/aggregate", {"bucket": "minute"}),
+    }
+    for name, (url, params) in requests.items():
+        for enabled in (False, True):
+            settings.COLUMNAR_STORAGE_ENABLED = enabled
+            p50, source = time_requests(client, url, params, args.requests)
+            print(f"{name:<10} {source:<11} p50 {p50:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
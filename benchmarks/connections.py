@@ -0,0 +1,93 @@
+"""
+Load test of the connection management modes on `GET /api/sprocket/<id>`.
+
+Fires `--requests` requests with `--concurrency` threads through the WSGI handler for every mode:
+
+* per_request: `CONN_MAX_AGE=0`, a new connection per request (the previous default)
+* persistent: `CONN_MAX_AGE=60` with health checks, every thread keeps its connection
+* pooled: `CONN_MAX_AGE=0` with a `POOL_SIZE=--concurrency` pool shared by the threads
+
+The detail cache is disabled so every request reaches the database. `--sqlite` runs against a
+temporary SQLite database, `--connect-latency-ms` then adds a delay to every new connection to
+simulate the TCP/TLS/auth handshake of a remote PostgreSQL (against the configured database the
+real handshake is measured).
+
+    python -m benchmarks.connections --sqlite --connect-latency-ms 15 --concurrency 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import setup_django, use_sqlite
+from benchmarks.async_load import run_wsgi
+
+MODES = {
+    "per_request": {"CONN_MAX_AGE": 0, "HEALTH_CHECKS": False, "POOLED": False},
+    "persistent": {"CONN_MAX_AGE": 60, "HEALTH_CHECKS": True, "POOLED": False},
+    "pooled": {"CONN_MAX_AGE": 0, "HEALTH_CHECKS": True, "POOLED": True},
+}
+
+
+def add_connect_latency(milliseconds):
+    from django.db.backends.sqlite3 import base
+
+    get_new_connection = base.DatabaseWrapper.get_new_connection
+
+    def slow_get_new_connection(self, conn_params):
+        time.sleep(milliseconds / 1000)
+        return get_new_connection(self, conn_params)
+
+    # Patches the django backend below the managed one, pooled checkouts don't pay the delay
+    base.DatabaseWrapper.get_new_connection = slow_get_new_connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--connect-latency-ms", type=float, default=0)
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    from app.db.pool import pool_stats
+    from sprocket.models import Sprocket
+    from sprocket.views.sprocket_views import GetSprocket
+
+    # DEBUG keeps every query in memory
+    settings.DEBUG = False
+    if args.sqlite:
+        use_sqlite(os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"))
+        connections.settings["default"]["ENGINE"] = "app.db.backends.sqlite3"
+        call_command("migrate", verbosity=0)
+        call_command("build_factory_data", verbosity=0)
+        if args.connect_latency_ms:
+            add_connect_latency(args.connect_latency_ms)
+    GetSprocket.cache_detail = False
+    url = f"/api/sprocket/{Sprocket.objects.first().id}"
+    connections.close_all()
+
+    for mode, options in MODES.items():
+        # Every run has new threads, the connections of the previous mode are left behind
+        connections.settings["default"].update(
+            CONN_MAX_AGE=options["CONN_MAX_AGE"],
+            HEALTH_CHECKS=options["HEALTH_CHECKS"],
+            POOL_SIZE=args.concurrency if options["POOLED"] else 0,
+        )
+        result = run_wsgi(url, args.requests, args.concurrency)
+        print(
+            f"{mode:<12} {result['rps']:>9} req/s "
+            f"p50 {result['p50_ms']:>8} ms p99 {result['p99_ms']:>8} ms"
+        )
+    print(pool_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic data generator scaling the shape of `sprocket/fixtures/seed_factory_data.json`.
+
+Creates `--factories` factories and `--sprockets` sprockets, then `--points` production rows for
+every factory and sprocket pair (N x M x K rows). The values cycle through the seed production
+curves with a seeded jitter and the timestamps keep the seed time step, so two runs with the same
+arguments produce the same data. `--sqlite` loads a temporary SQLite database instead of the
+configured one.
+
+    python -m benchmarks.datagen --sqlite --factories 20 --sprockets 10 --points 500
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django, use_sqlite
+
+SEED_FACTORY_DATA = "sprocket/fixtures/seed_factory_data.json"
+SEED_SPROCKET_TYPES = "sprocket/fixtures/seed_sprocket_types.json"
+
+
+def load_seed():
+    """
+    The function reads the production curves and the sprocket types of the seed fixtures.
+
+    :return: a tuple with the concatenated actual values, the goal values, the first timestamp,
+    the time step in seconds and the list of sprocket types.
+    """
+    with open(SEED_FACTORY_DATA) as factory_file:
+        factories = json.load(factory_file)["factories"]
+    with open(SEED_SPROCKET_TYPES) as sprocket_file:
+        sprockets = json.load(sprocket_file)["sprockets"]
+    actual, goal = [], []
+    for factory in factories:
+        chart_data = factory["factory"]["chart_data"]
+        actual.extend(chart_data["sprocket_production_actual"])
+        goal.extend(chart_data["sprocket_production_goal"])
+    times = factories[0]["factory"]["chart_data"]["time"]
+    return actual, goal, int(times[0]), int(times[1]) - int(times[0]), sprockets
+
+
+def iter_production(factory_ids, sprocket_ids, points, seed=0):
+    """
+    The function streams the synthetic production rows, the time points are the outer loop so the
+    rows are inserted in `date_produced` order like a live feed would.
+
+    :param factory_ids: The ids of the factories
+    :param sprocket_ids: The ids of the sprockets
+    :param points: The amount of time points per factory and sprocket
+    :param seed: The seed of the jitter added to the seed curves
+    :return: a generator of unsaved `SprocketProduction` instances.
+    """
+    from sprocket.models import SprocketProduction
+
+    actual, goal, first_time, step, _ = load_seed()
+    rng = random.Random(seed)
+    start = datetime.fromtimestamp(first_time, timezone.utc)
+    for point in range(points):
+        date_produced = start + timedelta(seconds=step * point)
+        for factory_index, factory_id in enumerate(factory_ids):
+            for sprocket_index, sprocket_id in enumerate(sprocket_ids):
+                index = (point + factory_index * 7 + sprocket_index * 13) % len(actual)
+                yield SprocketProduction(
+                    factory_id=factory_id,
+                    sprocket_id=sprocket_id,
+                    sprocket_actual=max(0, actual[index] + rng.randint(-2, 2)),
+                    sprocket_goal=goal[index],
+                    date_produced=date_produced,
+                )
+
+
+def generate(factories, sprockets, points, seed=0, batch_size=None):
+    """
+    The function writes a synthetic dataset, the rollups are rebuilt once at the end instead of
+    being refreshed for every batch.
+
+    :param factories: The amount of factories (N)
+    :param sprockets: The amount of sprockets (M)
+    :param points: The amount of time points per factory and sprocket (K)
+    :param seed: The seed of the jitter added to the seed curves
+    :param batch_size: The amount of production rows written per statement
+    :return: a dictionary describing the dataset and the load throughput.
+    """
+    from sprocket.models import Factory, Sprocket
+    from sprocket.utils.ingest import bulk_ingest
+    from sprocket.utils.rollups import rebuild_all
+
+    *_, sprocket_types = load_seed()
+    sprocket_rows = [
+        Sprocket(**sprocket_types[index % len(sprocket_types)])
+        for index in range(sprockets)
+    ]
+    factory_rows = [
+        Factory(name=f"Factory {index + 1}", sprocket_goal=0, sprocket_actual=0)
+        for index in range(factories)
+    ]
+    # The ids are read back one by one on the databases that can't return them from a bulk insert
+    for row in [*sprocket_rows, *factory_rows]:
+        row.save()
+
+    stats = bulk_ingest(
+        iter_production(
+            [row.pk for row in factory_rows],
+            [row.pk for row in sprocket_rows],
+            points,
+            seed,
+        ),
+        batch_size=batch_size,
+        refresh_rollups=False,
+    )
+    rebuild_all()
+    return {
+        "factories": factories,
+        "sprockets": sprockets,
+        "points": points,
+        "seed": seed,
+        "rows": stats.rows,
+        "load_seconds": round(stats.seconds, 2),
+        "rows_per_second": round(stats.rows_per_second),
+        "method": stats.method,
+    }
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument("--factories", type=int, default=10)
+    parser.add_argument("--sprockets", type=int, default=5)
+    parser.add_argument("--points", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", action="store_true")
+
+
+def prepare_database(args):
+    """
+    The function sets django up and, with `--sqlite`, points it to a new temporary SQLite database
+    with the schema migrated.
+    """
+    setup_django()
+
+    from django.conf import settings
+    from django.core.management import call_command
+
+    # DEBUG keeps every query in memory
+    settings.DEBUG = False
+    if args.sqlite:
+        use_sqlite(os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"))
+        call_command("migrate", verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    prepare_database(args)
+    print(json.dumps(generate(args.factories, args.sprockets, args.points, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Throughput benchmark of the production ingest endpoint.
+
+Posts `--events` per-minute production events in batches of `--batch` events to
+`/api/factory/sprockets/ingest` (through the whole middleware stack, in-process) and reports the
+accepted events/sec. `--write-behind` queues the events on the write-behind buffer and reports
+its flush metrics, the time includes the final flush. `--sqlite` runs against a temporary SQLite database loaded with the fixtures
+instead of the configured one.
+
+    python -m benchmarks.ingest --sqlite --events 50000 --batch 1000 --format ndjson
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_django, use_sqlite
+
+
+def build_batches(factory_id, sprocket_id, total, batch, payload_format):
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    events = [
+        {
+            "factory_id": factory_id,
+            "sprocket_id": sprocket_id,
+            "sprocket_actual": 28 + index % 5,
+            "sprocket_goal": 32,
+            "date_produced": (start + timedelta(minutes=index)).isoformat(),
+        }
+        for index in range(total)
+    ]
+    for offset in range(0, total, batch):
+        chunk = events[offset : offset + batch]
+        if payload_format == "ndjson":
+            yield "\n".join(json.dumps(event) for event in chunk)
+        else:
+            yield json.dumps(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="ndjson")
+    parser.add_argument(
+        "--defer-rollups",
+        action="store_true",
+        help="mark the touched rollup buckets as dirty instead of refreshing them",
+    )
+    parser.add_argument("--write-behind", action="store_true")
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+
+    from sprocket.models import Factory, Sprocket
+    from sprocket.utils.write_behind import get_production_buffer
+
+    # DEBUG keeps every query in memory
+    settings.DEBUG = False
+    settings.ROLLUP_REFRESH_ON_WRITE = not args.defer_rollups
+    settings.INGEST_WRITE_BEHIND = args.write_behind
+    if args.sqlite:
+        use_sqlite(os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"))
+        call_command("migrate", verbosity=0)
+        call_command("build_factory_data", verbosity=0)
+
+    factory, sprocket = Factory.objects.first(), Sprocket.objects.first()
+    content_type = (
+        "application/x-ndjson" if args.format == "ndjson" else "application/json"
+    )
+    batches = list(
+        build_batches(factory.id, sprocket.id, args.events, args.batch, args.format)
+    )
+
+    client = Client()
+    accepted = 0
+    started = time.perf_counter()
+    for body in batches:
+        response = client.post("/api/factory/sprockets/ingest", body, content_type)
+        assert response.status_code in (200, 202), response.content
+        accepted += response.json()["accepted"]
+    if args.write_behind:
+        get_production_buffer().close()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{accepted} events in {len(batches)} requests ({args.format}) "
+        f"{elapsed:.2f}s {accepted / elapsed:.0f} events/sec"
+    )
+    if args.write_behind:
+        print(get_production_buffer().to_dict())
+
+
+if __name__ == "__main__":
+    main()
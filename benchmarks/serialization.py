@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of the response rendering of a 1000 rows page.
+
+Compares the legacy path (`JsonResponse` + re-parsing the content to add `success`) against the
+single pass `EnvelopeResponse` with every available encoder backend.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 200
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.http import JsonResponse  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from sprocket.utils import serialization  # noqa: E402
+from sprocket.utils.serialization import EnvelopeResponse  # noqa: E402
+
+
+def build_page(rows):
+    """
+    The function builds a page shaped like the `GetSprocketProduction` one.
+    """
+    start = datetime(2021, 1, 21, tzinfo=timezone.utc)
+    data = [
+        {
+            "sprocket_id": index % 3 + 1,
+            "sprocket__teeth": 5,
+            "sprocket__pitch_diameter": 5.0,
+            "sprocket__outside_diameter": Decimal("6.25"),
+            "sprocket__pitch": 1,
+            "factory_id": index % 3 + 1,
+            "factory__name": f"Factory {index % 3 + 1}",
+            "sprocket_goal": 32,
+            "sprocket_actual": 29 + index % 4,
+            "date_produced": start + timedelta(minutes=index),
+        }
+        for index in range(rows)
+    ]
+    return {"data": data, "total_pages": 60, "page": 1, "size": rows}
+
+
+def legacy_render(payload):
+    response = JsonResponse(payload)
+    json_data = json.loads(response.content)
+    json_data["success"] = True
+    response.content = json.dumps(json_data)
+    return response
+
+
+def envelope_render(payload):
+    return EnvelopeResponse(payload)
+
+
+def measure(render, payload, repeat):
+    render(payload)
+    total_bytes = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        total_bytes += len(render(payload).content)
+    elapsed = time.perf_counter() - started
+    return {
+        "ms_per_page": round(elapsed / repeat * 1000, 3),
+        "mb_per_sec": round(total_bytes / elapsed / 1_000_000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = build_page(args.rows)
+    results = {"legacy": measure(legacy_render, payload, args.repeat)}
+    for backend in serialization.ENCODER_BACKENDS:
+        if backend == "orjson" and serialization.orjson is None:
+            continue
+        with override_settings(JSON_ENCODER_BACKEND=backend):
+            results[f"envelope[{backend}]"] = measure(
+                envelope_render, payload, args.repeat
+            )
+
+    for name, result in results.items():
+        print(
+            f"{name:<18} {result['ms_per_page']:>9} ms/page "
+            f"{result['mb_per_sec']:>9} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Scenario benchmarks of the API endpoints over a synthetic dataset.
+
+Loads a dataset with `benchmarks.datagen` (`--factories` x `--sprockets` x `--points` production
+rows), then runs every scenario `--iterations` times through the whole middleware stack
+(in-process, sequentially) after `--warmup` untimed requests. The throughput and the latency
+percentiles of every scenario are printed and written as JSON to `--output`. With `--baseline` the
+results are compared against a previous output, the scenarios whose p50 got slower than
+`--threshold` percent are reported as regressions (`--fail-on-regression` exits with 1).
+
+`--sqlite` runs against a temporary SQLite database, otherwise the configured database is used
+(e.g. a local PostgreSQL through the `RDS_*` variables) and `--skip-data` reuses its rows.
+
+    python -m benchmarks.suite --sqlite --points 500 --output baseline.json
+    python -m benchmarks.suite --sqlite --points 500 --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from itertools import cycle
+
+from benchmarks.datagen import add_dataset_arguments, generate, prepare_database
+
+PAGE_SIZE = 50
+
+
+class Scenario:
+    """
+    A named request repeated by the suite, `build` returns the method, path and data of the
+    request of an iteration.
+    """
+
+    def __init__(self, name, build, status=200):
+        self.name = name
+        self.build = build
+        self.status = status
+
+
+def build_context():
+    """
+    The function reads the ids and the pagination boundaries the scenarios request.
+
+    :return: a dictionary with the state shared by the scenarios.
+    """
+    from sprocket.models import Factory, Sprocket, SprocketProduction
+    from sprocket.utils.cursor_pagination import encode_cursor
+
+    rows = SprocketProduction.objects.filter(deleted=False)
+    total = rows.count()
+    # The deep pages sit at 90% of the production history
+    depth = max(0, int(total * 0.9) - 1)
+    boundary = rows.order_by("date_produced", "id")[depth] if total else None
+    return {
+        "factory_ids": cycle(Factory.objects.values_list("id", flat=True)),
+        "sprocket_ids": cycle(Sprocket.objects.values_list("id", flat=True)),
+        "deep_page": max(1, depth // PAGE_SIZE),
+        "deep_cursor": (
+            encode_cursor("date_produced", boundary.date_produced, boundary.id)
+            if boundary
+            else ""
+        ),
+        "counter": cycle(range(10**9)),
+    }
+
+
+def sprocket_payload(context):
+    teeth = 5 + next(context["counter"]) % 20
+    return {"teeth": teeth, "pitch_diameter": teeth, "outside_diameter": 6, "pitch": 1}
+
+
+def ingest_payload(context, events=100):
+    factory_id = next(context["factory_ids"])
+    sprocket_id = next(context["sprocket_ids"])
+    now = datetime.now(timezone.utc).isoformat()
+    return "\n".join(
+        json.dumps(
+            {
+                "factory_id": factory_id,
+                "sprocket_id": sprocket_id,
+                "sprocket_actual": 30,
+                "sprocket_goal": 32,
+                "date_produced": now,
+            }
+        )
+        for _ in range(events)
+    )
+
+
+SCENARIOS = [
+    Scenario(
+        "list_first_page",
+        lambda c: ("get", "/api/factory/sprockets", {"size": PAGE_SIZE}),
+    ),
+    Scenario(
+        "list_deep_offset",
+        lambda c: (
+            "get",
+            "/api/factory/sprockets",
+            {
+                "size": PAGE_SIZE,
+                "page": c["deep_page"],
+                "order": "date_produced",
+                "count": "none",
+            },
+        ),
+    ),
+    Scenario(
+        "list_deep_cursor",
+        lambda c: (
+            "get",
+            "/api/factory/sprockets",
+            {"size": PAGE_SIZE, "cursor": c["deep_cursor"], "order": "date_produced"},
+        ),
+    ),
+    Scenario(
+        "list_filtered",
+        lambda c: (
+            "get",
+            "/api/factory/sprockets",
+            {
+                "size": PAGE_SIZE,
+                "filter": f"factory_id:{next(c['factory_ids'])},sprocket_actual__gt:30",
+                "order": "-date_produced",
+            },
+        ),
+    ),
+    Scenario(
+        "list_sparse_fields",
+        lambda c: (
+            "get",
+            "/api/factory/sprockets",
+            {"size": 1000, "fields": "date_produced,sprocket_actual", "count": "none"},
+        ),
+    ),
+    Scenario(
+        "aggregate_daily",
+        lambda c: (
+            "get",
+            "/api/factory/sprockets/aggregate",
+            {"bucket": "day", "group_by": "factory_id"},
+        ),
+    ),
+    Scenario(
+        "factory_detail",
+        lambda c: ("get", f"/api/factory/{next(c['factory_ids'])}", {}),
+    ),
+    Scenario(
+        "factory_detail_include",
+        lambda c: (
+            "get",
+            f"/api/factory/{next(c['factory_ids'])}",
+            {"include": "sprockets,recent_production,summary"},
+        ),
+    ),
+    Scenario(
+        "sprocket_detail",
+        lambda c: ("get", f"/api/sprocket/{next(c['sprocket_ids'])}", {}),
+    ),
+    Scenario(
+        "sprocket_create",
+        lambda c: ("post", "/api/sprocket/create", sprocket_payload(c)),
+    ),
+    Scenario(
+        "sprocket_update",
+        lambda c: (
+            "put",
+            f"/api/sprocket/update/{next(c['sprocket_ids'])}",
+            sprocket_payload(c),
+        ),
+    ),
+    Scenario(
+        "sprocket_batch_create",
+        lambda c: (
+            "post",
+            "/api/sprocket/batch/create",
+            [sprocket_payload(c) for _ in range(50)],
+        ),
+    ),
+    Scenario(
+        "production_ingest",
+        lambda c: ("ingest", "/api/factory/sprockets/ingest", ingest_payload(c)),
+    ),
+]
+
+
+def send(client, method, path, data):
+    if method == "get":
+        return client.get(path, data)
+    if method == "ingest":
+        return client.post(path, data, "application/x-ndjson")
+    return getattr(client, method)(path, json.dumps(data), "application/json")
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def run_scenario(client, scenario, context, iterations, warmup):
+    """
+    The function runs the requests of a scenario and summarizes their latencies.
+
+    :return: a dictionary with the throughput (requests/sec) and the latencies in milliseconds.
+    """
+    for _ in range(warmup):
+        send(client, *scenario.build(context))
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request = scenario.build(context)
+        request_started = time.perf_counter()
+        response = send(client, *request)
+        latencies.append(time.perf_counter() - request_started)
+        assert response.status_code == scenario.status, (
+            scenario.name,
+            response.status_code,
+            response.content[:200],
+        )
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        "requests": iterations,
+        "rps": round(iterations / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    The function compares the scenarios against a baseline run.
+
+    :param results: The output of the current run
+    :param baseline: The output of the baseline run
+    :param threshold: The p50 slowdown (in percent) flagged as a regression
+    :return: a dictionary of scenario name to its p50/p99/rps changes and regression flag.
+    """
+    comparison = {}
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        change = {
+            key: (
+                round((current[key] / previous[key] - 1) * 100, 1)
+                if previous[key]
+                else None
+            )
+            for key in ("p50_ms", "p99_ms", "rps")
+        }
+        change["regression"] = (change["p50_ms"] or 0) > threshold
+        comparison[name] = change
+    return comparison
+
+
+def environment():
+    import django
+    from django.db import connection
+
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_dataset_arguments(parser)
+    parser.add_argument("--skip-data", action="store_true")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--scenarios", help="comma separated scenario names, all by default"
+    )
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--baseline", help="path of a previous JSON results file")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    prepare_database(args)
+
+    from django.test import Client
+
+    dataset = None
+    if not args.skip_data:
+        dataset = generate(args.factories, args.sprockets, args.points, args.seed)
+
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    scenarios = [s for s in SCENARIOS if selected is None or s.name in selected]
+    client = Client()
+    results = {"environment": environment(), "dataset": dataset, "scenarios": {}}
+    for scenario in scenarios:
+        # The writes move the boundaries, every scenario reads them again
+        context = build_context()
+        result = run_scenario(client, scenario, context, args.iterations, args.warmup)
+        results["scenarios"][scenario.name] = result
+        print(
+            f"{scenario.name:<24} {result['rps']:>9} req/s "
+            f"p50 {result['p50_ms']:>9} ms p95 {result['p95_ms']:>9} ms "
+            f"p99 {result['p99_ms']:>9} ms"
+        )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            results["comparison"] = compare(
+                results, json.load(baseline_file), args.threshold
+            )
+        for name, change in results["comparison"].items():
+            flag = " REGRESSION" if change["regression"] else ""
+            print(
+                f"{name:<24} p50 {change['p50_ms']:>+7}% p99 {change['p99_ms']:>+7}% "
+                f"rps {change['rps']:>+7}%{flag}"
+            )
+            if change["regression"]:
+                regressions.append(name)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
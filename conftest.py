@@ -1 +1,27 @@
 import pytest
+from django.core.cache import cache
+
+from sprocket.utils.query_inspector import QueryBudget, inspector_reports
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Every test starts with an empty cache, since the database is rolled back between tests without
+    sending the signals that invalidate the cached values.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def query_budget(settings):
+    """
+    Enables the query inspector during a test, `query_budget.assert_max_queries("GetFactory", 3)`
+    fails when a request served by that view ran more queries.
+    """
+    settings.QUERY_INSPECTOR_ENABLED = True
+    inspector_reports.reset()
+    yield QueryBudget(inspector_reports)
+    inspector_reports.reset()
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SprocketConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sprocket"
+
+    def ready(self):
+        from sprocket.models import Factory, Sprocket, SprocketProduction
+        from sprocket.signals import connect_cache_invalidation
+
+        connect_cache_invalidation((Factory, Sprocket, SprocketProduction))
@@ -1,6 +1,13 @@
-from django.core.management import BaseCommand
-from sprocket.models import Factory, Sprocket, SprocketProduction
+from django.core.management import BaseCommand, CommandError
+from sprocket.models import Factory, Sprocket
+from sprocket.utils.ingest import (
+    INGEST_AUTO,
+    INGEST_METHODS,
+    bulk_ingest,
+    iter_chart_data,
+)
 from datetime import datetime, timezone
+from itertools import chain
 from django.db import IntegrityError
 from django.db import transaction
 
@@ -10,6 +17,20 @@ class Command(BaseCommand):
         "Build factory and sprocket data based on json sent through the documentation"
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Amount of production rows written per statement",
+        )
+        parser.add_argument(
+            "--method",
+            choices=INGEST_METHODS,
+            default=INGEST_AUTO,
+            help="How production rows are written, auto uses COPY on PostgreSQL",
+        )
+
     @staticmethod
     def get_json_data():
         from sprocket.utils.utils import read_json_file
@@ -20,7 +41,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         factory_json, sprockets_json = self.get_json_data()
-        sprockets_factory = []
+        productions = []
         with transaction.atomic():
             try:
                 for index, sprocket in enumerate(sprockets_json["sprockets"]):
@@ -48,32 +69,25 @@ class Command(BaseCommand):
                     sprocket_obj.save()
                     factory_obj.save()
 
-                    for prod_index in range(production_amount):
-                        sprocket_production_payload = {
-                            "sprocket": sprocket_obj,
-                            "factory": factory_obj,
-                            "sprocket_actual": chart_data["sprocket_production_actual"][
-                                prod_index
-                            ],
-                            "sprocket_goal": chart_data["sprocket_production_goal"][
-                                prod_index
-                            ],
-                            "date_created": datetime.now(timezone.utc),
-                            "date_produced": datetime.fromtimestamp(
-                                int(chart_data["time"][prod_index]), timezone.utc
-                            ),
-                        }
-                        sprocketProduction = SprocketProduction(
-                            **sprocket_production_payload
-                        )
-                        sprocketProduction.save()
-                        sprockets_factory.append(sprocketProduction)
+                    productions.append(
+                        iter_chart_data(factory_obj, sprocket_obj, chart_data)
+                    )
+
+                stats = bulk_ingest(
+                    chain.from_iterable(productions),
+                    batch_size=kwargs.get("batch_size"),
+                    method=kwargs.get("method", INGEST_AUTO),
+                )
 
                 self.stderr.write(
                     self.style.SUCCESS(
-                        "Factory and sprocket data generated successfully"
+                        "Factory and sprocket data generated successfully: "
+                        f"{stats.rows} production rows in {stats.seconds:.2f}s "
+                        f"({stats.rows_per_second:.0f} rows/sec, {stats.method})"
                     )
                 )
+            except ValueError as e:
+                raise CommandError(str(e))
             except IntegrityError as e:
                 transaction.set_rollback(True)
                 error_message = f"Check the data you are sending through: {str(e)}"
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from sprocket.utils.partitions import (
+    detach_partitions,
+    ensure_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly partitions of the production table ahead of time and detach the "
+        "ones past the retention"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.PRODUCTION_PARTITION_MONTHS_AHEAD,
+            help="Amount of future months with a partition",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.PRODUCTION_PARTITION_RETENTION_MONTHS,
+            help="Past months kept attached, older partitions are detached (0 keeps them all)",
+        )
+        parser.add_argument(
+            "--archive-schema",
+            default=None,
+            help="Schema the detached partitions are moved to",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop the detached partitions instead of keeping them",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("drop") and kwargs.get("archive_schema"):
+            raise CommandError("--drop and --archive-schema can't be used together")
+        if not is_partitioned(connection):
+            self.stderr.write(
+                self.style.WARNING(
+                    "The production table isn't partitioned on this database, nothing to do"
+                )
+            )
+            return
+
+        created = ensure_partitions(connection, kwargs["months_ahead"])
+        detached = []
+        if kwargs["retention_months"] > 0:
+            detached = detach_partitions(
+                connection,
+                kwargs["retention_months"],
+                archive_schema=kwargs.get("archive_schema"),
+                drop=kwargs.get("drop", False),
+            )
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"Partitions created: {', '.join(created) or 'none'}, "
+                f"detached: {', '.join(detached) or 'none'}"
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from sprocket.utils.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = "Recompute the production snapshot of every factory from the production rows"
+
+    def handle(self, *args, **kwargs):
+        factories = rebuild_snapshots()
+        self.stderr.write(
+            self.style.SUCCESS(f"Production snapshot updated for {factories} factories")
+        )
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from sprocket.utils.rollups import rebuild_all, refresh_dirty
+
+
+class Command(BaseCommand):
+    help = "Refresh the hourly and daily production rollups of the dirty buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every rollup from the production rows",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum amount of dirty hours processed by this run",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs.get("full"):
+            pairs = rebuild_all()
+            message = f"Rollups rebuilt for {pairs} factory/sprocket pairs"
+        else:
+            hours = refresh_dirty(kwargs.get("limit"))
+            message = f"Rollups refreshed for {hours} dirty hours"
+        self.stderr.write(self.style.SUCCESS(message))
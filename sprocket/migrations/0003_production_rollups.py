@@ -0,0 +1,113 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0002_auto_20230707_1823"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupDirtyBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(help_text="Start of the dirty hour (UTC)"),
+                ),
+                ("date_created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "factory",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.factory",
+                    ),
+                ),
+                (
+                    "sprocket",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.sprocket",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ProductionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("deleted", models.BooleanField(default=False)),
+                ("date_created", models.DateTimeField(auto_now_add=True)),
+                ("last_updated", models.DateTimeField(auto_now=True)),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=8
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(help_text="Start of the time bucket (UTC)"),
+                ),
+                (
+                    "rows",
+                    models.IntegerField(
+                        help_text="How many production rows the bucket has"
+                    ),
+                ),
+                ("sprocket_goal_sum", models.BigIntegerField()),
+                ("sprocket_goal_min", models.IntegerField()),
+                ("sprocket_goal_max", models.IntegerField()),
+                ("sprocket_actual_sum", models.BigIntegerField()),
+                ("sprocket_actual_min", models.IntegerField()),
+                ("sprocket_actual_max", models.IntegerField()),
+                (
+                    "factory",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.factory",
+                    ),
+                ),
+                (
+                    "sprocket",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.sprocket",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="rollupdirtybucket",
+            constraint=models.UniqueConstraint(
+                fields=("factory", "sprocket", "bucket_start"),
+                name="unique_rollup_dirty_bucket",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "factory", "sprocket", "bucket_start"),
+                name="unique_production_rollup",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0003_production_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sprocketproduction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["factory", "date_produced"],
+                name="production_factory_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sprocketproduction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["sprocket", "date_produced"],
+                name="production_sprocket_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sprocketproduction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["date_created", "id"],
+                name="production_created_id_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0004_production_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sprocketproduction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["last_updated"],
+                name="production_last_updated_idx",
+            ),
+        ),
+    ]
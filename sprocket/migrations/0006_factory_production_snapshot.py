@@ -0,0 +1,82 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:01
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Compute the production snapshot of the existing factories from their production rows.
+    """
+    Factory = apps.get_model("sprocket", "Factory")
+    SprocketProduction = apps.get_model("sprocket", "SprocketProduction")
+    totals = (
+        SprocketProduction.objects.filter(deleted=False)
+        .values("factory_id")
+        .annotate(
+            count=Count("id"),
+            goal=Sum("sprocket_goal"),
+            actual=Sum("sprocket_actual"),
+            last=Max("date_produced"),
+        )
+    )
+    for total in totals:
+        latest = (
+            SprocketProduction.objects.filter(
+                deleted=False,
+                factory_id=total["factory_id"],
+                date_produced=total["last"],
+            )
+            .order_by("-id")
+            .first()
+        )
+        Factory.objects.filter(pk=total["factory_id"]).update(
+            production_count=total["count"],
+            total_sprocket_goal=total["goal"],
+            total_sprocket_actual=total["actual"],
+            last_produced_at=total["last"],
+            sprocket_goal=latest.sprocket_goal,
+            sprocket_actual=latest.sprocket_actual,
+            last_updated=timezone.now(),
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0005_production_last_updated_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="factory",
+            name="last_produced_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Production date of the latest production row",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="factory",
+            name="production_count",
+            field=models.IntegerField(
+                default=0, help_text="How many production rows the factory has"
+            ),
+        ),
+        migrations.AddField(
+            model_name="factory",
+            name="total_sprocket_actual",
+            field=models.BigIntegerField(
+                default=0, help_text="Sum of the sprockets made on every production row"
+            ),
+        ),
+        migrations.AddField(
+            model_name="factory",
+            name="total_sprocket_goal",
+            field=models.BigIntegerField(
+                default=0, help_text="Sum of the goal of every production row"
+            ),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
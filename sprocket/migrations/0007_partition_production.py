@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations
+
+from sprocket.utils.partitions import partition_table, unpartition_table
+
+
+def partition_production(apps, schema_editor):
+    """
+    Range partition the production table by month, only PostgreSQL supports it.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        partition_table(
+            schema_editor.connection, settings.PRODUCTION_PARTITION_MONTHS_AHEAD
+        )
+
+
+def unpartition_production(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        unpartition_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0006_factory_production_snapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_production, unpartition_production),
+    ]
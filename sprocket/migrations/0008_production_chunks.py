@@ -0,0 +1,70 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sprocket", "0007_partition_production"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductionChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.DateTimeField(
+                        help_text="Start of the UTC day the chunk holds"
+                    ),
+                ),
+                (
+                    "points",
+                    models.IntegerField(
+                        help_text="How many production points the chunk has"
+                    ),
+                ),
+                (
+                    "offsets",
+                    models.BinaryField(
+                        help_text="uint32 milliseconds from the start of the day, sorted"
+                    ),
+                ),
+                (
+                    "sprocket_actual",
+                    models.BinaryField(help_text="int32 sprockets made per point"),
+                ),
+                ("sprocket_goal", models.BinaryField(help_text="int32 goal per point")),
+                (
+                    "factory",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.factory",
+                    ),
+                ),
+                (
+                    "sprocket",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sprocket.sprocket",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="productionchunk",
+            constraint=models.UniqueConstraint(
+                fields=("factory", "sprocket", "day"), name="unique_production_chunk"
+            ),
+        ),
+    ]
@@ -18,6 +18,20 @@ class Factory(MetaData):
     name = models.CharField(max_length=128, help_text="Factory name")
     sprocket_goal = models.IntegerField(help_text="How many sprockets to make")
     sprocket_actual = models.IntegerField(help_text="How many sprockets were made")
+    # Snapshot of the production kept in sync incrementally by `sprocket.utils.snapshots`, the
+    # goal/actual fields above hold the values of the latest production row
+    last_produced_at = models.DateTimeField(
+        null=True, blank=True, help_text="Production date of the latest production row"
+    )
+    production_count = models.IntegerField(
+        default=0, help_text="How many production rows the factory has"
+    )
+    total_sprocket_goal = models.BigIntegerField(
+        default=0, help_text="Sum of the goal of every production row"
+    )
+    total_sprocket_actual = models.BigIntegerField(
+        default=0, help_text="Sum of the sprockets made on every production row"
+    )
 
 
 class SprocketProduction(MetaData):
@@ -29,8 +43,137 @@ class SprocketProduction(MetaData):
         help_text="Since there are imported data with different timestamps we use this to make a difference between db date creation and productiton date"
     )
 
+    class Meta:
+        # Partial indexes over the live rows (the API always filters `deleted = false`), designed
+        # around the filters and orderings allowed by `GetSprocketProduction`
+        indexes = [
+            models.Index(
+                fields=["factory", "date_produced"],
+                name="production_factory_date_idx",
+                condition=models.Q(deleted=False),
+            ),
+            models.Index(
+                fields=["sprocket", "date_produced"],
+                name="production_sprocket_date_idx",
+                condition=models.Q(deleted=False),
+            ),
+            models.Index(
+                fields=["date_created", "id"],
+                name="production_created_id_idx",
+                condition=models.Q(deleted=False),
+            ),
+            # Serves the MAX(last_updated) lookup behind the list ETag/Last-Modified headers
+            models.Index(
+                fields=["last_updated"],
+                name="production_last_updated_idx",
+                condition=models.Q(deleted=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the bucket the row was loaded from, an update can move it to another one
+        instance._loaded_rollup_key = instance.rollup_key()
+        instance._loaded_snapshot_key = instance.snapshot_key()
+        return instance
+
+    def rollup_key(self):
+        fields = self.__dict__
+        if not all(f in fields for f in ("factory_id", "sprocket_id", "date_produced")):
+            return None
+        return (self.factory_id, self.sprocket_id, self.date_produced)
+
+    def snapshot_key(self):
+        fields = self.__dict__
+        names = ("factory_id", "deleted", "sprocket_goal", "sprocket_actual")
+        if not all(f in fields for f in (*names, "date_produced")):
+            return None
+        return (*(fields[f] for f in names), self.date_produced)
+
     def save(self, *args, **kwargs):
+        from sprocket.utils.rollups import record_rollup_changes
+        from sprocket.utils.snapshots import apply_production, rebuild_snapshots
+
         self.date_produced = (
             self.date_produced if self.date_produced else datetime.now(timezone.utc)
         )
-        return super().save(*args, **kwargs)
+        adding = self._state.adding
+        result = super().save(*args, **kwargs)
+        loaded = getattr(self, "_loaded_snapshot_key", None)
+        if adding and not self.deleted:
+            apply_production([self])
+        elif not adding and (loaded is None or loaded != self.snapshot_key()):
+            # A soft delete or an edit, the factories it touched are recomputed
+            factory_ids = {self.factory_id}
+            if loaded:
+                factory_ids.add(loaded[0])
+            rebuild_snapshots(factory_ids)
+        keys = {self.rollup_key(), getattr(self, "_loaded_rollup_key", None)}
+        record_rollup_changes(key for key in keys if key is not None)
+        self._loaded_rollup_key = self.rollup_key()
+        self._loaded_snapshot_key = self.snapshot_key()
+        return result
+
+
+class ProductionRollup(MetaData):
+    HOUR = "hour"
+    DAY = "day"
+    GRANULARITIES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    granularity = models.CharField(max_length=8, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField(help_text="Start of the time bucket (UTC)")
+    factory = models.ForeignKey(Factory, on_delete=models.CASCADE)
+    sprocket = models.ForeignKey(Sprocket, on_delete=models.CASCADE)
+    rows = models.IntegerField(help_text="How many production rows the bucket has")
+    sprocket_goal_sum = models.BigIntegerField()
+    sprocket_goal_min = models.IntegerField()
+    sprocket_goal_max = models.IntegerField()
+    sprocket_actual_sum = models.BigIntegerField()
+    sprocket_actual_min = models.IntegerField()
+    sprocket_actual_max = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "factory", "sprocket", "bucket_start"],
+                name="unique_production_rollup",
+            )
+        ]
+
+
+class RollupDirtyBucket(models.Model):
+    factory = models.ForeignKey(Factory, on_delete=models.CASCADE)
+    sprocket = models.ForeignKey(Sprocket, on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField(help_text="Start of the dirty hour (UTC)")
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["factory", "sprocket", "bucket_start"],
+                name="unique_rollup_dirty_bucket",
+            )
+        ]
+
+
+# Columnar copy of the production of a factory and sprocket over a UTC day, the points are packed
+# little-endian arrays (see `sprocket.utils.columnar`) instead of a row per point
+class ProductionChunk(models.Model):
+    factory = models.ForeignKey(Factory, on_delete=models.CASCADE)
+    sprocket = models.ForeignKey(Sprocket, on_delete=models.CASCADE)
+    day = models.DateTimeField(help_text="Start of the UTC day the chunk holds")
+    points = models.IntegerField(help_text="How many production points the chunk has")
+    offsets = models.BinaryField(
+        help_text="uint32 milliseconds from the start of the day, sorted"
+    )
+    sprocket_actual = models.BinaryField(help_text="int32 sprockets made per point")
+    sprocket_goal = models.BinaryField(help_text="int32 goal per point")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["factory", "sprocket", "day"],
+                name="unique_production_chunk",
+            )
+        ]
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+
+from sprocket.utils.cache import bump_model_version, invalidate_detail
+
+
+def invalidate_model_caches(sender, instance, **kwargs):
+    """
+    The function invalidates the cached values (like counts) built from the rows of the model that
+    has been written, and the cached detail of the written object.
+    """
+    bump_model_version(sender)
+    invalidate_detail(sender, instance.pk)
+
+
+def connect_cache_invalidation(models):
+    """
+    The function connects the cache invalidation to the writes of the models served by the API,
+    the other models (e.g. the rollups) have no receiver so their bulk deletes stay a single
+    DELETE statement.
+
+    :param models: An iterable with the model classes whose caches are versioned
+    """
+    for model in models:
+        post_save.connect(invalidate_model_caches, sender=model)
+        post_delete.connect(invalidate_model_caches, sender=model)
@@ -0,0 +1,84 @@
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory
+
+
+@pytest.mark.django_db
+def test_aggregate_by_day(db):
+    """
+    Test the daily aggregation of the whole sprocket production.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production_aggregate")
+    response = Client().get(url, {"bucket": "day"})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["bucket"] for row in data] == [
+        "2021-01-21T00:00:00Z",
+        "2021-01-22T00:00:00Z",
+    ]
+    assert [row["rows"] for row in data] == [40, 20]
+    assert data[0]["sprocket_actual_sum"] == 616 + 608
+    assert data[0]["sprocket_goal_sum"] == 616 + 605
+    assert data[1]["sprocket_actual_min"] <= data[1]["sprocket_actual_avg"]
+    assert data[1]["attainment"] == pytest.approx(610 / 604)
+
+
+@pytest.mark.django_db
+def test_aggregate_by_hour_for_a_factory(db):
+    """
+    Test the hourly aggregation of a factory grouped by sprocket.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.get(name="Factory 2")
+    url = reverse("get_sprocket_production_aggregate")
+    response = Client().get(
+        url,
+        {
+            "bucket": "hour",
+            "group_by": "sprocket_id",
+            "filter": f"factory_id:{factory.id}",
+        },
+    )
+    data = response.json()["data"]
+    assert [row["bucket"] for row in data] == [
+        "2021-01-21T04:00:00Z",
+        "2021-01-21T05:00:00Z",
+    ]
+    assert sum(row["rows"] for row in data) == 20
+    assert sum(row["sprocket_actual_sum"] for row in data) == 608
+    assert "sprocket_id" in data[0]
+
+
+@pytest.mark.django_db
+def test_aggregate_with_date_range(db):
+    """
+    Test the aggregation over a date_produced range, datetimes contain colons.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production_aggregate")
+    response = Client().get(
+        url,
+        {
+            "bucket": "week",
+            "filter": "date_produced__gte:2021-01-21T04:00:00+00:00,"
+            "date_produced__lt:2021-01-22T00:00:00+00:00",
+        },
+    )
+    data = response.json()["data"]
+    assert len(data) == 1
+    assert data[0]["rows"] == 20
+    assert data[0]["sprocket_actual_sum"] == 608
+
+
+@pytest.mark.parametrize("params", [{"bucket": "year"}, {"group_by": "factory__name"}])
+def test_aggregate_invalid_parameters(params):
+    """
+    Test that unknown buckets and group by fields are rejected.
+    """
+    url = reverse("get_sprocket_production_aggregate")
+    response = Client().get(url, params)
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+from django.core.management import call_command
+from django.test import RequestFactory
+
+from sprocket.models import Factory
+from sprocket.views.async_views import (
+    AsyncApiStatusView,
+    AsyncGetFactory,
+    AsyncGetSprocketProduction,
+)
+
+
+def test_async_views_are_coroutines():
+    """
+    Test that django detects the async views as coroutine functions.
+    """
+    assert asyncio.iscoroutinefunction(AsyncGetFactory.as_view())
+    assert asyncio.iscoroutinefunction(AsyncApiStatusView.as_view())
+
+
+def test_async_status():
+    """
+    Test that the status is answered by the async view.
+    """
+    request = RequestFactory().get("/api/status/")
+    response = asyncio.run(AsyncApiStatusView.as_view()(request))
+    assert response.status_code == 200
+    assert json.loads(response.content)["status"] == "OK"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_detail_and_list(transactional_db):
+    """
+    Test that the async views return the same data as the sync ones, running their queries in the
+    executor threads.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+
+    async def fetch():
+        detail = AsyncGetFactory.as_view()(
+            RequestFactory().get(f"/api/factory/{factory.id}"), id=factory.id
+        )
+        page = AsyncGetSprocketProduction.as_view()(
+            RequestFactory().get("/api/factory/sprockets", {"size": 5})
+        )
+        return await asyncio.gather(detail, page)
+
+    detail, page = asyncio.run(fetch())
+    assert json.loads(detail.content)["data"]["name"] == factory.name
+    assert len(json.loads(page.content)["data"]) == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_detail_not_found(transactional_db):
+    """
+    Test that the exceptions raised in the executor reach the caller.
+    """
+    request = RequestFactory().get("/api/factory/0")
+    with pytest.raises(Factory.DoesNotExist):
+        asyncio.run(AsyncGetFactory.as_view()(request, id=0))
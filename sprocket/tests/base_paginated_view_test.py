@@ -83,7 +83,7 @@ def test_get_factory(db):
     response = Client().get(url)
     data = response.json()
     assert response.status_code == 200
-    assert len(data["data"].keys()) == 5
+    assert len(data["data"].keys()) == 9
     assert data["success"] == True
 
 
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Sprocket
+
+
+def sprocket_payload(teeth, **extra):
+    """
+    Helper function to build the payload of a sprocket.
+    """
+    return {
+        "teeth": teeth,
+        "pitch_diameter": 16.8,
+        "outside_diameter": 21.7,
+        "pitch": 6,
+        **extra,
+    }
+
+
+@pytest.mark.django_db
+def test_batch_create(db):
+    """
+    Test that a batch creates every sprocket sent.
+    """
+    payload = [sprocket_payload(teeth) for teeth in range(10, 15)]
+    response = Client().post(
+        reverse("new_sprocket_batch"), json.dumps(payload), "application/json"
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] == True
+    assert [record["teeth"] for record in data["data"]] == list(range(10, 15))
+    assert all(record["id"] for record in data["data"])
+    assert Sprocket.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_batch_create_reports_every_invalid_item(db):
+    """
+    Test that the invalid items are reported by index and nothing is written.
+    """
+    payload = [
+        sprocket_payload(10),
+        sprocket_payload("many"),
+        {"teeth": 3},
+        sprocket_payload(12, color="red"),
+    ]
+    response = Client().post(
+        reverse("new_sprocket_batch"), json.dumps(payload), "application/json"
+    )
+    assert response.status_code == 400
+    data = response.json()
+    assert data["success"] == False
+    assert [error["index"] for error in data["errors"]] == [1, 2, 3]
+    assert all(error["status"] == 400 for error in data["errors"])
+    assert Sprocket.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_batch_update(db):
+    """
+    Test that a batch updates the sprockets and invalidates their cached details.
+    """
+    call_command("build_factory_data")
+    sprockets = list(Sprocket.objects.order_by("id"))
+    detail_url = reverse("get_sprocket", args=[sprockets[0].id])
+    assert Client().get(detail_url).json()["data"]["teeth"] == 5
+
+    payload = [
+        sprocket_payload(20 + index, id=sprocket.id)
+        for index, sprocket in enumerate(sprockets)
+    ]
+    response = Client().put(
+        reverse("update_sprocket_batch"), json.dumps(payload), "application/json"
+    )
+    assert response.status_code == 200
+    assert Client().get(detail_url).json()["data"]["teeth"] == 20
+    assert list(Sprocket.objects.order_by("id").values_list("teeth", flat=True)) == [
+        20 + index for index in range(len(sprockets))
+    ]
+
+
+@pytest.mark.django_db
+def test_batch_update_unknown_and_repeated_ids(db):
+    """
+    Test that unknown and repeated ids are reported without updating anything.
+    """
+    call_command("build_factory_data")
+    sprocket = Sprocket.objects.first()
+    payload = [
+        sprocket_payload(30, id=sprocket.id),
+        sprocket_payload(31, id=sprocket.id),
+        sprocket_payload(32, id=0),
+    ]
+    response = Client().put(
+        reverse("update_sprocket_batch"), json.dumps(payload), "application/json"
+    )
+    assert response.status_code == 400
+    errors = response.json()["errors"]
+    assert [(error["index"], error["status"]) for error in errors] == [
+        (1, 400),
+        (2, 404),
+    ]
+    sprocket.refresh_from_db()
+    assert sprocket.teeth == 5
+
+
+def test_batch_requires_an_array():
+    """
+    Test that a body that isn't an array of records is rejected.
+    """
+    response = Client().post(
+        reverse("new_sprocket_batch"),
+        json.dumps(sprocket_payload(10)),
+        "application/json",
+    )
+    assert response.status_code == 400
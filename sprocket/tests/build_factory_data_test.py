@@ -59,3 +59,53 @@ def test_missing_factory_fields(db, monkeypatch):
     assert Sprocket.objects.count() == 0
     assert Factory.objects.count() == 0
     assert SprocketProduction.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_creation_with_small_batches(db):
+    """
+    Test that the production rows are the same whatever batch size the loader uses.
+    """
+    call_command("build_factory_data", batch_size=7, method="bulk_create")
+    assert SprocketProduction.objects.count() == 60
+    last = SprocketProduction.objects.order_by("date_produced").last()
+    factory_json, _ = get_json_data()
+    chart_data = factory_json["factories"][2]["factory"]["chart_data"]
+    assert int(last.date_produced.timestamp()) == chart_data["time"][-1]
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_api(db):
+    """
+    Test the python API of the bulk loader streaming a factory chart data.
+    """
+    from sprocket.utils.ingest import bulk_ingest, iter_chart_data
+
+    factory_json, _ = get_json_data()
+    chart_data = factory_json["factories"][0]["factory"]["chart_data"]
+    sprocket = Sprocket.objects.create(
+        teeth=5, pitch_diameter=5, outside_diameter=6, pitch=1
+    )
+    factory = Factory.objects.create(name="Factory", sprocket_goal=0, sprocket_actual=0)
+    stats = bulk_ingest(iter_chart_data(factory, sprocket, chart_data), batch_size=6)
+    assert stats.rows == 20
+    assert stats.batches == 4
+    assert stats.rows_per_second > 0
+    assert (
+        list(
+            SprocketProduction.objects.order_by("date_produced").values_list(
+                "sprocket_actual", flat=True
+            )
+        )
+        == chart_data["sprocket_production_actual"]
+    )
+
+
+def test_bulk_ingest_rejects_unknown_method():
+    """
+    Test that the loader refuses methods it doesn't know.
+    """
+    from sprocket.utils.ingest import bulk_ingest
+
+    with pytest.raises(ValueError):
+        bulk_ingest([], method="upsert")
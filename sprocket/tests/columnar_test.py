@@ -0,0 +1,141 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from sprocket.models import Factory, ProductionChunk, SprocketProduction
+from sprocket.utils import columnar
+from sprocket.utils.columnar import (
+    OFFSET_TYPECODE,
+    VALUE_TYPECODE,
+    pack,
+    unpack,
+)
+from sprocket.utils.utils import read_json_file
+
+
+@pytest.fixture(autouse=True, params=["numpy", "array"])
+def columnar_backend(request, monkeypatch):
+    """
+    Runs every test with the NumPy code paths and with the `array` fallback.
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(columnar, "numpy", None)
+    return request.param
+
+
+@pytest.fixture
+def chunks(db, settings):
+    """
+    Loads the fixtures keeping the columnar chunks, the aggregations skip the rollups.
+    """
+    settings.COLUMNAR_STORAGE_ENABLED = True
+    settings.ROLLUP_ROUTING_ENABLED = False
+    call_command("build_factory_data")
+
+
+def get_json(name, params, **kwargs):
+    response = Client().get(reverse(name, kwargs=kwargs), params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_pack_round_trip():
+    """
+    Test that the packed columns are read back unchanged.
+    """
+    assert list(unpack(pack([0, 1, 86399999], OFFSET_TYPECODE), OFFSET_TYPECODE)) == [
+        0,
+        1,
+        86399999,
+    ]
+    assert len(pack([-5, 7], VALUE_TYPECODE)) == 8
+    assert list(unpack(memoryview(pack([-5, 7], VALUE_TYPECODE)), VALUE_TYPECODE)) == [
+        -5,
+        7,
+    ]
+
+
+def test_chunks_are_built_on_ingest(chunks):
+    """
+    Test that every production row is packed in the chunk of its factory, sprocket and day.
+    """
+    assert ProductionChunk.objects.count() < SprocketProduction.objects.count()
+    assert sum(ProductionChunk.objects.values_list("points", flat=True)) == (
+        SprocketProduction.objects.count()
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"bucket": "minute"},
+        {"bucket": "hour", "group_by": "factory_id"},
+        {"bucket": "week", "group_by": "factory_id,sprocket_id"},
+        {
+            "bucket": "minute",
+            "filter": "date_produced__gt:2021-01-21T05:10:00Z,"
+            "date_produced__lte:2021-01-21T06:00:00Z",
+        },
+    ],
+)
+def test_columnar_aggregations_match_production(chunks, settings, params):
+    """
+    Test that the aggregations served from the chunks are the same computed from the rows.
+    """
+    url = "get_sprocket_production_aggregate"
+    from_chunks = get_json(url, params)
+    settings.COLUMNAR_STORAGE_ENABLED = False
+    from_production = get_json(url, params)
+    assert from_chunks["source"] == "columnar"
+    assert from_production["source"] == "production"
+    assert from_chunks["data"] == pytest.approx(from_production["data"])
+
+
+def test_factory_chart(chunks, settings):
+    """
+    Test that the chart of a factory has the shape and values of the seed `chart_data`, from the
+    chunks and from the rows.
+    """
+    factory = Factory.objects.get(name="Factory 1")
+    chart = get_json("get_factory_chart", {}, id=factory.id)
+    assert chart["source"] == "columnar"
+    seed = read_json_file("sprocket/fixtures/seed_factory_data.json")
+    chart_data = seed["factories"][0]["factory"]["chart_data"]
+    (series,) = chart["data"]
+    for key in ("sprocket_production_actual", "sprocket_production_goal"):
+        assert series[key] == chart_data[key]
+    assert series["time"] == [int(time) for time in chart_data["time"]]
+
+    params = {"filter": "date_produced__gte:2021-01-21T02:15:00Z"}
+    ranged = get_json("get_factory_chart", params, id=factory.id)
+    settings.COLUMNAR_STORAGE_ENABLED = False
+    assert ranged == {
+        **get_json("get_factory_chart", params, id=factory.id),
+        "source": "columnar",
+    }
+    assert 0 < len(ranged["data"][0]["time"]) < len(series["time"])
+
+
+def test_chunks_follow_the_writes(chunks):
+    """
+    Test that a deleted production row leaves the chunk of its day.
+    """
+    row = SprocketProduction.objects.order_by("id").first()
+    pair = {"factory_id": row.factory_id, "sprocket_id": row.sprocket_id}
+    row.deleted = True
+    row.save()
+    # The fixtures of a factory are produced within a day
+    chunk = ProductionChunk.objects.get(**pair)
+    assert chunk.points == 19
+    assert SprocketProduction.objects.filter(deleted=False, **pair).count() == 19
+
+
+def test_chart_of_missing_factory(db):
+    """
+    Test that the chart of a factory that doesn't exist is a 404.
+    """
+    response = Client().get(reverse("get_factory_chart", kwargs={"id": 999}))
+    assert response.status_code == 404
@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.http import http_date
+
+from sprocket.models import Factory, SprocketProduction
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(db):
+    """
+    Test that a detail read with the current ETag gets a 304 without a body, served from the cache.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    first = Client().get(url)
+    assert first.status_code == 200
+    assert first["Last-Modified"]
+
+    with CaptureQueriesContext(connection) as context:
+        second = Client().get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second["ETag"] == first["ETag"]
+    assert len(context.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_detail_etag_changes_on_update(db):
+    """
+    Test that updating an object changes its ETag.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    etag = Client().get(url)["ETag"]
+
+    factory.name = "Updated factory"
+    factory.save()
+    response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["data"]["name"] == "Updated factory"
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_list_not_modified(db):
+    """
+    Test that a list page with the current ETag gets a 304 before counting or fetching the rows, and
+    that every page gets its own ETag.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    first = Client().get(url, {"page": 1})
+    assert first.status_code == 200
+    assert Client().get(url, {"page": 2})["ETag"] != first["ETag"]
+
+    with CaptureQueriesContext(connection) as context:
+        second = Client().get(url, {"page": 1}, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert second.status_code == 304
+    assert len(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_list_etag_changes_on_write(db):
+    """
+    Test that soft deleting a row changes the ETag of the list.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    etag = Client().get(url, {"cursor": ""})["ETag"]
+
+    production = SprocketProduction.objects.first()
+    production.deleted = True
+    production.save()
+    response = Client().get(url, {"cursor": ""}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_list_without_last_modified(db):
+    """
+    Test that a list has no `Last-Modified`, so `If-Modified-Since` can't hide a row leaving it or
+    a change of a related row.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    first = Client().get(url, {"page": 1})
+    assert "Last-Modified" not in first
+
+    factory = Factory.objects.first()
+    factory.name = "Updated factory"
+    factory.save()
+    response = Client().get(
+        url,
+        {"page": 1},
+        HTTP_IF_NONE_MATCH=first["ETag"],
+        HTTP_IF_MODIFIED_SINCE=http_date(),
+    )
+    assert response.status_code == 200
+    assert response["ETag"] != first["ETag"]
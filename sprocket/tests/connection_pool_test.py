@@ -0,0 +1,121 @@
+import pytest
+from django.db.utils import load_backend
+
+from app.db.pool import get_pool
+
+
+def make_connection(tmp_path, alias, **options):
+    """
+    Helper function to build a connection of the managed SQLite backend outside of `DATABASES`.
+    """
+    settings_dict = {
+        "ENGINE": "app.db.backends.sqlite3",
+        "NAME": str(tmp_path / "pool.sqlite3"),
+        "ATOMIC_REQUESTS": False,
+        "AUTOCOMMIT": True,
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {},
+        "TIME_ZONE": None,
+        "USER": "",
+        "PASSWORD": "",
+        "HOST": "",
+        "PORT": "",
+        "TEST": {},
+        **options,
+    }
+    backend = load_backend(settings_dict["ENGINE"])
+    return backend.DatabaseWrapper(settings_dict, alias)
+
+
+@pytest.fixture(autouse=True)
+def unblock_connections(django_db_blocker):
+    # The connections built by the tests don't touch the test database
+    with django_db_blocker.unblock():
+        yield
+
+
+@pytest.fixture
+def pool_alias(request):
+    alias = f"pool_{request.node.name}"
+    yield alias
+    get_pool(alias, 1).clear()
+
+
+def test_closed_connections_are_reused(tmp_path, pool_alias):
+    """
+    Test that a closed connection goes back to the pool and the next one reuses it.
+    """
+    first = make_connection(tmp_path, pool_alias, POOL_SIZE=2)
+    first.ensure_connection()
+    raw = first.connection
+    first.close()
+    assert first.connection is None
+
+    second = make_connection(tmp_path, pool_alias, POOL_SIZE=2)
+    with second.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    assert second.connection is raw
+    stats = get_pool(pool_alias, 2).to_dict()
+    assert (stats["created"], stats["reused"], stats["idle"]) == (1, 1, 0)
+    second.close()
+
+
+def test_broken_pooled_connections_are_discarded(tmp_path, pool_alias):
+    """
+    Test that the health check drops the pooled connections that stopped working.
+    """
+    first = make_connection(tmp_path, pool_alias, POOL_SIZE=1, HEALTH_CHECKS=True)
+    first.ensure_connection()
+    raw = first.connection
+    first.close()
+    raw.close()
+
+    second = make_connection(tmp_path, pool_alias, POOL_SIZE=1, HEALTH_CHECKS=True)
+    second.ensure_connection()
+    assert second.connection is not raw
+    assert get_pool(pool_alias, 1).to_dict()["discarded"] == 1
+    second.close()
+
+
+def test_transactions_are_never_pooled(tmp_path, pool_alias):
+    """
+    Test that a connection closed in the middle of a transaction is closed for real.
+    """
+    connection = make_connection(tmp_path, pool_alias, POOL_SIZE=1)
+    connection.ensure_connection()
+    connection.set_autocommit(False)
+    connection.close()
+    assert get_pool(pool_alias, 1).to_dict()["idle"] == 0
+
+
+def test_persistent_connection_health_check(tmp_path, monkeypatch):
+    """
+    Test that a persistent connection is checked once per request and replaced when it's broken.
+    """
+    connection = make_connection(
+        tmp_path, "persistent", CONN_MAX_AGE=60, HEALTH_CHECKS=True
+    )
+    connection.ensure_connection()
+    raw = connection.connection
+    checks = []
+
+    def is_usable():
+        checks.append(1)
+        return len(checks) > 1
+
+    monkeypatch.setattr(connection, "is_usable", is_usable)
+    # request_started
+    connection.close_if_unusable_or_obsolete()
+    for _ in range(3):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    assert connection.connection is not raw
+    assert len(checks) == 1
+
+    raw = connection.connection
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    assert connection.connection is raw
+    assert len(checks) == 2
+    connection.close()
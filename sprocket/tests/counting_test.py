@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import SprocketProduction
+
+
+def count_queries(queries):
+    """
+    Helper function to get the amount of COUNT queries captured.
+    """
+    return len([query for query in queries if "COUNT(" in query["sql"].upper()])
+
+
+@pytest.mark.django_db
+def test_exact_count_is_cached(db):
+    """
+    Test that the exact count is reused by the following requests with the same filters.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    factory_id = SprocketProduction.objects.first().factory_id
+    with CaptureQueriesContext(connection) as context:
+        first = Client().get(url, {"filter": f"factory_id:{factory_id}"}).json()
+        second = (
+            Client().get(url, {"filter": f"factory_id:{factory_id}", "page": 2}).json()
+        )
+    assert first["total_pages"] == second["total_pages"] == 2
+    assert count_queries(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_exact_count_is_invalidated_on_write(db):
+    """
+    Test that saving a row invalidates the cached count.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    assert Client().get(url).json()["total_pages"] == 6
+
+    production = SprocketProduction.objects.first()
+    production.deleted = True
+    production.save()
+    assert Client().get(url, {"size": 59}).json()["total_pages"] == 1
+    assert Client().get(url, {"size": 58}).json()["total_pages"] == 2
+
+
+@pytest.mark.django_db
+def test_count_none_skips_the_count(db):
+    """
+    Test that count=none returns the page without running the count query.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    with CaptureQueriesContext(connection) as context:
+        data = Client().get(url, {"count": "none"}).json()
+    assert len(data["data"]) == 10
+    assert data["total_pages"] is None
+    assert count_queries(context.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_count_estimate(db):
+    """
+    Test that count=estimate returns a total of pages (the exact one when the database doesn't
+    provide planner estimates).
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    data = Client().get(url, {"count": "estimate"}).json()
+    assert data["success"] == True
+    if connection.vendor != "postgresql":
+        assert data["total_pages"] == 6
+    else:
+        assert data["total_pages"] >= 1
+
+
+def test_invalid_count_strategy():
+    """
+    Test that an unknown count strategy is rejected.
+    """
+    url = reverse("get_sprocket_production")
+    response = Client().get(url, {"count": "all"})
+    assert response.status_code == 400
@@ -0,0 +1,98 @@
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import SprocketProduction
+from sprocket.utils.cursor_pagination import keyset_ordering
+
+
+def walk_cursor_pages(params):
+    """
+    Helper function to walk every cursor page of the sprocket production list.
+    """
+    url = reverse("get_sprocket_production")
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        response = Client().get(url, {**params, "cursor": cursor})
+        assert response.status_code == 200
+        data = response.json()
+        pages.append(data)
+        cursor = data["next_cursor"]
+    return pages
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_walks_all_rows(db):
+    """
+    Test that following the next cursor returns every row exactly once in the default order.
+    """
+    call_command("build_factory_data")
+    pages = walk_cursor_pages({"size": 7})
+    rows = [row for page in pages for row in page["data"]]
+    expected = list(
+        SprocketProduction.objects.order_by("-date_created", "-id").values_list(
+            "date_produced", flat=True
+        )
+    )
+    assert len(pages) == 9
+    assert [row["date_produced"] for row in rows] == [
+        value.isoformat().replace("+00:00", "Z") for value in expected
+    ]
+    assert pages[0]["prev_cursor"] is None
+    assert "total_pages" not in pages[0]
+    assert pages[0]["success"] == True
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_with_order_and_filter(db):
+    """
+    Test the cursor mode using an allowed order field together with a filter.
+    """
+    call_command("build_factory_data")
+    factory_id = SprocketProduction.objects.first().factory_id
+    pages = walk_cursor_pages(
+        {"size": 3, "order": "sprocket_actual", "filter": f"factory_id:{factory_id}"}
+    )
+    rows = [row for page in pages for row in page["data"]]
+    assert len(rows) == 20
+    assert all(row["factory_id"] == factory_id for row in rows)
+    actuals = [row["sprocket_actual"] for row in rows]
+    assert actuals == sorted(actuals)
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_prev_cursor(db):
+    """
+    Test that the previous cursor brings back the previous page.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    first = Client().get(url, {"size": 5, "cursor": ""}).json()
+    second = Client().get(url, {"size": 5, "cursor": first["next_cursor"]}).json()
+    back = Client().get(url, {"size": 5, "cursor": second["prev_cursor"]}).json()
+    assert back["data"] == first["data"]
+    assert back["next_cursor"] == first["next_cursor"]
+
+
+def test_cursor_pagination_invalid_cursor():
+    """
+    Test that a malformed cursor is rejected.
+    """
+    url = reverse("get_sprocket_production")
+    response = Client().get(url, {"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["success"] == False
+
+
+def test_keyset_ordering_skips_lookups():
+    """
+    Test that the filter lookups are never picked as the ordering key, even when they're allowed.
+    """
+    allowed = ["date_produced__gte", "sprocket__teeth__lt", "sprocket__teeth", "id"]
+    assert keyset_ordering(allowed, ["date_produced__gte", "-sprocket__teeth"]) == (
+        "sprocket__teeth",
+        True,
+    )
+    assert keyset_ordering(allowed, ["sprocket__teeth__lt"]) == ("date_created", True)
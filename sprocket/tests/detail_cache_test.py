@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory, Sprocket
+from sprocket.utils.cache import (
+    detail_cache_stats,
+    get_cached_detail,
+    get_detail_version,
+    invalidate_detail,
+    set_cached_detail,
+)
+
+
+@pytest.fixture
+def stats():
+    detail_cache_stats.reset()
+    return detail_cache_stats
+
+
+@pytest.mark.django_db
+def test_detail_is_served_from_cache(db, stats):
+    """
+    Test that the second read of a factory doesn't hit the database.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    first = Client().get(url)
+    with CaptureQueriesContext(connection) as context:
+        second = Client().get(url)
+    assert len(context.captured_queries) == 0
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.json()["success"] == True
+    assert stats.to_dict() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+@pytest.mark.django_db
+def test_detail_cache_is_invalidated_on_update(db, stats):
+    """
+    Test that updating a sprocket invalidates its cached detail.
+    """
+    call_command("build_factory_data")
+    sprocket = Sprocket.objects.first()
+    url = reverse("get_sprocket", args=[sprocket.id])
+    assert Client().get(url).json()["data"]["teeth"] == 5
+
+    payload = {
+        "teeth": 12,
+        "pitch_diameter": 16.8,
+        "outside_diameter": 21.7,
+        "pitch": 6,
+    }
+    update_url = reverse("update_sprocket", args=[sprocket.id])
+    Client().put(update_url, json.dumps(payload), "application/json")
+    assert Client().get(url).json()["data"]["teeth"] == 12
+    assert stats.hits == 0
+
+
+def test_body_read_before_an_invalidation_is_never_served(stats):
+    """
+    Test that a body loaded before a concurrent write is stored under a version no reader asks for,
+    and that the write invalidates every variant of the object.
+    """
+    version = get_detail_version(Factory, 1)
+    set_cached_detail(Factory, 1, version, b"{}", variant="name")
+    invalidate_detail(Factory, 1)
+    # The reader that loaded the record before the write stores it afterwards
+    set_cached_detail(Factory, 1, version, b"stale")
+    current = get_detail_version(Factory, 1)
+    assert current != version
+    assert get_cached_detail(Factory, 1, current) is None
+    assert get_cached_detail(Factory, 1, current, "name") is None
+
+    set_cached_detail(Factory, 1, current, b"{}", variant="name")
+    assert get_cached_detail(Factory, 1, current, "name")["body"] == b"{}"
+    assert get_cached_detail(Factory, 1, current) is None
+
+
+@pytest.mark.django_db
+def test_detail_cache_with_file_backend(db, stats, tmp_path):
+    """
+    Test the detail cache on top of the file based cache backend.
+    """
+    caches = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path),
+        }
+    }
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    with override_settings(CACHES=caches):
+        first = Client().get(url).json()
+        assert Client().get(url).json() == first
+    assert stats.hits == 1
+
+
+def test_api_status_exposes_cache_stats(stats):
+    """
+    Test that the API status exposes the detail cache counters.
+    """
+    response = Client().get(reverse("get_api_status"))
+    assert response.json()["cache"] == {"hits": 0, "misses": 0, "hit_ratio": None}
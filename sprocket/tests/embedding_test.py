@@ -0,0 +1,131 @@
+import pytest
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory, Sprocket, SprocketProduction
+from sprocket.utils.ingest import bulk_ingest
+
+INCLUDE = "sprockets,recent_production,summary"
+
+
+def get_with_queries(factory_id, **params):
+    """
+    Helper function to request a factory and count the queries it ran.
+    """
+    url = reverse("get_factory", args=[factory_id])
+    with CaptureQueriesContext(connection) as context:
+        response = Client().get(url, params)
+    return response, len(context.captured_queries)
+
+
+def grow_data(factories, rows):
+    """
+    Helper function to add factories and production rows to every factory and sprocket.
+    """
+    Factory.objects.bulk_create(
+        [
+            Factory(name=f"Factory {i}", sprocket_goal=0, sprocket_actual=0)
+            for i in range(factories)
+        ]
+    )
+    sprockets = list(Sprocket.objects.all())
+    production = SprocketProduction.objects.first()
+    bulk_ingest(
+        [
+            SprocketProduction(
+                factory=factory,
+                sprocket=sprockets[i % len(sprockets)],
+                sprocket_goal=10,
+                sprocket_actual=i,
+                date_produced=production.date_produced,
+            )
+            for factory in Factory.objects.all()
+            for i in range(rows)
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_factory_include_query_count_is_constant(db):
+    """
+    Test that embedding the related data runs the same amount of queries however much data there is.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    _, baseline = get_with_queries(factory.id, include=INCLUDE)
+    assert baseline <= 4
+
+    grow_data(factories=5, rows=40)
+    response, queries = get_with_queries(factory.id, include=INCLUDE)
+    assert response.status_code == 200
+    assert queries == baseline
+
+
+@pytest.mark.django_db
+def test_factory_include_data(db):
+    """
+    Test that the embedded relations match the production of the factory.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    rows = SprocketProduction.objects.filter(factory=factory, deleted=False)
+    response, _ = get_with_queries(factory.id, include=INCLUDE, fields="name")
+    body = response.json()
+    included = body["included"]
+
+    assert body["data"] == {"name": factory.name}
+    assert included["summary"]["production_rows"] == rows.count()
+    assert (
+        included["summary"]["sprocket_actual"]
+        == rows.aggregate(total=Sum("sprocket_actual"))["total"]
+    )
+    per_sprocket = dict(
+        rows.values_list("sprocket_id").annotate(rows=Count("id")).order_by()
+    )
+    assert {
+        sprocket["id"]: sprocket["production_rows"]
+        for sprocket in included["sprockets"]
+    } == per_sprocket
+    recent = included["recent_production"]
+    assert len(recent) == min(10, rows.count())
+    assert recent[0]["id"] == rows.order_by("-date_produced", "-id").first().id
+
+
+@pytest.mark.django_db
+def test_factory_include_validation(db):
+    """
+    Test that unknown relations are rejected and missing factories answer a 404.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    response, _ = get_with_queries(factory.id, include="sprockets,owner")
+    assert response.status_code == 400
+    response, _ = get_with_queries(0, include="summary")
+    assert response.status_code == 404
+    response, _ = get_with_queries(factory.id, include="summary")
+    assert list(response.json()["included"]) == ["summary"]
+
+
+@pytest.mark.django_db
+def test_factory_summary_is_read_from_the_snapshot(db):
+    """
+    Test that the summary is served from the snapshot columns read with the factory, without any
+    aggregation query, and matches the live production.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    response, queries = get_with_queries(factory.id, include="summary")
+    assert queries == 1
+    summary = response.json()["included"]["summary"]
+    rows = SprocketProduction.objects.filter(factory=factory, deleted=False)
+    totals = rows.aggregate(
+        goal=Sum("sprocket_goal"), actual=Sum("sprocket_actual"), rows=Count("id")
+    )
+    assert summary["production_rows"] == totals["rows"]
+    assert summary["sprocket_goal"] == totals["goal"]
+    assert summary["sprocket_actual"] == totals["actual"]
+    assert summary["attainment"] == totals["actual"] / totals["goal"]
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory
+
+
+def read_streaming(response):
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_export_ndjson(db):
+    """
+    Test the NDJSON export of the whole sprocket production history.
+    """
+    call_command("build_factory_data")
+    url = reverse("export_sprocket_production")
+    response = Client().get(url, {"order": "date_produced"})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in read_streaming(response).splitlines()]
+    assert len(rows) == 60
+    dates = [row["date_produced"] for row in rows]
+    assert dates == sorted(dates)
+    assert "factory__name" in rows[0]
+
+
+@pytest.mark.django_db
+def test_export_csv_filtered(db):
+    """
+    Test the CSV export using the same filter grammar of the paginated list.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("export_sprocket_production")
+    response = Client().get(
+        url, {"format": "csv", "filter": f"factory_id:{factory.id}"}
+    )
+    assert response.status_code == 200
+    assert "sprocket_production.csv" in response["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(read_streaming(response))))
+    assert len(rows) == 20
+    assert {row["factory_id"] for row in rows} == {str(factory.id)}
+
+
+def test_export_invalid_format():
+    """
+    Test that an unknown export format is rejected.
+    """
+    url = reverse("export_sprocket_production")
+    response = Client().get(url, {"format": "xml"})
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory
+
+
+@pytest.mark.django_db
+def test_list_sparse_fieldset_skips_joins(db):
+    """
+    Test that the list only returns (and only joins for) the requested fields.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    params = {"fields": "date_produced,sprocket_actual", "count": "none"}
+    with CaptureQueriesContext(connection) as context:
+        data = Client().get(url, params).json()["data"]
+    assert len(data) == 10
+    assert all(list(row) == ["date_produced", "sprocket_actual"] for row in data)
+    assert not any("JOIN" in query["sql"] for query in context.captured_queries)
+
+    pages = Client().get(url, {"fields": "factory__name", "cursor": ""}).json()
+    assert all(list(row) == ["factory__name"] for row in pages["data"])
+
+
+def test_list_sparse_fieldset_rejects_unknown_fields():
+    """
+    Test that only the schema values can be requested.
+    """
+    url = reverse("get_sprocket_production")
+    response = Client().get(url, {"fields": "date_produced,password"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_detail_sparse_fieldset(db):
+    """
+    Test that the detail returns the requested fields, every projection being cached and
+    invalidated on its own.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    full = Client().get(url)
+    sparse = Client().get(url, {"fields": "name,sprocket_actual"})
+    assert sparse.json()["data"] == {
+        "name": factory.name,
+        "sprocket_actual": factory.sprocket_actual,
+    }
+    assert sparse["ETag"] != full["ETag"]
+    assert Client().get(url).json() == full.json()
+
+    factory.name = "Renamed"
+    factory.save()
+    assert Client().get(url, {"fields": "name"}).json()["data"] == {"name": "Renamed"}
+    assert Client().get(url, {"fields": "id,id"}).json()["data"] == {"id": factory.id}
+    assert Client().get(url, {"fields": "date_created"}).status_code == 400
@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from django.core.management import call_command
+
+from sprocket.views.sprocket_views import GetSprocketProduction
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "body, index",
+    [
+        ({}, "production_created_id_idx"),
+        ({"order": "date_created"}, "production_created_id_idx"),
+        ({"filter": "factory_id:1"}, "production_factory_date_idx"),
+        (
+            {"filter": "factory_id:1,date_produced__gt:2021-01-21T00:00:00+00:00"},
+            "production_factory_date_idx",
+        ),
+        (
+            {"filter": "sprocket_id:1,date_produced__lt:2021-01-22T00:00:00+00:00"},
+            "production_sprocket_date_idx",
+        ),
+    ],
+)
+def test_paginated_queries_use_indexes(db, body, index):
+    """
+    Test via EXPLAIN that the hot query shapes of the production list use the partial indexes.
+    """
+    if connection.vendor not in ("postgresql", "sqlite"):
+        pytest.skip("EXPLAIN output is only checked on PostgreSQL and SQLite")
+    call_command("build_factory_data")
+    if connection.vendor == "postgresql":
+        # The seed tables are tiny, without this the planner prefers sequential scans
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("ANALYZE sprocket_sprocketproduction")
+
+    queryset, _ = GetSprocketProduction().filter_queryset(None, body)
+    plan = queryset.values(*GetSprocketProduction.schema_values)[:10].explain()
+    assert index in plan
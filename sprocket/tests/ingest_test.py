@@ -0,0 +1,110 @@
+import json
+
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory, Sprocket, SprocketProduction
+from sprocket.utils.exceptions import BadRequest
+from sprocket.utils.ingest import event_to_row
+
+
+def build_events(factory, sprocket, count):
+    """
+    Helper function to build a batch of per-minute production events.
+    """
+    return [
+        {
+            "factory_id": factory.id,
+            "sprocket_id": sprocket.id,
+            "sprocket_actual": 30 + minute,
+            "sprocket_goal": 32,
+            "date_produced": f"2023-01-01T10:{minute:02d}:00Z",
+        }
+        for minute in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_ingest_json_array(db):
+    """
+    Test that a JSON array of events is written.
+    """
+    call_command("build_factory_data")
+    factory, sprocket = Factory.objects.first(), Sprocket.objects.first()
+    before = SprocketProduction.objects.count()
+    response = Client().post(
+        reverse("ingest_sprocket_production"),
+        json.dumps(build_events(factory, sprocket, 5)),
+        "application/json",
+    )
+    data = response.json()
+    assert response.status_code == 200
+    assert (data["accepted"], data["rejected"], data["errors"]) == (5, 0, [])
+    assert SprocketProduction.objects.count() == before + 5
+
+
+@pytest.mark.django_db
+def test_ingest_ndjson_rejects_invalid_events(db):
+    """
+    Test that the invalid events of an NDJSON batch are rejected by index while the valid ones are
+    written.
+    """
+    call_command("build_factory_data")
+    factory, sprocket = Factory.objects.first(), Sprocket.objects.first()
+    events = build_events(factory, sprocket, 3)
+    events[1]["factory_id"] = 0
+    events[2]["date_produced"] = 1672567200
+    lines = [json.dumps(event) for event in events]
+    lines.insert(1, "{not json")
+    lines.append(json.dumps({"factory_id": factory.id}))
+
+    before = SprocketProduction.objects.count()
+    response = Client().post(
+        reverse("ingest_sprocket_production"),
+        "\n".join(lines),
+        "application/x-ndjson",
+    )
+    data = response.json()
+    assert (data["accepted"], data["rejected"]) == (2, 3)
+    assert [(error["index"], error["status"]) for error in data["errors"]] == [
+        (1, 400),
+        (2, 404),
+        (4, 400),
+    ]
+    assert SprocketProduction.objects.count() == before + 2
+
+
+def test_ingest_rejects_malformed_array():
+    """
+    Test that a malformed JSON array is rejected as a whole.
+    """
+    response = Client().post(
+        reverse("ingest_sprocket_production"), "[{", "application/json"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [("sprocket_actual", True), ("date_produced", True), ("sprocket_actual", 1.9)],
+)
+def test_ingest_rejects_bools_and_fractional_integers(name, value):
+    """
+    Test that the raw JSON values are validated before their conversion, a bool or a fractional
+    number isn't silently turned into an integer or a timestamp.
+    """
+    event = {
+        "factory_id": 1,
+        "sprocket_id": 1,
+        "sprocket_actual": 30,
+        "sprocket_goal": 32.0,
+        "date_produced": 1672567200.5,
+        name: value,
+    }
+    with pytest.raises(BadRequest):
+        event_to_row(event)
+    event[name] = 2 if name == "sprocket_actual" else 1672567200.5
+    row = event_to_row(event)
+    assert (row.sprocket_actual, row.sprocket_goal) == (event["sprocket_actual"], 32)
@@ -0,0 +1,68 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from app.metrics import ViewMetrics, registry
+from sprocket.models import Factory
+
+
+@pytest.mark.django_db
+def test_server_timing_and_metrics(db):
+    """
+    Test that every request gets a Server-Timing header and is aggregated under its view class.
+    """
+    call_command("build_factory_data")
+    registry.reset()
+    factory = Factory.objects.first()
+    client = Client()
+
+    response = client.get(reverse("get_sprocket_production"), {"size": 5})
+    timing = response["Server-Timing"]
+    assert timing.startswith("db;dur=") and "total;dur=" in timing
+    assert 'desc="0 queries"' not in timing
+    client.get(reverse("get_factory", args=[factory.id]))
+    client.get(reverse("get_factory", args=[factory.id]), {"fields": "unknown"})
+
+    views = client.get(reverse("get_api_metrics")).json()["views"]
+    production = views["GetSprocketProduction"]
+    assert production["requests"] == 1
+    assert production["rows"] == 5
+    assert production["avg_queries"] >= 1
+    assert production["response_bytes"] == len(response.content)
+    assert views["GetFactory"]["requests"] == 2
+    assert sum(views["GetFactory"]["histogram"].values()) == 2
+
+
+def test_latency_percentiles():
+    """
+    Test that the percentiles are read from the latency histogram.
+    """
+    metrics = ViewMetrics()
+    for _ in range(98):
+        metrics.add(0.003, 0.001, 1, 1, 100, 200)
+    metrics.add(0.2, 0.1, 4, 1, 100, 200)
+    metrics.add(7.5, 0.1, 4, 1, 100, 500)
+    data = metrics.to_dict()
+    assert data["p50_ms"] == 5
+    assert data["p99_ms"] == 250
+    assert metrics.percentile(1) == 7500.0
+    assert data["errors"] == 1
+    assert data["histogram"]["inf"] == 1
+
+
+@pytest.mark.django_db
+def test_streamed_export_metrics(db):
+    """
+    Test that an export is recorded once streamed, with the queries run while sending it.
+    """
+    call_command("build_factory_data")
+    registry.reset()
+    response = Client().get(reverse("export_sprocket_production"))
+    assert "ExportSprocketProduction" not in registry.to_dict()
+
+    body = b"".join(response.streaming_content)
+    export = registry.to_dict()["ExportSprocketProduction"]
+    assert export["requests"] == 1
+    assert export["avg_queries"] == 1
+    assert export["response_bytes"] == len(body)
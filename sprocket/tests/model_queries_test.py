@@ -0,0 +1,94 @@
+import warnings
+from datetime import datetime, timezone
+
+import pytest
+from django.test import Client
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import SprocketProduction
+from sprocket.utils.exceptions import BadRequest
+from sprocket.utils.model_queries import compile_query_spec
+from sprocket.views.sprocket_views import GetSprocketProduction
+
+ALLOWED = tuple(GetSprocketProduction.allowed_order_filters)
+DEFAULT = ("-date_created",)
+
+
+def test_compile_query_spec_coerces_and_whitelists():
+    """
+    Test that the values are converted to the field types and that the filters and orderings that
+    aren't allowed are ignored.
+    """
+    spec = compile_query_spec(
+        SprocketProduction,
+        ALLOWED,
+        "factory_id:3,sprocket__teeth__gt:4,date_produced__lt:2023-01-01T10:00:00,password:x",
+        "sprocket_actual,-id,sprocket__teeth__lt,-secret",
+        DEFAULT,
+    )
+    assert spec.filters == (
+        ("factory_id", 3),
+        ("sprocket__teeth__gt", 4),
+        ("date_produced__lt", datetime(2023, 1, 1, 10, tzinfo=timezone.utc)),
+    )
+    assert spec.ordering == ("sprocket_actual", "-id")
+    assert hash(spec)
+
+
+def test_compile_query_spec_is_memoized():
+    """
+    Test that the same parameters reuse the compiled spec.
+    """
+    compile_query_spec.cache_clear()
+    first = compile_query_spec(SprocketProduction, ALLOWED, "factory_id:1", "", DEFAULT)
+    second = compile_query_spec(
+        SprocketProduction, ALLOWED, "factory_id:1", "", DEFAULT
+    )
+    assert first is second
+    assert first.ordering == DEFAULT
+    assert compile_query_spec.cache_info().hits == 1
+
+
+@pytest.mark.django_db
+def test_naive_datetime_filter_is_utc(db):
+    """
+    Test that a `date_produced` filter without an offset is read as UTC, the same as on the
+    aggregations, instead of being compared as a naive datetime.
+    """
+    call_command("build_factory_data")
+    since = SprocketProduction.objects.order_by("date_produced")[30].date_produced
+    naive = since.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    spec = compile_query_spec(
+        SprocketProduction, ALLOWED, f"date_produced__gte:{naive}", "", DEFAULT
+    )
+    assert spec.filters == (("date_produced__gte", since),)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        count = spec.apply(SprocketProduction.objects.all()).count()
+    assert count == SprocketProduction.objects.filter(date_produced__gte=since).count()
+
+
+@pytest.mark.parametrize("filter_param", ["factory_id:abc", "sprocket_goal"])
+def test_compile_query_spec_rejects_invalid_filters(filter_param):
+    """
+    Test that malformed conditions and values are rejected.
+    """
+    with pytest.raises(BadRequest):
+        compile_query_spec(SprocketProduction, ALLOWED, filter_param, "", DEFAULT)
+
+
+@pytest.mark.django_db
+def test_multi_key_ordering(db):
+    """
+    Test that every ordering condition is applied, not only the last one.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    data = (
+        Client()
+        .get(url, {"order": "factory_id,-sprocket_actual", "size": 60})
+        .json()["data"]
+    )
+    keys = [(row["factory_id"], -row["sprocket_actual"]) for row in data]
+    assert keys == sorted(keys)
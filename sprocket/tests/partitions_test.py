@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+
+from sprocket.models import SprocketProduction
+from sprocket.utils.partitions import (
+    PARTITIONED_TABLE,
+    add_months,
+    create_partition_sql,
+    detach_partition_sql,
+    is_partitioned,
+    month_range,
+    month_start,
+    partition_bounds,
+    partition_month,
+    partition_name,
+)
+
+
+def test_month_helpers():
+    """
+    Test the month arithmetic behind the partition ranges.
+    """
+    january = month_start(datetime(2024, 1, 31, 23, 59, tzinfo=timezone.utc))
+    assert january == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert add_months(january, -1) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+    assert add_months(january, 13) == datetime(2025, 2, 1, tzinfo=timezone.utc)
+    assert month_range(datetime(2023, 11, 5), datetime(2024, 2, 1)) == [
+        datetime(2023, 11, 1, tzinfo=timezone.utc),
+        datetime(2023, 12, 1, tzinfo=timezone.utc),
+        january,
+        datetime(2024, 2, 1, tzinfo=timezone.utc),
+    ]
+
+
+def test_partition_names():
+    """
+    Test that the month of a partition is read back from its name, other tables are ignored.
+    """
+    month = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert partition_name(month) == f"{PARTITIONED_TABLE}_p202403"
+    assert partition_month(partition_name(month)) == month
+    assert partition_month(f"{PARTITIONED_TABLE}_default") is None
+    assert partition_month(f"{PARTITIONED_TABLE}_p202413") is None
+    assert partition_bounds(datetime(2024, 12, 1, tzinfo=timezone.utc)) == (
+        "'2024-12-01 00:00:00+00'",
+        "'2025-01-01 00:00:00+00'",
+    )
+
+
+def test_partition_statements():
+    """
+    Test that a new partition picks up the rows of its month from the default partition before
+    being attached, and that the detached ones are archived or dropped.
+    """
+    statements = create_partition_sql(datetime(2024, 3, 1, tzinfo=timezone.utc))
+    assert "DELETE FROM" in statements[1] and "_default" in statements[1]
+    assert statements[3].endswith(
+        "FOR VALUES FROM ('2024-03-01 00:00:00+00') TO ('2024-04-01 00:00:00+00')"
+    )
+
+    name = f"{PARTITIONED_TABLE}_p202001"
+    assert len(detach_partition_sql(name)) == 1
+    assert detach_partition_sql(name, drop=True)[-1] == f'DROP TABLE "{name}"'
+    assert detach_partition_sql(name, archive_schema="archive")[-1] == (
+        f'ALTER TABLE "{name}" SET SCHEMA "archive"'
+    )
+
+
+def test_sqlite_fallback(db):
+    """
+    Test that the production table stays a plain table outside of PostgreSQL and the command
+    leaves it alone.
+    """
+    assert not is_partitioned(connection)
+    stderr = StringIO()
+    call_command("manage_production_partitions", stderr=stderr)
+    assert "nothing to do" in stderr.getvalue()
+    assert SprocketProduction.objects.count() == 0
@@ -0,0 +1,87 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.db import connection
+from django.urls import reverse
+
+from app.metrics import track_query
+from app.middleware import install_query_tracker
+from sprocket.models import Factory, Sprocket
+from sprocket.utils.query_inspector import (
+    QueryInspector,
+    inspect_queries,
+    inspector_reports,
+    query_shape,
+)
+
+
+def test_query_shape():
+    """
+    Test that statements only differing on their parameters share the same shape.
+    """
+    first = query_shape("SELECT * FROM t WHERE id = 1 AND name = 'a' LIMIT 21")
+    second = query_shape("SELECT *  FROM t WHERE id = 42 AND name = 'it''s' LIMIT 21")
+    assert first == second == "SELECT * FROM t WHERE id = ? AND name = ? LIMIT ?"
+    assert query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s)") == query_shape(
+        "SELECT * FROM t WHERE id IN (%s, %s)"
+    )
+
+
+@pytest.mark.django_db
+def test_query_budget_per_endpoint(db, query_budget):
+    """
+    Test the maximum amount of queries every read endpoint runs.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    sprocket = Sprocket.objects.first()
+    client = Client()
+    client.get(reverse("get_sprocket_production"), {"size": 50})
+    client.get(reverse("get_sprocket_production"), {"cursor": "", "size": 50})
+    client.get(reverse("get_factory", args=[factory.id]))
+    client.get(
+        reverse("get_factory", args=[factory.id]),
+        {"include": "sprockets,recent_production,summary"},
+    )
+    client.get(reverse("get_sprocket", args=[sprocket.id]))
+    client.get(reverse("get_sprocket_production_aggregate"), {"bucket": "day"})
+
+    query_budget.assert_max_queries("GetSprocketProduction", 3)
+    query_budget.assert_max_queries("GetFactory", 3)
+    query_budget.assert_max_queries("GetSprocket", 1)
+    query_budget.assert_max_queries("GetSprocketProductionAggregate", 1)
+    for endpoint in ("GetSprocketProduction", "GetFactory", "GetSprocket"):
+        query_budget.assert_no_repeated_queries(endpoint)
+
+
+@pytest.mark.django_db
+def test_detects_repeated_queries(db, settings):
+    """
+    Test that a request running the same query once per row is reported as a possible N+1.
+    """
+    settings.QUERY_INSPECTOR_REPEATED_THRESHOLD = 3
+    inspector_reports.reset()
+    call_command("build_factory_data")
+    ids = list(Factory.objects.values_list("id", flat=True))
+
+    def n_plus_one():
+        return [Factory.objects.get(id=pk).name for pk in ids]
+
+    inspect_queries("Loop", n_plus_one)
+    report = inspector_reports.get("Loop")
+    assert report["max_queries"] == len(ids)
+    assert list(report["repeated"].values()) == [len(ids)]
+    inspector_reports.reset()
+
+
+def test_inspector_leaves_the_query_tracker_installed(monkeypatch):
+    """
+    Test that a connection opened while the inspector is active keeps the timing tracker, and
+    doesn't keep the inspector, once the inspector exits.
+    """
+    monkeypatch.setattr(connection, "execute_wrappers", [])
+    with QueryInspector("Opened") as inspector:
+        # connection_created while the inspector is active
+        install_query_tracker(connection=connection)
+    assert connection.execute_wrappers == [track_query]
+    assert inspector not in connection.execute_wrappers
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from app.db.router import PRIMARY_PIN_COOKIE, ReplicaRouter, replica_reads
+from sprocket.models import Sprocket, SprocketProduction
+from sprocket.utils.query_inspector import inspector_reports
+
+
+@pytest.fixture
+def replica(db, settings, tmp_path, django_db_blocker):
+    """
+    Adds an empty SQLite database standing in for a replica that didn't replicate anything yet.
+    """
+    connections.settings["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(tmp_path / "replica.sqlite3"),
+    }
+    connections.ensure_defaults("replica")
+    connections.prepare_test_settings("replica")
+    settings.DATABASE_REPLICAS = ["replica"]
+    with django_db_blocker.unblock():
+        call_command("migrate", database="replica", verbosity=0)
+        yield "replica"
+        connections["replica"].close()
+    del connections["replica"]
+    del connections.settings["replica"]
+
+
+def test_router_decisions(settings):
+    """
+    Test that only the reads allowed by `replica_reads` go to the replicas.
+    """
+    settings.DATABASE_REPLICAS = ["replica"]
+    router = ReplicaRouter()
+    assert router.db_for_read(Sprocket) == "default"
+    with replica_reads():
+        assert router.db_for_read(Sprocket) == "replica"
+        assert router.db_for_write(Sprocket) == "default"
+        with replica_reads(False):
+            assert router.db_for_read(Sprocket) == "default"
+    settings.DATABASE_REPLICAS = []
+    with replica_reads():
+        assert router.db_for_read(Sprocket) == "default"
+
+
+def test_reads_go_to_the_replica_until_the_client_writes(replica):
+    """
+    Test that the lists read the replica, and that a client reads its own writes from the primary
+    right after writing.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    client = Client()
+    # The replica is empty, the primary has the fixtures
+    assert client.get(url).json()["data"] == []
+
+    payload = {"teeth": 5, "pitch_diameter": 5, "outside_diameter": 6, "pitch": 1}
+    response = client.post(
+        reverse("new_sprocket"), json.dumps(payload), "application/json"
+    )
+    assert response.status_code == 200
+    assert response.cookies[PRIMARY_PIN_COOKIE]["max-age"] == 5
+    assert SprocketProduction.objects.using("replica").count() == 0
+    assert len(client.get(url).json()["data"]) == 10
+
+    # Other clients keep reading the replica
+    assert Client().get(url).json()["data"] == []
+
+
+def test_cached_detail_is_read_from_the_primary(replica):
+    """
+    Test that the detail bodies shared through the cache are never read from a replica, the empty
+    replica would answer a 500.
+    """
+    call_command("build_factory_data")
+    sprocket = Sprocket.objects.first()
+    response = Client().get(reverse("get_sprocket", args=[sprocket.id]))
+    assert response.json()["data"]["id"] == sprocket.id
+
+
+def test_streamed_export_reads_the_replica(replica, settings):
+    """
+    Test that the rows of an export, read while the response is streamed, come from the replica
+    picked while the request was dispatched.
+    """
+    settings.QUERY_INSPECTOR_ENABLED = True
+    inspector_reports.reset()
+    call_command("build_factory_data")
+    response = Client().get(reverse("export_sprocket_production"))
+    aliases = []
+
+    def record_alias(execute, sql, params, many, context):
+        aliases.append(context["connection"].alias)
+        return execute(sql, params, many, context)
+
+    with connections["default"].execute_wrapper(record_alias):
+        with connections["replica"].execute_wrapper(record_alias):
+            body = b"".join(response.streaming_content)
+    # The replica is empty, the primary has the fixtures
+    assert body == b""
+    assert aliases == ["replica"]
+    assert inspector_reports.get("ExportSprocketProduction")["queries"] == 1
+    inspector_reports.reset()
+
+
+def test_replica_count_is_not_served_to_the_primary_clients(replica):
+    """
+    Test that the count cached from a lagging replica isn't reused for a client reading the
+    primary.
+    """
+    call_command("build_factory_data")
+    url = reverse("get_sprocket_production")
+    params = {"size": 5, "count": "exact"}
+    # The replica is empty, a single page
+    assert Client().get(url, params).json()["total_pages"] == 1
+
+    pinned = Client()
+    pinned.cookies[PRIMARY_PIN_COOKIE] = "1"
+    assert pinned.get(url, params).json()["total_pages"] == 12
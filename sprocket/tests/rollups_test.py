@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.test import Client, override_settings
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import (
+    Factory,
+    ProductionChunk,
+    ProductionRollup,
+    RollupDirtyBucket,
+    SprocketProduction,
+)
+
+
+def get_aggregate(params):
+    """
+    Helper function to call the aggregation endpoint.
+    """
+    url = reverse("get_sprocket_production_aggregate")
+    response = Client().get(url, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_rollups_are_built_on_ingest(db):
+    """
+    Test that the bulk loader refreshes the hourly and daily rollups.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.get(name="Factory 2")
+    hourly = ProductionRollup.objects.filter(
+        granularity=ProductionRollup.HOUR, factory=factory
+    ).order_by("bucket_start")
+    assert [rollup.rows for rollup in hourly] == [7, 13]
+    daily = ProductionRollup.objects.get(
+        granularity=ProductionRollup.DAY, factory=factory
+    )
+    assert daily.rows == 20
+    assert daily.sprocket_actual_sum == 608
+    assert daily.sprocket_goal_sum == 605
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"bucket": "hour"},
+        {"bucket": "day", "group_by": "factory_id"},
+        {"bucket": "week", "group_by": "factory_id,sprocket_id"},
+        {"bucket": "hour", "filter": "date_produced__gte:2021-01-21T05:00:00Z"},
+    ],
+)
+def test_rollup_aggregations_match_production(db, params):
+    """
+    Test that the aggregations served from the rollups are the same computed from the rows.
+    """
+    call_command("build_factory_data")
+    from_rollups = get_aggregate(params)
+    with override_settings(ROLLUP_ROUTING_ENABLED=False):
+        from_production = get_aggregate(params)
+    assert from_rollups["source"].startswith("rollup_")
+    assert from_production["source"] == "production"
+    assert from_rollups["data"] == pytest.approx(from_production["data"])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, source",
+    [
+        ({"bucket": "minute"}, "production"),
+        ({"bucket": "day"}, "rollup_day"),
+        (
+            {"bucket": "day", "filter": "date_produced__gte:2021-01-21T04:00:00Z"},
+            "rollup_hour",
+        ),
+        (
+            {"bucket": "day", "filter": "date_produced__gt:2021-01-21T04:00:00Z"},
+            "production",
+        ),
+        (
+            {"bucket": "hour", "filter": "date_produced__lt:2021-01-21T04:30:00Z"},
+            "production",
+        ),
+    ],
+)
+def test_rollup_routing(db, params, source):
+    """
+    Test that the aggregations are routed to the coarsest rollup able to answer them.
+    """
+    assert get_aggregate(params)["source"] == source
+
+
+@pytest.mark.django_db
+def test_rollups_follow_production_updates(db):
+    """
+    Test that saving a production row refreshes its old and new buckets.
+    """
+    call_command("build_factory_data")
+    production = SprocketProduction.objects.order_by("date_produced").first()
+    old_hour = {
+        "granularity": ProductionRollup.HOUR,
+        "factory_id": production.factory_id,
+        "bucket_start": production.date_produced.replace(minute=0, second=0),
+    }
+    assert ProductionRollup.objects.get(**old_hour).rows == 20
+    production.date_produced += timedelta(days=3)
+    production.save()
+
+    assert ProductionRollup.objects.get(**old_hour).rows == 19
+    moved = ProductionRollup.objects.get(
+        granularity=ProductionRollup.DAY,
+        factory_id=production.factory_id,
+        bucket_start=production.date_produced.replace(hour=0, minute=0, second=0),
+    )
+    assert moved.rows == 1
+    assert moved.sprocket_actual_sum == production.sprocket_actual
+
+
+@pytest.mark.django_db
+@override_settings(ROLLUP_REFRESH_ON_WRITE=False)
+def test_refresh_rollups_command(db):
+    """
+    Test that the dirty buckets are refreshed by the refresh_rollups command.
+    """
+    call_command("build_factory_data")
+    assert ProductionRollup.objects.count() == 0
+    assert RollupDirtyBucket.objects.count() == 4
+
+    call_command("refresh_rollups")
+    assert RollupDirtyBucket.objects.count() == 0
+    assert (
+        ProductionRollup.objects.filter(granularity=ProductionRollup.HOUR).count() == 4
+    )
+    assert (
+        ProductionRollup.objects.filter(granularity=ProductionRollup.DAY).count() == 3
+    )
+
+    call_command("refresh_rollups", full=True)
+    assert ProductionRollup.objects.count() == 7
+
+
+@pytest.mark.django_db
+def test_refreshes_lock_the_pair_on_postgresql(db, monkeypatch):
+    """
+    Test that every refresh takes the advisory lock of its factory and sprocket, in pair order, so
+    concurrent writers of the same buckets wait for each other instead of failing on the unique
+    constraint.
+    """
+    from django.db import connection
+
+    from sprocket.utils.rollups import refresh_hours
+
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    locks = []
+
+    def fake_lock(execute, sql, params, many, context):
+        if "pg_advisory_xact_lock" in sql:
+            locks.append(params[0])
+            return None
+        return execute(sql, params, many, context)
+
+    monkeypatch.setattr(connection, "vendor", "postgresql")
+    hour = factory.last_produced_at.replace(minute=0, second=0, microsecond=0)
+    with connection.execute_wrapper(fake_lock):
+        refresh_hours({(factory.id, 2): [hour], (factory.id, 1): [hour]})
+    assert locks == sorted(locks) and len(set(locks)) == 2
+    assert all(-(1 << 63) <= key < (1 << 63) for key in locks)
+
+
+@pytest.mark.django_db
+def test_derived_tables_are_fast_deleted(db):
+    """
+    Test that no signal receiver listens to the rollup tables, so their bulk deletes are a single
+    DELETE statement instead of loading every row.
+    """
+    collector = Collector(using=connection.alias)
+    for model in (ProductionRollup, ProductionChunk, RollupDirtyBucket):
+        assert collector.can_fast_delete(model.objects.all())
+    assert not collector.can_fast_delete(SprocketProduction.objects.all())
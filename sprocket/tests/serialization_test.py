@@ -0,0 +1,52 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import override_settings
+
+from sprocket.utils import serialization
+from sprocket.utils.serialization import EnvelopeResponse, json_dumps
+
+PAYLOAD = {
+    "data": [
+        {
+            "date_produced": datetime(
+                2021, 1, 21, 2, 6, 58, 123456, tzinfo=timezone.utc
+            ),
+            "outside_diameter": Decimal("6.25"),
+            "uuid": uuid.UUID("12345678123456781234567812345678"),
+            "factory__name": "Factory 1",
+            "sprocket_actual": 32,
+            "pitch_diameter": 5.5,
+        }
+    ],
+    "total_pages": 1,
+}
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_encoder_backends_match_django_encoder(backend):
+    """
+    Test that every encoder backend produces the same document DjangoJSONEncoder does.
+    """
+    if backend == "orjson" and serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    with override_settings(JSON_ENCODER_BACKEND=backend):
+        encoded = json_dumps(PAYLOAD)
+    assert json.loads(encoded) == json.loads(json.dumps(PAYLOAD, cls=DjangoJSONEncoder))
+    assert json.loads(encoded)["data"][0]["date_produced"] == "2021-01-21T02:06:58.123Z"
+
+
+def test_envelope_response_adds_success():
+    """
+    Test that the envelope response encodes the payload together with the success flag.
+    """
+    response = EnvelopeResponse(PAYLOAD)
+    assert response["Content-Type"] == "application/json"
+    data = json.loads(response.content)
+    assert data["success"] == True
+    assert data["total_pages"] == 1
+    assert json.loads(EnvelopeResponse({}, success=False).content) == {"success": False}
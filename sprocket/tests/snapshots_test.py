@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.models import Count, Max, Sum
+from django.test import Client
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from sprocket.models import Factory, Sprocket, SprocketProduction
+from sprocket.utils.ingest import bulk_ingest
+
+
+def expected_snapshot(factory):
+    """
+    Helper function to compute the snapshot of a factory from its production rows.
+    """
+    rows = SprocketProduction.objects.filter(factory=factory, deleted=False)
+    totals = rows.aggregate(
+        count=Count("id"),
+        goal=Sum("sprocket_goal"),
+        actual=Sum("sprocket_actual"),
+        last=Max("date_produced"),
+    )
+    latest = rows.filter(date_produced=totals["last"]).order_by("-id").first()
+    return {
+        "production_count": totals["count"],
+        "total_sprocket_goal": totals["goal"],
+        "total_sprocket_actual": totals["actual"],
+        "last_produced_at": totals["last"],
+        "sprocket_goal": latest.sprocket_goal,
+        "sprocket_actual": latest.sprocket_actual,
+    }
+
+
+def snapshot(factory):
+    """
+    Helper function to read the stored snapshot of a factory.
+    """
+    factory.refresh_from_db()
+    return {key: getattr(factory, key) for key in expected_snapshot(factory)}
+
+
+@pytest.mark.django_db
+def test_bulk_loader_builds_the_snapshot(db):
+    """
+    Test that the bulk loader keeps the snapshot of every factory in sync.
+    """
+    call_command("build_factory_data")
+    for factory in Factory.objects.all():
+        assert snapshot(factory) == expected_snapshot(factory)
+
+
+@pytest.mark.django_db
+def test_new_production_updates_the_snapshot(db):
+    """
+    Test that saving a newer row replaces the latest values and that an older one only adds to the
+    totals, the factory detail serving the fresh values.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    url = reverse("get_factory", args=[factory.id])
+    before = Client().get(url).json()["data"]
+
+    latest = SprocketProduction.objects.filter(factory=factory).latest("date_produced")
+    SprocketProduction(
+        factory=factory,
+        sprocket_id=latest.sprocket_id,
+        sprocket_goal=40,
+        sprocket_actual=41,
+        date_produced=latest.date_produced + timedelta(minutes=1),
+    ).save()
+    SprocketProduction(
+        factory=factory,
+        sprocket_id=latest.sprocket_id,
+        sprocket_goal=1,
+        sprocket_actual=2,
+        date_produced=latest.date_produced - timedelta(days=1),
+    ).save()
+
+    data = Client().get(url).json()["data"]
+    assert data["production_count"] == before["production_count"] + 2
+    assert data["total_sprocket_actual"] == before["total_sprocket_actual"] + 43
+    assert (data["sprocket_goal"], data["sprocket_actual"]) == (40, 41)
+    assert snapshot(factory) == expected_snapshot(factory)
+
+
+@pytest.mark.django_db
+def test_refresh_factory_snapshots(db):
+    """
+    Test that the command recomputes the snapshots after rows are soft deleted.
+    """
+    call_command("build_factory_data")
+    factory = Factory.objects.first()
+    SprocketProduction.objects.filter(
+        id__in=SprocketProduction.objects.filter(factory=factory).values("id")[:5]
+    ).update(deleted=True)
+    url = reverse("get_factory", args=[factory.id])
+    etag = Client().get(url)["ETag"]
+    last_updated = factory.last_updated
+
+    with CaptureQueriesContext(connection) as queries:
+        call_command("refresh_factory_snapshots")
+    # One query reads every snapshot, whatever the amount of factories
+    reads = [query for query in queries if query["sql"].startswith("SELECT")]
+    assert len(reads) == 1
+    assert snapshot(factory) == expected_snapshot(factory)
+    assert snapshot(factory)["production_count"] == 15
+    # The validators of the detail follow the new snapshot
+    assert factory.last_updated > last_updated
+    assert Client().get(url)["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_soft_delete_updates_the_snapshot(db):
+    """
+    Test that soft deleting the latest row and moving a row to another factory recompute the
+    snapshots of the factories involved.
+    """
+    call_command("build_factory_data")
+    factory, other = Factory.objects.all()[:2]
+    latest = SprocketProduction.objects.filter(factory=factory).latest("date_produced")
+    latest.deleted = True
+    latest.save()
+    assert snapshot(factory) == expected_snapshot(factory)
+    assert snapshot(factory)["production_count"] == 19
+
+    row = SprocketProduction.objects.filter(factory=factory, deleted=False).first()
+    row.factory = other
+    row.save()
+    assert snapshot(factory) == expected_snapshot(factory)
+    assert snapshot(other) == expected_snapshot(other)
+    assert snapshot(other)["production_count"] == 21
+
+
+@pytest.mark.django_db
+def test_bulk_loader_updates_the_snapshot_once(db):
+    """
+    Test that a load split in batches updates every factory once, in the order of their ids.
+    """
+    call_command("build_factory_data")
+    factories = list(Factory.objects.order_by("-id"))
+    sprocket = Sprocket.objects.first()
+    rows = [
+        SprocketProduction(
+            factory=factory, sprocket=sprocket, sprocket_goal=1, sprocket_actual=1
+        )
+        for _ in range(3)
+        for factory in factories
+    ]
+    with CaptureQueriesContext(connection) as queries:
+        bulk_ingest(rows, batch_size=2)
+    table = Factory._meta.db_table
+    updates = [q["sql"] for q in queries if q["sql"].startswith(f'UPDATE "{table}"')]
+    assert len(updates) == len(factories)
+    ids = [factory.id for factory in factories]
+    assert [int(sql.rsplit("= ", 1)[1].split()[0]) for sql in updates] == sorted(ids)
+    for factory in factories:
+        assert snapshot(factory) == expected_snapshot(factory)
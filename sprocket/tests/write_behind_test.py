@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+
+import pytest
+from django.test import Client, override_settings
+from django.core.management import call_command
+from django.urls import reverse
+
+from sprocket.models import Factory, Sprocket, SprocketProduction
+from sprocket.utils import write_behind
+from sprocket.utils.exceptions import TooManyRequests
+from sprocket.utils.write_behind import WriteBehindBuffer
+
+
+class RecordingWriter:
+    """
+    Helper writer that keeps the flushed batches instead of writing them.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.written = threading.Event()
+
+    def __call__(self, rows):
+        self.batches.append(rows)
+        self.written.set()
+
+
+def test_flush_on_size():
+    """
+    Test that the background thread flushes as soon as `flush_size` rows are pending.
+    """
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(100, 3, 60, writer=writer)
+    buffer.put([1, 2])
+    buffer.put([3])
+    assert writer.written.wait(5)
+    assert writer.batches == [[1, 2, 3]]
+    assert buffer.depth == 0
+    buffer.close()
+
+
+def test_flush_on_interval():
+    """
+    Test that the pending rows are flushed once the interval elapses.
+    """
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(100, 50, 0.05, writer=writer)
+    buffer.put([1])
+    assert writer.written.wait(5)
+    assert writer.batches == [[1]]
+    assert buffer.to_dict()["max_wait_ms"] >= 50
+    buffer.close()
+
+
+def test_backpressure_and_shutdown_flush():
+    """
+    Test that a full buffer refuses new rows and that closing it writes the pending ones.
+    """
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(3, 50, 60, writer=writer)
+    buffer.put([1, 2])
+    with pytest.raises(TooManyRequests):
+        buffer.put([3, 4])
+    assert buffer.to_dict()["rejected_rows"] == 2
+
+    buffer.close()
+    assert writer.batches == [[1, 2]]
+    with pytest.raises(TooManyRequests):
+        buffer.put([5])
+
+
+def test_failed_flush_keeps_the_rows():
+    """
+    Test that the rows of a failed flush are queued again.
+    """
+
+    def failing_writer(rows):
+        raise RuntimeError("database unavailable")
+
+    buffer = WriteBehindBuffer(10, 50, 60, writer=failing_writer)
+    buffer._pending.extend((time.monotonic(), row) for row in [1, 2])
+    assert buffer.flush() == 0
+    assert buffer.depth == 2
+    assert buffer.to_dict()["flush_errors"] == 1
+
+
+def test_failed_flushes_back_off():
+    """
+    Test that the background thread waits longer and longer before retrying a failed flush.
+    """
+    calls = []
+
+    def failing_writer(rows):
+        calls.append(time.monotonic())
+        raise RuntimeError("database unavailable")
+
+    buffer = WriteBehindBuffer(10, 1, 0.01, writer=failing_writer, retry_backoff=0.1)
+    buffer.put([1])
+    time.sleep(0.5)
+    # Retried after 0.1s, 0.2s and then 0.4s
+    assert 2 <= len(calls) <= 4
+    assert calls[-1] - calls[0] >= 0.3
+    buffer.writer = RecordingWriter()
+    buffer._retry_at = 0.0
+    buffer.close()
+    assert buffer.writer.batches == [[1]]
+
+
+def test_rows_that_keep_failing_are_dead_lettered():
+    """
+    Test that after `max_retries` failures the rows of the batch are written one by one and the one
+    that can't be written doesn't block the others.
+    """
+    written = []
+
+    def writer(rows):
+        if "bad" in rows:
+            raise RuntimeError("violates foreign key constraint")
+        written.extend(rows)
+
+    buffer = WriteBehindBuffer(10, 50, 60, writer=writer, max_retries=1)
+    buffer._pending.extend((time.monotonic(), row) for row in [1, "bad", 2])
+    assert buffer.flush() == 0
+    assert buffer.depth == 3
+    assert buffer.flush() == 2
+    assert written == [1, 2]
+    assert list(buffer.dead_letter) == ["bad"]
+    assert buffer.depth == 0
+    assert buffer.to_dict()["dead_letter_rows"] == 1
+
+
+@pytest.mark.django_db
+def test_ingest_endpoint_with_write_behind(db, monkeypatch):
+    """
+    Test that the ingest endpoint queues the rows (202) and answers 429 when the buffer is full.
+    """
+    call_command("build_factory_data")
+    factory, sprocket = Factory.objects.first(), Sprocket.objects.first()
+    buffer = WriteBehindBuffer(2, 50, 60, writer=RecordingWriter())
+    buffer.start = lambda: None
+    monkeypatch.setattr(write_behind, "_buffer", buffer)
+    event = {
+        "factory_id": factory.id,
+        "sprocket_id": sprocket.id,
+        "sprocket_actual": 30,
+        "sprocket_goal": 32,
+        "date_produced": "2023-01-01T10:00:00Z",
+    }
+    url = reverse("ingest_sprocket_production")
+    before = SprocketProduction.objects.count()
+
+    with override_settings(INGEST_WRITE_BEHIND=True):
+        response = Client().post(url, json.dumps([event, event]), "application/json")
+        assert response.status_code == 202
+        assert response.json()["buffered"] == True
+        assert SprocketProduction.objects.count() == before
+
+        response = Client().post(url, json.dumps([event]), "application/json")
+        assert response.status_code == 429
+        status = Client().get(reverse("get_api_status")).json()
+        assert status["ingest_buffer"]["depth"] == 2
@@ -1,23 +1,76 @@
+from django.conf import settings
 from django.urls import path
 
-from sprocket.views import ApiStatusView
+from sprocket.views import ApiMetricsView, ApiStatusView
 from sprocket.views.sprocket_views import (
+    ExportSprocketProduction,
+    GetSprocketProductionAggregate,
     GetSprocketProduction,
     GetSprocket,
+    IngestSprocketProduction,
     PostSprocket,
+    PostSprocketBatch,
     PutSprocket,
+    PutSprocketBatch,
 )
-from sprocket.views.factory_views import GetFactory
+from sprocket.views.factory_views import GetFactory, GetFactoryChart
+
+if settings.ASYNC_VIEWS:
+    from sprocket.views.async_views import (
+        AsyncApiMetricsView as ApiMetricsView,
+        AsyncApiStatusView as ApiStatusView,
+        AsyncGetFactory as GetFactory,
+        AsyncGetFactoryChart as GetFactoryChart,
+        AsyncGetSprocket as GetSprocket,
+        AsyncGetSprocketProduction as GetSprocketProduction,
+        AsyncGetSprocketProductionAggregate as GetSprocketProductionAggregate,
+        AsyncIngestSprocketProduction as IngestSprocketProduction,
+        AsyncPostSprocket as PostSprocket,
+        AsyncPostSprocketBatch as PostSprocketBatch,
+        AsyncPutSprocket as PutSprocket,
+        AsyncPutSprocketBatch as PutSprocketBatch,
+    )
 
 urlpatterns = [
     path("status/", ApiStatusView.as_view(), name="get_api_status"),
+    path("metrics/", ApiMetricsView.as_view(), name="get_api_metrics"),
     path(
         "factory/sprockets",
         GetSprocketProduction.as_view(),
         name="get_sprocket_production",
     ),
+    path(
+        "factory/sprockets/export",
+        ExportSprocketProduction.as_view(),
+        name="export_sprocket_production",
+    ),
+    path(
+        "factory/sprockets/aggregate",
+        GetSprocketProductionAggregate.as_view(),
+        name="get_sprocket_production_aggregate",
+    ),
+    path(
+        "factory/sprockets/ingest",
+        IngestSprocketProduction.as_view(),
+        name="ingest_sprocket_production",
+    ),
     path("factory/<int:id>", GetFactory.as_view(), name="get_factory"),
+    path(
+        "factory/<int:id>/chart",
+        GetFactoryChart.as_view(),
+        name="get_factory_chart",
+    ),
     path("sprocket/<int:id>", GetSprocket.as_view(), name="get_sprocket"),
     path("sprocket/create", PostSprocket.as_view(), name="new_sprocket"),
     path("sprocket/update/<int:id>", PutSprocket.as_view(), name="update_sprocket"),
+    path(
+        "sprocket/batch/create",
+        PostSprocketBatch.as_view(),
+        name="new_sprocket_batch",
+    ),
+    path(
+        "sprocket/batch/update",
+        PutSprocketBatch.as_view(),
+        name="update_sprocket_batch",
+    ),
 ]
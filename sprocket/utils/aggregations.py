@@ -0,0 +1,113 @@
+from datetime import timezone
+
+from django.db.models import Avg, Count, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import (
+    Cast,
+    NullIf,
+    TruncDay,
+    TruncHour,
+    TruncMinute,
+    TruncWeek,
+)
+from django.utils.dateparse import parse_datetime
+
+from sprocket.utils.exceptions import BadRequest
+
+BUCKET_FUNCTIONS = {
+    "minute": TruncMinute,
+    "hour": TruncHour,
+    "day": TruncDay,
+    "week": TruncWeek,
+}
+GROUP_BY_FIELDS = ("factory_id", "sprocket_id")
+
+
+def production_aggregates():
+    """
+    The function returns the aggregate expressions computed for every bucket of production.
+
+    :return: a dictionary with the aggregate expressions by output name.
+    """
+    aggregates = {"rows": Count("id")}
+    for field in ("sprocket_actual", "sprocket_goal"):
+        aggregates.update(
+            {
+                f"{field}_sum": Sum(field),
+                f"{field}_avg": Avg(field, output_field=FloatField()),
+                f"{field}_min": Min(field),
+                f"{field}_max": Max(field),
+            }
+        )
+    # Ratio between what was made and the goal, NULL when there was no goal at all
+    aggregates["attainment"] = Cast(Sum("sprocket_actual"), FloatField()) / NullIf(
+        Cast(Sum("sprocket_goal"), FloatField()), Value(0.0)
+    )
+    return aggregates
+
+
+def parse_aggregation_params(body):
+    """
+    The function validates the bucket and group_by parameters of an aggregation request.
+
+    :param body: The `body` parameter is a dictionary with the query parameters of the request
+    :return: a tuple with the bucket name and the list of group by fields.
+    """
+    bucket = body.get("bucket", "hour")
+    if bucket not in BUCKET_FUNCTIONS:
+        raise BadRequest(
+            "The bucket parameter must be one of: " + ",".join(BUCKET_FUNCTIONS)
+        )
+    group_by = [field for field in body.get("group_by", "").split(",") if field]
+    if any(field not in GROUP_BY_FIELDS for field in group_by):
+        raise BadRequest(
+            "The group_by parameter only accepts: " + ",".join(GROUP_BY_FIELDS)
+        )
+    return bucket, group_by
+
+
+def parse_aggregation_filters(allowed_filters, filter_param):
+    """
+    The function parses the `filter` parameter of an aggregation request, the `date_produced`
+    conditions are split from the rest since they decide which rollup can answer the request.
+
+    :param allowed_filters: A list with the filters the view accepts
+    :param filter_param: The comma separated `key:value` conditions sent by the client
+    :return: a tuple with the dictionary of filters and the dictionary of `date_produced` lookups
+    to aware datetimes.
+    """
+    filters, date_filters = {}, {}
+    for condition in filter(None, filter_param.split(",")):
+        key, _, value = condition.partition(":")
+        if key not in allowed_filters:
+            continue
+        if key.startswith("date_produced__"):
+            date = parse_datetime(value.strip())
+            if date is None:
+                raise BadRequest(f"Invalid datetime provided for {key}")
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            date_filters[key[len("date_produced__") :]] = date
+        else:
+            try:
+                filters[key] = int(value)
+            except ValueError:
+                raise BadRequest(f"Invalid id provided for {key}")
+    return filters, date_filters
+
+
+def aggregate_production(queryset, bucket, group_by=()):
+    """
+    The function groups the production rows by time bucket (and optionally by factory and/or
+    sprocket) computing the aggregates in the database.
+
+    :param queryset: The filtered `SprocketProduction` queryset
+    :param bucket: One of `minute`, `hour`, `day` or `week`
+    :param group_by: An iterable with `factory_id` and/or `sprocket_id`
+    :return: a list of dictionaries, one per bucket and group, ordered by bucket.
+    """
+    return list(
+        queryset.annotate(bucket=BUCKET_FUNCTIONS[bucket]("date_produced"))
+        .values("bucket", *group_by)
+        .annotate(**production_aggregates())
+        .order_by("bucket", *group_by)
+    )
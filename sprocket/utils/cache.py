@@ -0,0 +1,151 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def model_version_key(model):
+    return f"model_version:{model._meta.label_lower}"
+
+
+def bump_model_version(model):
+    """
+    The function invalidates every cached value that depends on the rows of a model by moving its
+    version forward, old cache keys are never read again and expire by themselves.
+
+    :param model: The model class whose rows changed
+    """
+    key = model_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key was evicted or never set, a time based value avoids reusing an old version
+        cache.set(key, time.time_ns(), None)
+
+
+def get_model_versions(model):
+    """
+    The function returns the current versions of a model and of the models it points to through
+    foreign keys, since filters and values can join them.
+
+    :param model: The model class the cached value depends on
+    :return: a tuple of integers, one version per model.
+    """
+    models = [model] + [
+        field.related_model
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.many_to_one
+    ]
+    keys = [model_version_key(related) for related in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+class CacheStats:
+    """
+    In-process hit/miss counters of the detail cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def to_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+
+detail_cache_stats = CacheStats()
+
+
+def detail_version_key(model, pk):
+    return f"detail_version:{model._meta.label_lower}:{pk}"
+
+
+def detail_cache_key(model, pk, version, variant=""):
+    # The variant (e.g. the `fields=` projection) is hashed to keep the key short and safe
+    digest = hashlib.sha1(variant.encode("utf-8")).hexdigest()
+    return f"detail:{model._meta.label_lower}:{pk}:{version}:{digest}"
+
+
+def get_detail_version(model, pk):
+    """
+    The function returns the current version of the cached detail of an object, it has to be read
+    before the object is loaded so a write happening meanwhile moves it past the stored body.
+
+    :param model: The model class of the object
+    :param pk: The primary key of the object
+    :return: an integer.
+    """
+    key = detail_version_key(model, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_detail(model, pk, version, variant=""):
+    """
+    The function reads the pre-serialized JSON body of a single object from the cache, together with
+    its `etag` and `last_modified` validators. Every variant of an object (e.g. different `fields=`
+    projections) has its own key under the version of the object, so a write invalidates all of
+    them at once by moving the version forward.
+
+    :param model: The model class of the object
+    :param pk: The primary key of the object
+    :param version: The version returned by `get_detail_version`
+    :param variant: The key of the representation
+    :return: a dictionary with the `body`, `etag` and `last_modified` keys or None on a miss.
+    """
+    entry = cache.get(detail_cache_key(model, pk, version, variant))
+    detail_cache_stats.record(entry is not None)
+    return entry
+
+
+def set_cached_detail(
+    model, pk, version, body, etag=None, last_modified=None, variant=""
+):
+    cache.set(
+        detail_cache_key(model, pk, version, variant),
+        {"body": body, "etag": etag, "last_modified": last_modified},
+        settings.DETAIL_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_detail(model, pk):
+    """
+    The function invalidates every cached variant of an object by moving its version forward, the
+    old keys are never read again and expire by themselves.
+
+    :param model: The model class of the object
+    :param pk: The primary key of the object
+    """
+    key = detail_version_key(model, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key was evicted or never set, a time based value avoids reusing an old version
+        cache.set(key, time.time_ns(), None)
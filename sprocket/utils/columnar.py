@@ -0,0 +1,383 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+from sprocket.models import ProductionChunk, SprocketProduction
+
+try:
+    import numpy
+except (
+    ImportError
+):  # numpy is in the requirements, the `array` code paths are the fallback
+    numpy = None
+
+# Typecodes of the packed columns, stored little-endian: milliseconds from the start of the day and
+# the production values
+OFFSET_TYPECODE = "I"
+VALUE_TYPECODE = "i"
+NUMPY_DTYPES = {OFFSET_TYPECODE: "<u4", VALUE_TYPECODE: "<i4"}
+VALUE_FIELDS = ("sprocket_actual", "sprocket_goal")
+
+DAY_MS = 86400 * 1000
+# Width of every aggregation bucket, weeks start on monday like `TruncWeek` (1970-01-05)
+BUCKET_MS = {
+    "minute": 60 * 1000,
+    "hour": 3600 * 1000,
+    "day": DAY_MS,
+    "week": 7 * DAY_MS,
+}
+BUCKET_ORIGIN_MS = {"week": 4 * DAY_MS}
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Totals of every value per bucket, with the NumPy reductions computing them
+TOTALS = (
+    {"sum": numpy.add, "min": numpy.minimum, "max": numpy.maximum}
+    if numpy is not None
+    else dict.fromkeys(("sum", "min", "max"))
+)
+
+
+def to_ms(value):
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def from_ms(value):
+    return EPOCH + timedelta(milliseconds=int(value))
+
+
+def day_start(value):
+    return value.astimezone(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def pack(values, typecode):
+    """
+    The function packs a sequence of integers as a little-endian array.
+
+    :param values: An iterable of integers
+    :param typecode: The `array` typecode of the column
+    :return: the packed bytes.
+    """
+    column = array(typecode, values)
+    if sys.byteorder == "big":  # pragma: no cover
+        column.byteswap()
+    return column.tobytes()
+
+
+def unpack(data, typecode):
+    """
+    The function unpacks a column without copying it element by element, as a NumPy array when
+    NumPy is installed and as an `array` otherwise.
+
+    :param data: The packed bytes (or memoryview) read from the database
+    :param typecode: The `array` typecode of the column
+    :return: a NumPy array or an `array.array`.
+    """
+    if numpy is not None:
+        return numpy.frombuffer(data, dtype=NUMPY_DTYPES[typecode])
+    column = array(typecode)
+    column.frombytes(bytes(data))
+    if sys.byteorder == "big":  # pragma: no cover
+        column.byteswap()
+    return column
+
+
+def build_chunks(rows):
+    """
+    The function packs production points into a chunk per factory, sprocket and UTC day.
+
+    :param rows: An iterable of `(factory_id, sprocket_id, date_produced, sprocket_actual,
+    sprocket_goal)` tuples ordered by factory, sprocket and `date_produced`
+    :return: a generator of unsaved `ProductionChunk` instances.
+    """
+    key = lambda row: (row[0], row[1], day_start(row[2]))
+    for (factory_id, sprocket_id, day), points in groupby(rows, key):
+        points = list(points)
+        day_ms = to_ms(day)
+        yield ProductionChunk(
+            factory_id=factory_id,
+            sprocket_id=sprocket_id,
+            day=day,
+            points=len(points),
+            offsets=pack((to_ms(row[2]) - day_ms for row in points), OFFSET_TYPECODE),
+            sprocket_actual=pack((row[3] for row in points), VALUE_TYPECODE),
+            sprocket_goal=pack((row[4] for row in points), VALUE_TYPECODE),
+        )
+
+
+def refresh_chunks(factory_id, sprocket_id, start, end):
+    """
+    The function repacks the chunks of a factory and sprocket for the days in `[start, end)` from
+    the live production rows.
+
+    :param factory_id: The factory of the chunks
+    :param sprocket_id: The sprocket of the chunks
+    :param start: The first day to repack
+    :param end: The end (exclusive) of the days to repack
+    """
+    pair = {"factory_id": factory_id, "sprocket_id": sprocket_id}
+    rows = (
+        SprocketProduction.objects.filter(
+            deleted=False, date_produced__gte=start, date_produced__lt=end, **pair
+        )
+        .order_by("date_produced", "id")
+        .values_list("factory_id", "sprocket_id", "date_produced", *VALUE_FIELDS)
+    )
+    ProductionChunk.objects.filter(day__gte=start, day__lt=end, **pair).delete()
+    ProductionChunk.objects.bulk_create(build_chunks(rows.iterator()))
+
+
+def chunk_queryset(filters, date_filters):
+    """
+    The function selects the chunks holding the points of a `factory_id`/`sprocket_id` filter and
+    a `date_produced` range.
+
+    :param filters: A dictionary with the `factory_id`/`sprocket_id` filters
+    :param date_filters: A dictionary of `date_produced` lookups (`gte`, `lt`, ...) to datetimes
+    :return: a `ProductionChunk` queryset ordered by pair and day.
+    """
+    queryset = ProductionChunk.objects.filter(**filters)
+    for lookup, value in date_filters.items():
+        bound = "gte" if lookup in ("gt", "gte") else "lte"
+        queryset = queryset.filter(**{f"day__{bound}": day_start(value)})
+    return queryset.order_by("factory_id", "sprocket_id", "day")
+
+
+def point_slice(offsets, day_ms, date_filters):
+    """
+    The function finds the points of a chunk inside a `date_produced` range with a binary search
+    over its sorted offsets.
+
+    :param offsets: The unpacked offsets of the chunk
+    :param day_ms: The start of the chunk day in milliseconds since the epoch
+    :param date_filters: A dictionary of `date_produced` lookups to datetimes
+    :return: a slice of the chunk columns.
+    """
+    start, stop = 0, len(offsets)
+    for lookup, value in date_filters.items():
+        position = to_ms(value) - day_ms
+        side = "left" if lookup in ("gte", "lt") else "right"
+        if position < 0:
+            index = 0
+        elif position >= DAY_MS:
+            index = len(offsets)
+        elif numpy is not None:
+            index = int(numpy.searchsorted(offsets, position, side=side))
+        else:
+            index = (bisect_left if side == "left" else bisect_right)(offsets, position)
+        if lookup in ("gt", "gte"):
+            start = max(start, index)
+        else:
+            stop = min(stop, index)
+    return slice(start, max(start, stop))
+
+
+def read_series(filters, date_filters):
+    """
+    The function reads the production points of the matching chunks as columns, one series per
+    factory and sprocket, every chunk is unpacked and sliced as a whole.
+
+    :param filters: A dictionary with the `factory_id`/`sprocket_id` filters
+    :param date_filters: A dictionary of `date_produced` lookups to datetimes
+    :return: a list of `(factory_id, sprocket_id, columns)` tuples, the columns being a dictionary
+    with the `time` (milliseconds since the epoch), `sprocket_actual` and `sprocket_goal` arrays.
+    """
+    chunks = chunk_queryset(filters, date_filters).values_list(
+        "factory_id", "sprocket_id", "day", "offsets", *VALUE_FIELDS
+    )
+    series = []
+    for (factory_id, sprocket_id), pair_chunks in groupby(
+        chunks.iterator(), lambda chunk: chunk[:2]
+    ):
+        parts = {"time": [], "sprocket_actual": [], "sprocket_goal": []}
+        for _, _, day, offsets, actual, goal in pair_chunks:
+            day_ms = to_ms(day)
+            offsets = unpack(offsets, OFFSET_TYPECODE)
+            points = point_slice(offsets, day_ms, date_filters)
+            if numpy is not None:
+                parts["time"].append(offsets[points].astype(numpy.int64) + day_ms)
+            else:
+                parts["time"].append(
+                    array("q", (day_ms + offset for offset in offsets[points]))
+                )
+            parts["sprocket_actual"].append(unpack(actual, VALUE_TYPECODE)[points])
+            parts["sprocket_goal"].append(unpack(goal, VALUE_TYPECODE)[points])
+        columns = {name: concatenate(columns) for name, columns in parts.items()}
+        # The range can leave out every point of the pair, like the rows filter does
+        if len(columns["time"]):
+            series.append((factory_id, sprocket_id, columns))
+    return series
+
+
+def concatenate(columns):
+    if numpy is not None:
+        return numpy.concatenate(columns)
+    joined = array(columns[0].typecode)
+    for column in columns:
+        joined.extend(column)
+    return joined
+
+
+def group_totals(series, bucket, group_by):
+    """
+    The function totals the points of every series by time bucket and group. With NumPy the points
+    of every series are sorted by group once and every aggregate is a single vectorized reduction.
+
+    :param series: The series read by `read_series`
+    :param bucket: One of `minute`, `hour`, `day` or `week`
+    :param group_by: An iterable with `factory_id` and/or `sprocket_id`
+    :return: a list of `(key, totals)` tuples ordered by key, the key being the bucket start in
+    milliseconds followed by the group values, and the totals a dictionary with the `rows` and the
+    sum, minimum and maximum of every value.
+    """
+    width, origin = BUCKET_MS[bucket], BUCKET_ORIGIN_MS.get(bucket, 0)
+    positions = [("factory_id", "sprocket_id").index(field) for field in group_by]
+    if numpy is None:
+        groups = {}
+        for *pair, columns in series:
+            group = tuple(pair[position] for position in positions)
+            for time, actual, goal in zip(
+                columns["time"], columns["sprocket_actual"], columns["sprocket_goal"]
+            ):
+                key = ((time - origin) // width * width + origin, *group)
+                totals = groups.get(key)
+                if totals is None:
+                    groups[key] = {
+                        "rows": 1,
+                        **{f"sprocket_actual_{name}": actual for name in TOTALS},
+                        **{f"sprocket_goal_{name}": goal for name in TOTALS},
+                    }
+                    continue
+                totals["rows"] += 1
+                for field, value in (
+                    ("sprocket_actual", actual),
+                    ("sprocket_goal", goal),
+                ):
+                    totals[f"{field}_sum"] += value
+                    totals[f"{field}_min"] = min(totals[f"{field}_min"], value)
+                    totals[f"{field}_max"] = max(totals[f"{field}_max"], value)
+        return sorted(groups.items())
+
+    if not series:
+        return []
+    keys = [
+        numpy.concatenate(
+            [(columns["time"] - origin) // width for *_, columns in series]
+        )
+    ]
+    for position in positions:
+        keys.append(
+            numpy.concatenate(
+                [numpy.full(len(item[2]["time"]), item[position]) for item in series]
+            )
+        )
+    # lexsort sorts by its last key first
+    order = numpy.lexsort(keys[::-1])
+    keys = [key[order] for key in keys]
+    changes = numpy.zeros(len(order), dtype=bool)
+    changes[0] = True
+    for key in keys:
+        changes[1:] |= key[1:] != key[:-1]
+    starts = numpy.flatnonzero(changes)
+
+    totals = {"rows": numpy.diff(numpy.append(starts, len(order))).tolist()}
+    for field in VALUE_FIELDS:
+        values = numpy.concatenate([columns[field] for *_, columns in series])
+        values = values.astype(numpy.int64)[order]
+        for name, function in TOTALS.items():
+            totals[f"{field}_{name}"] = function.reduceat(values, starts).tolist()
+    group_keys = zip(
+        (keys[0][starts] * width + origin).tolist(),
+        *(key[starts].tolist() for key in keys[1:]),
+    )
+    return [
+        (key, dict(zip(totals, values)))
+        for key, values in zip(group_keys, zip(*totals.values()))
+    ]
+
+
+def aggregate_chunks(filters, date_filters, bucket, group_by=()):
+    """
+    The function answers an aggregation from the production chunks, the output has the same shape
+    as `sprocket.utils.aggregations.aggregate_production`.
+
+    :param filters: A dictionary with the `factory_id`/`sprocket_id` filters
+    :param date_filters: A dictionary of `date_produced` lookups to datetimes
+    :param bucket: The requested bucket
+    :param group_by: An iterable with `factory_id` and/or `sprocket_id`
+    :return: a list of dictionaries, one per bucket and group, ordered by bucket.
+    """
+    data = []
+    for key, totals in group_totals(
+        read_series(filters, date_filters), bucket, group_by
+    ):
+        row = {"bucket": from_ms(key[0]), **dict(zip(group_by, key[1:]))}
+        row["rows"] = totals["rows"]
+        for field in VALUE_FIELDS:
+            row.update(
+                {
+                    f"{field}_sum": totals[f"{field}_sum"],
+                    f"{field}_avg": totals[f"{field}_sum"] / totals["rows"],
+                    f"{field}_min": totals[f"{field}_min"],
+                    f"{field}_max": totals[f"{field}_max"],
+                }
+            )
+        goal = totals["sprocket_goal_sum"]
+        row["attainment"] = totals["sprocket_actual_sum"] / goal if goal else None
+        data.append(row)
+    return data
+
+
+def production_series(filters, date_filters):
+    """
+    The function reads the same series as `read_series` from the production rows, for when the
+    chunks aren't kept.
+
+    :param filters: A dictionary with the `factory_id`/`sprocket_id` filters
+    :param date_filters: A dictionary of `date_produced` lookups to datetimes
+    :return: a list of `(factory_id, sprocket_id, columns)` tuples.
+    """
+    rows = (
+        SprocketProduction.objects.filter(
+            deleted=False,
+            **filters,
+            **{
+                f"date_produced__{lookup}": value
+                for lookup, value in date_filters.items()
+            },
+        )
+        .order_by("factory_id", "sprocket_id", "date_produced", "id")
+        .values_list("factory_id", "sprocket_id", "date_produced", *VALUE_FIELDS)
+    )
+    series = []
+    for (factory_id, sprocket_id), points in groupby(
+        rows.iterator(), lambda row: row[:2]
+    ):
+        columns = {"time": [], "sprocket_actual": [], "sprocket_goal": []}
+        for _, _, date_produced, actual, goal in points:
+            columns["time"].append(to_ms(date_produced))
+            columns["sprocket_actual"].append(actual)
+            columns["sprocket_goal"].append(goal)
+        series.append((factory_id, sprocket_id, columns))
+    return series
+
+
+def chart_series(series):
+    """
+    The function shapes a series like the `chart_data` of the seed fixtures.
+
+    :param series: A `(factory_id, sprocket_id, columns)` tuple read by `read_series`
+    :return: a dictionary with the `sprocket_id` and the parallel `time` (unix timestamps),
+    `sprocket_production_actual` and `sprocket_production_goal` lists.
+    """
+    _, sprocket_id, columns = series
+    return {
+        "sprocket_id": sprocket_id,
+        "time": [int(time) // 1000 for time in columns["time"]],
+        "sprocket_production_actual": [
+            int(value) for value in columns["sprocket_actual"]
+        ],
+        "sprocket_production_goal": [int(value) for value in columns["sprocket_goal"]],
+    }
@@ -0,0 +1,88 @@
+import hashlib
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from sprocket.utils.cache import get_model_versions
+
+
+def make_etag(*parts):
+    """
+    The function builds a strong ETag from the values a representation depends on.
+
+    :param parts: Any amount of values with a stable `repr`
+    :return: the quoted ETag string.
+    """
+    return quote_etag(hashlib.sha1(repr(parts).encode("utf-8")).hexdigest())
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """
+    The function evaluates the `If-None-Match`/`If-Modified-Since` headers of a request against the
+    current validators of the representation.
+
+    :param request: The HTTP request
+    :param etag: The current ETag of the representation
+    :param last_modified: The datetime of the last change of the representation, if known
+    :return: a 304 response with the validators or None when the client copy is stale.
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def record_validators(record, variant=""):
+    """
+    The function computes the validators of a single object from its `last_updated` field.
+
+    :param record: The model instance
+    :param variant: The key of the representation (e.g. the requested fields)
+    :return: a tuple with the ETag and the last modification datetime, or None when the model
+    doesn't track modifications.
+    """
+    last_updated = getattr(record, "last_updated", None)
+    if last_updated is None:
+        return None
+    etag = make_etag(
+        record._meta.label_lower, record.pk, last_updated.isoformat(), variant
+    )
+    return etag, last_updated
+
+
+def list_validators(queryset, body):
+    """
+    The function computes the validators of a list page, the newest `last_updated` of the filtered
+    rows changes with every update while the model versions change with inserts, deletes, soft
+    deletes and bulk writes (also on the related models). The query parameters are part of the
+    ETag so every page, order and filter gets its own one.
+
+    A list has no `Last-Modified`, the newest `last_updated` of the remaining rows doesn't move
+    forward when a row leaves the list or a related row changes, so only the ETag is trusted.
+
+    :param queryset: The filtered queryset of the page
+    :param body: A dictionary with the query parameters of the request
+    :return: a tuple with the ETag and None, or None when the model doesn't track modifications.
+    """
+    if not hasattr(queryset.model, "last_updated"):
+        return None
+    last_updated = queryset.aggregate(last_updated=Max("last_updated"))["last_updated"]
+    etag = make_etag(
+        queryset.model._meta.label_lower,
+        last_updated.isoformat() if last_updated else None,
+        get_model_versions(queryset.model),
+        sorted(body.items()),
+    )
+    return etag, None
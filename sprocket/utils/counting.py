@@ -0,0 +1,106 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from sprocket.utils.cache import get_model_versions
+from sprocket.utils.exceptions import BadRequest
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_STRATEGIES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+
+def count_cache_key(queryset):
+    """
+    The function builds the cache key of a count, the compiled SQL (without ordering) is used as the
+    normalized filter key so equivalent filters share the same entry. The database is part of the
+    key, a lagging replica can't cache its count for the clients reading the primary.
+
+    :param queryset: The filtered queryset to count, bound to a database
+    :return: a string with the cache key.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    versions = get_model_versions(queryset.model)
+    raw = f"{queryset.db}|{sql}|{params}|{versions}"
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"count:{queryset.model._meta.label_lower}:{digest}"
+
+
+def cached_count(queryset):
+    """
+    The function returns the exact amount of rows of a queryset, reusing the value cached for the
+    same filters until it expires or a write on the involved models invalidates it.
+
+    :param queryset: The filtered queryset to count
+    :return: an integer with the amount of rows.
+    """
+    # The router picks a random replica on every read, the count and its key use the same one
+    queryset = queryset.using(queryset.db)
+    key = count_cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset, has_filters):
+    """
+    The function reads the PostgreSQL planner estimates instead of counting the rows, `pg_class` is
+    used when there are no client filters and the EXPLAIN row estimate otherwise.
+
+    :param queryset: The filtered queryset to count
+    :param has_filters: True when the client sent filter conditions
+    :return: an integer with the estimate or None when the database can't provide it.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        if not has_filters:
+            # A partitioned table has no estimate of its own, its partitions have
+            cursor.execute(
+                "SELECT COALESCE(SUM(c.reltuples), p.reltuples)::bigint FROM pg_class p "
+                "LEFT JOIN pg_inherits i ON i.inhparent = p.oid "
+                "LEFT JOIN pg_class c ON c.oid = i.inhrelid AND c.reltuples >= 0 "
+                "WHERE p.oid = %s::regclass GROUP BY p.reltuples",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table is analyzed for the first time
+            if row and row[0] >= 0:
+                return row[0]
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_queryset(queryset, strategy, has_filters):
+    """
+    The function counts a queryset using the strategy requested by the client.
+
+    :param queryset: The filtered queryset to count
+    :param strategy: One of `exact`, `estimate` or `none`
+    :param has_filters: True when the client sent filter conditions
+    :return: an integer with the amount of rows or None when the count was skipped.
+    """
+    if strategy not in COUNT_STRATEGIES:
+        raise BadRequest(
+            "The count parameter must be one of: " + ",".join(COUNT_STRATEGIES)
+        )
+    if strategy == COUNT_NONE:
+        return None
+    if strategy == COUNT_ESTIMATE:
+        estimate = estimated_count(queryset, has_filters)
+        if estimate is not None:
+            return estimate
+    return cached_count(queryset)
@@ -0,0 +1,139 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from sprocket.utils.exceptions import BadRequest
+
+# Comparison lookups the filters accept, a field ending with one of them can't be used to order
+RANGE_LOOKUPS = frozenset(("lt", "lte", "gt", "gte"))
+
+
+def get_lookup_field(model, path):
+    """
+    The function walks a django lookup path (e.g. `sprocket__teeth`) through the model relations and
+    returns the concrete field at the end of it.
+
+    :param model: The model class where the lookup path starts
+    :param path: A string with the django lookup path, without any lookup suffix like `__lt`
+    :return: The model field instance referenced by the last part of the path.
+    """
+    field = None
+    for part in path.split("__"):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+def keyset_ordering(
+    allowed_order_filters, ordering_conditions, default="-date_created"
+):
+    """
+    The function picks the ordering key used by the keyset pagination, it's the first ordering
+    condition that is allowed and that is a plain field (lookups like `__lt` or `__gte` can't be
+    used to order).
+
+    :param allowed_order_filters: A list with the fields that can be used to filter and order
+    :param ordering_conditions: A list with the ordering conditions sent by the client
+    :param default: The ordering used whenever the client doesn't send a valid one
+    :return: a tuple with the field name and a boolean that is True for descending order.
+    """
+    for condition in ordering_conditions:
+        field = condition[1:] if condition.startswith("-") else condition
+        lookup = field.rsplit("__", 1)[-1] if "__" in field else None
+        if field in allowed_order_filters and lookup not in RANGE_LOOKUPS:
+            return field, condition.startswith("-")
+    return default.lstrip("-"), default.startswith("-")
+
+
+def encode_cursor(field, value, pk, backwards=False):
+    """
+    The function builds the opaque cursor token sent back to the client.
+
+    :param field: The ordering field the cursor belongs to
+    :param value: The value of the ordering field on the boundary row
+    :param pk: The primary key of the boundary row, used as a tie breaker
+    :param backwards: True when the cursor points to the previous page
+    :return: an url safe base64 string.
+    """
+    payload = {"f": field, "v": value, "id": pk, "b": backwards}
+    # str() keeps the full microsecond precision that DjangoJSONEncoder would truncate
+    raw = json.dumps(payload, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(model, field, token):
+    """
+    The function decodes a cursor token and converts its value back to the python type of the
+    ordering field.
+
+    :param model: The model class being paginated
+    :param field: The ordering field of the current request, the cursor has to match it
+    :param token: The cursor token sent by the client
+    :return: a tuple with the ordering value, the primary key and the backwards flag.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["f"] != field:
+            raise BadRequest("The cursor doesn't match the requested order")
+        value = get_lookup_field(model, field).to_python(payload["v"])
+        return value, int(payload["id"]), bool(payload.get("b", False))
+    except BadRequest:
+        raise
+    except (ValueError, TypeError, KeyError, ValidationError, FieldDoesNotExist):
+        raise BadRequest("Invalid cursor provided")
+
+
+def keyset_page(queryset, model, field, descending, token, size, values):
+    """
+    The function returns a page of rows located right after (or before) the cursor row, it filters
+    on the `(field, id)` pair instead of using OFFSET so the cost of a page doesn't depend on how
+    deep it is.
+
+    :param queryset: The filtered queryset to paginate
+    :param model: The model class being paginated
+    :param field: The ordering field
+    :param descending: True when the ordering is descending
+    :param token: The cursor token sent by the client, an empty value means the first page
+    :param size: The amount of rows per page
+    :param values: The list of fields returned for every row
+    :return: a tuple with the rows, the next cursor and the previous cursor.
+    """
+    backwards = False
+    if token:
+        value, pk, backwards = decode_cursor(model, field, token)
+
+    # Moving backwards means walking the same index in the opposite direction
+    reverse = descending != backwards
+    if token:
+        lookup = "lt" if reverse else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field}__{lookup}": value})
+            | Q(**{field: value, f"id__{lookup}": pk})
+        )
+
+    prefix = "-" if reverse else ""
+    queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}id")
+
+    extra_fields = [name for name in (field, "id") if values and name not in values]
+    rows = list(queryset.values(*values, *extra_fields)[: size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if has_more or backwards:
+            next_cursor = encode_cursor(field, last[field], last["id"])
+        if token and (has_more or not backwards):
+            prev_cursor = encode_cursor(field, first[field], first["id"], True)
+
+    for row in rows:
+        for name in extra_fields:
+            row.pop(name, None)
+    return rows, next_cursor, prev_cursor
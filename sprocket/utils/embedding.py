@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+
+from sprocket.models import Sprocket, SprocketProduction
+from sprocket.utils.exceptions import BadRequest
+
+INCLUDE_OPTIONS = ("sprockets", "recent_production", "summary")
+
+# Fields of the embedded production rows, the factory is the embedding one so it isn't repeated
+RECENT_PRODUCTION_FIELDS = (
+    "id",
+    "sprocket_id",
+    "sprocket_goal",
+    "sprocket_actual",
+    "date_produced",
+)
+
+
+def parse_includes(body):
+    """
+    The function reads and validates the related data requested through the `include` parameter.
+
+    :param body: The `body` parameter is a dictionary with the parameters of the request
+    :return: the list of requested relations, empty when the parameter isn't sent.
+    """
+    if not body.get("include"):
+        return []
+    includes = list(dict.fromkeys(name for name in body["include"].split(",") if name))
+    if not includes or any(name not in INCLUDE_OPTIONS for name in includes):
+        raise BadRequest(
+            "The include parameter only accepts: " + ",".join(INCLUDE_OPTIONS)
+        )
+    return includes
+
+
+def factory_summary(record):
+    """
+    The function summarizes the production of a factory from its snapshot columns, kept in sync by
+    `sprocket.utils.snapshots`, so it doesn't cost any query.
+
+    :param record: The factory
+    :return: a dictionary with the rows, the goal/actual sums, the attainment and the latest
+    production date.
+    """
+    goal = record.total_sprocket_goal
+    actual = record.total_sprocket_actual
+    return {
+        "production_rows": record.production_count,
+        "sprocket_goal": goal,
+        "sprocket_actual": actual,
+        "attainment": actual / goal if goal else None,
+        "last_produced_at": record.last_produced_at,
+    }
+
+
+def factory_sprockets(factory_id):
+    """
+    The function returns the sprockets a factory produced along with its production of each one,
+    the production is grouped in the database so it's a single query whatever the amount of rows.
+
+    :param factory_id: The id of the factory
+    :return: a list of dictionaries ordered by sprocket id.
+    """
+    # Filtering before annotating makes the aggregates reuse the join of the filter
+    return list(
+        Sprocket.objects.filter(
+            deleted=False,
+            sprocketproduction__factory_id=factory_id,
+            sprocketproduction__deleted=False,
+        )
+        .values("id", "teeth", "pitch_diameter", "outside_diameter", "pitch")
+        .annotate(
+            production_rows=Count("sprocketproduction"),
+            sprocket_actual=Sum("sprocketproduction__sprocket_actual"),
+            last_produced_at=Max("sprocketproduction__date_produced"),
+        )
+        .order_by("id")
+    )
+
+
+def recent_production(factory_id, size=None):
+    """
+    The function returns the latest production rows of a factory with a single limited query, it's
+    served by the `production_factory_date_idx` index.
+
+    :param factory_id: The id of the factory
+    :param size: The amount of rows, `FACTORY_RECENT_PRODUCTION_SIZE` by default
+    :return: a list of dictionaries from the newest to the oldest row.
+    """
+    size = settings.FACTORY_RECENT_PRODUCTION_SIZE if size is None else size
+    return list(
+        SprocketProduction.objects.filter(factory_id=factory_id, deleted=False)
+        .order_by("-date_produced", "-id")
+        .values(*RECENT_PRODUCTION_FIELDS)[:size]
+    )
+
+
+def embed_related(record, includes):
+    """
+    The function loads the related data requested for a factory, every relation costs one query
+    (the summary none, it's read from the factory snapshot) so the amount of queries never depends
+    on the amount of factories, sprockets or production rows.
+
+    :param record: The factory
+    :param includes: The list of requested relations
+    :return: a dictionary of relation name to its data.
+    """
+    loaders = {
+        "sprockets": lambda: factory_sprockets(record.pk),
+        "recent_production": lambda: recent_production(record.pk),
+        "summary": lambda: factory_summary(record),
+    }
+    return {name: loaders[name]() for name in includes}
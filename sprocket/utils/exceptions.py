@@ -52,3 +52,28 @@ class BadRequest(BaseCustomException):
 class MethodNotAllowed(BaseCustomException):
     status_code = 405
     user_message = "405 Method Not Allowed"
+
+
+class BatchValidationError(BadRequest):
+    """
+    Should be thrown whenever one or more items of a batch are invalid, `errors` holds the error of
+    every invalid item along with its index.
+    """
+
+    developer_message = "One or more items of the batch are invalid"
+
+    def __init__(self, errors, developer_message: str = None, user_message: str = None):
+        super(BatchValidationError, self).__init__(developer_message, user_message)
+        self.errors = errors
+
+    def to_dict(self):
+        return {**super(BatchValidationError, self).to_dict(), "errors": self.errors}
+
+
+class TooManyRequests(BaseCustomException):
+    """
+    Should be thrown whenever the API can't take more work right now, the client should retry later.
+    """
+
+    status_code = 429
+    user_message = "Too many requests, please try again later"
@@ -0,0 +1,295 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+
+from sprocket.models import Factory, Sprocket, SprocketProduction
+from sprocket.utils.cache import bump_model_version
+from sprocket.utils.exceptions import BadRequest, NotFound
+from sprocket.utils.rollups import hour_start, record_rollup_hours
+from sprocket.utils.snapshots import apply_summaries, summarize_rows
+
+INGEST_AUTO = "auto"
+INGEST_BULK_CREATE = "bulk_create"
+INGEST_COPY = "copy"
+INGEST_METHODS = (INGEST_AUTO, INGEST_BULK_CREATE, INGEST_COPY)
+EVENT_FIELDS = (
+    "factory_id",
+    "sprocket_id",
+    "sprocket_actual",
+    "sprocket_goal",
+    "date_produced",
+)
+
+
+class IngestStats:
+    """
+    Summary of a bulk ingestion, used to report the throughput of the loader.
+    """
+
+    def __init__(self, rows=0, batches=0, seconds=0.0, method=None):
+        self.rows = rows
+        self.batches = batches
+        self.seconds = seconds
+        self.method = method
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "method": self.method,
+        }
+
+
+def iter_chart_data(factory, sprocket, chart_data):
+    """
+    The function streams the parallel arrays of a factory `chart_data` as unsaved
+    `SprocketProduction` rows, without building intermediate lists.
+
+    :param factory: The factory (instance or id) the production belongs to
+    :param sprocket: The sprocket (instance or id) being produced
+    :param chart_data: A dictionary with the `sprocket_production_actual`,
+    `sprocket_production_goal` and `time` arrays
+    :return: a generator of `SprocketProduction` instances.
+    """
+    factory_key = "factory" if hasattr(factory, "pk") else "factory_id"
+    sprocket_key = "sprocket" if hasattr(sprocket, "pk") else "sprocket_id"
+    for actual, goal, timestamp in zip(
+        chart_data["sprocket_production_actual"],
+        chart_data["sprocket_production_goal"],
+        chart_data["time"],
+    ):
+        yield SprocketProduction(
+            **{factory_key: factory, sprocket_key: sprocket},
+            sprocket_actual=actual,
+            sprocket_goal=goal,
+            date_produced=datetime.fromtimestamp(int(timestamp), timezone.utc),
+        )
+
+
+def resolve_method(method, connection):
+    if method not in INGEST_METHODS:
+        raise ValueError(
+            "The ingest method must be one of: " + ",".join(INGEST_METHODS)
+        )
+    if method == INGEST_COPY and connection.vendor != "postgresql":
+        raise ValueError("COPY ingestion is only available on PostgreSQL")
+    if method == INGEST_AUTO:
+        return INGEST_COPY if connection.vendor == "postgresql" else INGEST_BULK_CREATE
+    return method
+
+
+def copy_batch(connection, batch, now):
+    """
+    The function writes a batch of rows with PostgreSQL `COPY FROM STDIN`, which skips the
+    statement parsing and the per row overhead of INSERT.
+
+    :param connection: The database connection to write through
+    :param batch: A list of unsaved `SprocketProduction` instances
+    :param now: The timestamp used for the `date_created`/`last_updated` fields of the batch
+    """
+    fields = [
+        field
+        for field in SprocketProduction._meta.concrete_fields
+        if not field.primary_key
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        row.date_created = row.last_updated = now
+        # csv writes None as an empty unquoted value, which COPY reads as NULL
+        writer.writerow([getattr(row, field.attname) for field in fields])
+    buffer.seek(0)
+
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(SprocketProduction._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(
+            f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def bulk_ingest(
+    rows, batch_size=None, method=INGEST_AUTO, using=None, refresh_rollups=None
+):
+    """
+    The function writes a stream of `SprocketProduction` rows in batches, using `bulk_create` or
+    PostgreSQL `COPY FROM STDIN`, inside a single transaction. The rollups and the production
+    snapshot of the factories are kept in sync.
+
+    :param rows: An iterable (e.g. `iter_chart_data`) of unsaved `SprocketProduction` instances
+    :param batch_size: The amount of rows written per statement, `INGEST_BATCH_SIZE` by default
+    :param method: One of `auto`, `bulk_create` or `copy`, auto uses COPY on PostgreSQL
+    :param using: The database alias to write to, the router decides by default
+    :param refresh_rollups: Overrides the `ROLLUP_REFRESH_ON_WRITE` setting for this load
+    :return: an `IngestStats` instance with the throughput of the load.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    using = using or router.db_for_write(SprocketProduction)
+    connection = connections[using]
+    stats = IngestStats(method=resolve_method(method, connection))
+
+    started = time.perf_counter()
+    rows = iter(rows)
+    hours_by_pair = defaultdict(set)
+    summaries = {}
+    with transaction.atomic(using=using):
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            now = datetime.now(timezone.utc)
+            for row in batch:
+                row.date_produced = row.date_produced or now
+                hours_by_pair[(row.factory_id, row.sprocket_id)].add(
+                    hour_start(row.date_produced)
+                )
+            if stats.method == INGEST_COPY:
+                copy_batch(connection, batch, now)
+            else:
+                SprocketProduction.objects.using(using).bulk_create(batch)
+            summarize_rows(batch, summaries)
+            stats.rows += len(batch)
+            stats.batches += 1
+        # The factory rows are locked once, at the end of the load, until it commits
+        apply_summaries(summaries)
+        record_rollup_hours(hours_by_pair, refresh_rollups)
+    stats.seconds = time.perf_counter() - started
+
+    # bulk writes don't send post_save, so the cached values are invalidated here
+    if stats.rows:
+        bump_model_version(SprocketProduction)
+    return stats
+
+
+def parse_events(body, content_type=None):
+    """
+    The function decodes a batch of production events sent as a JSON array or as NDJSON (one JSON
+    object per line), a malformed NDJSON line doesn't discard the rest of the batch.
+
+    :param body: The decoded body of the request
+    :param content_type: The content type of the request
+    :return: a list with the decoded events, the malformed NDJSON lines are `BadRequest` instances.
+    """
+    if content_type not in ("application/x-ndjson", "application/ndjson") and (
+        body.lstrip().startswith("[")
+    ):
+        try:
+            events = json.loads(body)
+        except ValueError:
+            raise BadRequest("The payload must be a JSON array or NDJSON")
+        if not isinstance(events, list):
+            raise BadRequest("The payload must be a JSON array or NDJSON")
+        return events
+
+    events = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            events.append(BadRequest("Malformed JSON line"))
+    return events
+
+
+def event_to_row(event):
+    """
+    The function validates a production event and converts it to an unsaved `SprocketProduction`,
+    `date_produced` can be an ISO 8601 string or a unix timestamp.
+
+    :param event: A dictionary with the `EVENT_FIELDS` keys
+    :return: a `SprocketProduction` instance.
+    """
+    if isinstance(event, BadRequest):
+        raise event
+    if not isinstance(event, dict):
+        raise BadRequest("Every event must be an object")
+    if set(event) != set(EVENT_FIELDS):
+        raise BadRequest(
+            "An event must have exactly the fields: " + ",".join(EVENT_FIELDS)
+        )
+
+    values = {}
+    for name in EVENT_FIELDS:
+        value = event[name]
+        field = SprocketProduction._meta.get_field(name)
+        # Checked on the raw JSON value, the conversion turns a bool or a fractional number into a
+        # valid integer (or timestamp)
+        if isinstance(value, bool) or (
+            isinstance(value, float)
+            and name != "date_produced"
+            and not value.is_integer()
+        ):
+            raise BadRequest(f"Invalid value for {name}")
+        try:
+            if name == "date_produced" and isinstance(value, (int, float)):
+                value = datetime.fromtimestamp(value, timezone.utc)
+            elif field.is_relation:
+                value = field.target_field.to_python(value)
+            else:
+                value = field.to_python(value)
+        except (ValidationError, ValueError, OverflowError, OSError):
+            raise BadRequest(f"Invalid value for {name}")
+        if value is None:
+            raise BadRequest(f"Invalid value for {name}")
+        values[name] = value
+
+    if values["date_produced"].tzinfo is None:
+        values["date_produced"] = values["date_produced"].replace(tzinfo=timezone.utc)
+    return SprocketProduction(**values)
+
+
+def validate_events(events):
+    """
+    The function validates a batch of production events, the factories and sprockets they point to
+    are checked with one query per model for the whole batch.
+
+    :param events: A list of decoded events (see `parse_events`)
+    :return: a tuple with the list of valid unsaved rows and the list of errors, every error is
+    the `to_dict` of its exception with the `index` of the event.
+    """
+    rows, errors = [], []
+    for index, event in enumerate(events):
+        try:
+            rows.append((index, event_to_row(event)))
+        except BadRequest as e:
+            errors.append({"index": index, **e.to_dict()})
+
+    existing = {
+        "factory_id": set(
+            Factory.objects.filter(
+                deleted=False, id__in={row.factory_id for _, row in rows}
+            ).values_list("id", flat=True)
+        ),
+        "sprocket_id": set(
+            Sprocket.objects.filter(
+                deleted=False, id__in={row.sprocket_id for _, row in rows}
+            ).values_list("id", flat=True)
+        ),
+    }
+    valid = []
+    for index, row in rows:
+        missing = [
+            name for name, ids in existing.items() if getattr(row, name) not in ids
+        ]
+        if missing:
+            error = NotFound(f"Unknown {missing[0]}")
+            errors.append({"index": index, **error.to_dict()})
+        else:
+            valid.append(row)
+    errors.sort(key=lambda error: error["index"])
+    return valid, errors
@@ -1,28 +1,125 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.db.models import Q
-from functools import reduce
 
+from sprocket.utils.cursor_pagination import get_lookup_field
+from sprocket.utils.exceptions import BadRequest
+
+# Amount of compiled filter/order combinations kept in memory per process
+QUERY_SPEC_CACHE_SIZE = 1024
+
+
+class Whitelist(NamedTuple):
+    """
+    The filters and orderings a view accepts, resolved against the model once.
+    """
+
+    # Filter key (field path with an optional lookup like `__lt`) to the model field it compares
+    filters: dict
+    # Field paths that can be used to order, lookups like `__lt` can't
+    orderable: frozenset
+
+
+class QuerySpec(NamedTuple):
+    """
+    A validated and hashable filter/order request.
+    """
+
+    # Tuple of `(filter key, python value)` pairs, ANDed together
+    filters: tuple
+    # Tuple of ordering conditions, `-` prefixed for descending order
+    ordering: tuple
+
+    def apply(self, queryset):
+        """
+        The function applies the spec with a single `filter` and a single `order_by` call.
 
-def query_filter_to_paginated_api_view(allowed_filters, filter_conditions, queryset):
-    # Apply filter conditions one by one
-    for condition in filter_conditions:
-        key, value = condition.split(":")
+        :param queryset: The queryset to filter and order
+        :return: the filtered and ordered queryset.
+        """
+        if self.filters:
+            queryset = queryset.filter(Q(*self.filters))
+        if self.ordering:
+            queryset = queryset.order_by(*self.ordering)
+        return queryset
 
-        # Handle different filter conditions based on the key
-        if key in allowed_filters:
-            queryset = queryset.filter(**{key: value})
-    return queryset
 
+@lru_cache(maxsize=None)
+def compile_whitelist(model, allowed_filters):
+    """
+    The function resolves every allowed filter of a view to the model field it compares.
 
-def query_order_to_paginated_api_view(
-    allowed_order_filters, ordering_conditions, queryset
+    :param model: The model class the view queries
+    :param allowed_filters: A tuple with the filters and orderings the view accepts
+    :return: a `Whitelist` instance.
+    """
+    filters, orderable = {}, set()
+    for key in allowed_filters:
+        try:
+            filters[key] = get_lookup_field(model, key)
+            orderable.add(key)
+        except FieldDoesNotExist:
+            # The last part is a lookup like `__lt`
+            filters[key] = get_lookup_field(model, key.rsplit("__", 1)[0])
+    return Whitelist(filters, frozenset(orderable))
+
+
+def coerce_value(field, key, value):
+    """
+    The function converts a filter value sent as text to the python type of the compared field.
+
+    :param field: The model field the filter compares
+    :param key: The filter key, used on the error message
+    :param value: The text value sent by the client
+    :return: the converted value, the datetimes without an offset are taken as UTC like the
+    aggregation filters.
+    """
+    if field.is_relation:
+        field = field.target_field
+    try:
+        value = field.to_python(value)
+    except (ValidationError, ValueError, TypeError):
+        raise BadRequest(f"Invalid value provided for {key}")
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@lru_cache(maxsize=QUERY_SPEC_CACHE_SIZE)
+def compile_query_spec(
+    model, allowed_filters, filter_param, order_param, default_order
 ):
-    # Apply ordering conditions one by one
-    allowed = lambda x: x in allowed_order_filters
-    for condition in ordering_conditions:
-        if condition.startswith("-"):
-            field = condition[1:]  # Remove the leading '-' for descending order
-            if allowed(field):
-                queryset = queryset.order_by(f"-{field}")
-        elif allowed(condition):
-            queryset = queryset.order_by(condition)
-    return queryset
+    """
+    The function parses and validates the `filter` and `order` parameters of a request, the
+    compiled specs are memoized so repeated requests skip the parsing and the validation. Filters
+    and orderings that aren't allowed are ignored.
+
+    :param model: The model class the view queries
+    :param allowed_filters: A tuple with the filters and orderings the view accepts
+    :param filter_param: The comma separated `key:value` conditions sent by the client
+    :param order_param: The comma separated ordering conditions sent by the client
+    :param default_order: A tuple with the ordering used when the client doesn't send a valid one
+    :return: a `QuerySpec` instance.
+    """
+    whitelist = compile_whitelist(model, allowed_filters)
+
+    filters = []
+    for condition in filter(None, filter_param.split(",")):
+        # Only the first colon splits the key, values like datetimes can contain colons
+        key, separator, value = condition.partition(":")
+        if not separator:
+            raise BadRequest(f"Invalid filter provided: {condition}")
+        field = whitelist.filters.get(key)
+        if field is not None:
+            filters.append((key, coerce_value(field, key, value)))
+
+    ordering = tuple(
+        condition
+        for condition in filter(None, order_param.split(","))
+        if (condition[1:] if condition.startswith("-") else condition)
+        in whitelist.orderable
+    )
+    return QuerySpec(tuple(filters), ordering or default_order)
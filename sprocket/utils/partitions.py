@@ -0,0 +1,314 @@
+from datetime import datetime, timezone
+
+from django.db import transaction
+
+# `SprocketProduction` is range partitioned by month on `date_produced` on PostgreSQL, the names
+# are spelled out since the migrations use this module
+PARTITIONED_TABLE = "sprocket_sprocketproduction"
+PARTITION_KEY = "date_produced"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+LEGACY_TABLE = f"{PARTITIONED_TABLE}_legacy"
+
+
+def month_start(value):
+    """
+    The function truncates a datetime (or date) to the start of its month in UTC.
+
+    :param value: The datetime or date
+    :return: an aware datetime.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, amount):
+    index = month.year * 12 + month.month - 1 + amount
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def month_range(first, last):
+    """
+    The function lists the month starts from `first` to `last`, both included.
+
+    :param first: The first datetime
+    :param last: The last datetime
+    :return: a list of aware datetimes.
+    """
+    months, month = [], month_start(first)
+    while month <= month_start(last):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_name(month):
+    return f"{PARTITIONED_TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name):
+    """
+    The function reads the month of a monthly partition from its name.
+
+    :param name: The partition table name
+    :return: an aware datetime or None when the table isn't a monthly partition.
+    """
+    prefix = f"{PARTITIONED_TABLE}_p"
+    suffix = name[len(prefix) :]
+    if not name.startswith(prefix) or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    try:
+        return datetime.strptime(suffix, "%Y%m").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def partition_bounds(month):
+    """
+    The function builds the timestamp literals bounding the partition of a month.
+
+    :param month: The month start
+    :return: a `(from, to)` tuple, `to` is excluded from the partition.
+    """
+    return (
+        f"'{month:%Y-%m-%d} 00:00:00+00'",
+        f"'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'",
+    )
+
+
+def create_partition_sql(month):
+    """
+    The function builds the statements creating the partition of a month, the rows of that month
+    that landed on the default partition are moved to it.
+
+    :param month: The month start
+    :return: a list of SQL statements.
+    """
+    name = partition_name(month)
+    start, end = partition_bounds(month)
+    in_month = f"{PARTITION_KEY} >= {start} AND {PARTITION_KEY} < {end}"
+    return [
+        f'CREATE TABLE "{name}" (LIKE "{PARTITIONED_TABLE}" INCLUDING DEFAULTS)',
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_month} RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        # Lets ATTACH trust the rows without scanning them, it's redundant once attached
+        f'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_range" CHECK ({in_month})',
+        f'ALTER TABLE "{PARTITIONED_TABLE}" ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ({start}) TO ({end})",
+        f'ALTER TABLE "{name}" DROP CONSTRAINT "{name}_range"',
+    ]
+
+
+def detach_partition_sql(name, archive_schema=None, drop=False):
+    """
+    The function builds the statements detaching a partition, the detached table is kept as it
+    is, moved to `archive_schema` or dropped.
+
+    :param name: The partition table name
+    :param archive_schema: The schema the detached table is moved to
+    :param drop: True to drop the detached table
+    :return: a list of SQL statements.
+    """
+    statements = [f'ALTER TABLE "{PARTITIONED_TABLE}" DETACH PARTITION "{name}"']
+    if drop:
+        statements.append(f'DROP TABLE "{name}"')
+    elif archive_schema:
+        statements += [
+            f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"',
+            f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"',
+        ]
+    return statements
+
+
+def is_partitioned(connection):
+    """
+    The function tells if the production table is partitioned, it never is outside of PostgreSQL.
+
+    :param connection: The database connection
+    :return: a boolean.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [PARTITIONED_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    """
+    The function lists the monthly partitions attached to the production table.
+
+    :param connection: The database connection
+    :return: a sorted list of `(month, table name)` tuples.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [PARTITIONED_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(
+        (partition_month(name), name) for name in names if partition_month(name)
+    )
+
+
+def run_statements(connection, statements):
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def ensure_partitions(connection, months_ahead, now=None):
+    """
+    The function creates the missing partitions from the current month to `months_ahead` months
+    later, so the incoming rows never land on the default partition.
+
+    :param connection: The database connection
+    :param months_ahead: Amount of future months covered
+    :param now: The current datetime
+    :return: the list of created partition names.
+    """
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = {month for month, _ in list_partitions(connection)}
+    created = []
+    for month in month_range(current, add_months(current, months_ahead)):
+        if month not in existing:
+            run_statements(connection, create_partition_sql(month))
+            created.append(partition_name(month))
+    return created
+
+
+def detach_partitions(
+    connection, retention_months, archive_schema=None, drop=False, now=None
+):
+    """
+    The function detaches the partitions older than `retention_months` months.
+
+    :param connection: The database connection
+    :param retention_months: Amount of past months kept attached besides the current one
+    :param archive_schema: The schema the detached tables are moved to
+    :param drop: True to drop the detached tables
+    :param now: The current datetime
+    :return: the list of detached partition names.
+    """
+    first_kept = add_months(
+        month_start(now or datetime.now(timezone.utc)), -retention_months
+    )
+    detached = []
+    for month, name in list_partitions(connection):
+        if month < first_kept:
+            run_statements(connection, detach_partition_sql(name, archive_schema, drop))
+            detached.append(name)
+    return detached
+
+
+def _table_definitions(cursor, table):
+    """
+    The function reads the secondary indexes and the foreign keys of a table, so they can be
+    recreated once the table is swapped.
+
+    :return: a list of SQL statements creating them on `PARTITIONED_TABLE`.
+    """
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+        "AND tablename = %s AND indexname NOT IN "
+        "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+        [table, table],
+    )
+    statements = [
+        indexdef.replace(f" ON public.{table} ", f" ON {PARTITIONED_TABLE} ")
+        .replace(f" ON ONLY public.{table} ", f" ON {PARTITIONED_TABLE} ")
+        .replace(f" ON {table} ", f" ON {PARTITIONED_TABLE} ")
+        for (indexdef,) in cursor.fetchall()
+    ]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    statements += [
+        f'ALTER TABLE "{PARTITIONED_TABLE}" ADD CONSTRAINT "{name}" {definition}'
+        for name, definition in cursor.fetchall()
+    ]
+    return statements
+
+
+def _swap_table(cursor, table, create_statements):
+    """
+    The function replaces `PARTITIONED_TABLE` with the table built by `create_statements`, the
+    rows, the id sequence, the indexes and the foreign keys are carried over.
+    """
+    cursor.execute(f'ALTER TABLE "{PARTITIONED_TABLE}" RENAME TO "{table}"')
+    # Frees the primary key name for the new table
+    cursor.execute(
+        f'ALTER TABLE "{table}" RENAME CONSTRAINT "{PARTITIONED_TABLE}_pkey" '
+        f'TO "{table}_pkey"'
+    )
+    definitions = _table_definitions(cursor, table)
+    for statement in create_statements:
+        cursor.execute(statement)
+    cursor.execute(f'INSERT INTO "{PARTITIONED_TABLE}" SELECT * FROM "{table}"')
+    # The sequence is owned by the id column, it would be dropped with the old table
+    cursor.execute(
+        f"ALTER SEQUENCE {PARTITIONED_TABLE}_id_seq OWNED BY {PARTITIONED_TABLE}.id"
+    )
+    cursor.execute(f'DROP TABLE "{table}"')
+    for statement in definitions:
+        cursor.execute(statement)
+
+
+def partition_table(connection, months_ahead):
+    """
+    The function turns the production table into a table partitioned by month, with a partition
+    per month holding rows up to `months_ahead` months ahead and a default one for the rest.
+
+    :param connection: The database connection
+    :param months_ahead: Amount of future months covered
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT MIN({PARTITION_KEY}), MAX({PARTITION_KEY}) FROM "{PARTITIONED_TABLE}"'
+        )
+        first, last = cursor.fetchone()
+        now = datetime.now(timezone.utc)
+        months = month_range(
+            min(first or now, now), max(last or now, add_months(now, months_ahead))
+        )
+        statements = [
+            f'CREATE TABLE "{PARTITIONED_TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+            f"PARTITION BY RANGE ({PARTITION_KEY})",
+            # The partition key has to be part of the primary key
+            f'ALTER TABLE "{PARTITIONED_TABLE}" ADD PRIMARY KEY (id, {PARTITION_KEY})',
+            f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{PARTITIONED_TABLE}" DEFAULT',
+        ]
+        for month in months:
+            start, end = partition_bounds(month)
+            statements.append(
+                f'CREATE TABLE "{partition_name(month)}" PARTITION OF "{PARTITIONED_TABLE}" '
+                f"FOR VALUES FROM ({start}) TO ({end})"
+            )
+        _swap_table(cursor, LEGACY_TABLE, statements)
+
+
+def unpartition_table(connection):
+    """
+    The function turns the partitioned production table back into a plain table, the detached
+    partitions aren't brought back.
+
+    :param connection: The database connection
+    """
+    partitioned = f"{PARTITIONED_TABLE}_partitioned"
+    with connection.cursor() as cursor:
+        _swap_table(
+            cursor,
+            partitioned,
+            [
+                f'CREATE TABLE "{PARTITIONED_TABLE}" '
+                f'(LIKE "{partitioned}" INCLUDING DEFAULTS)',
+                f'ALTER TABLE "{PARTITIONED_TABLE}" ADD PRIMARY KEY (id)',
+            ],
+        )
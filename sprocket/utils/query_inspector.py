@@ -0,0 +1,233 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+from app.metrics import iterate_within
+
+logger = logging.getLogger(__name__)
+
+# Literals replaced by a placeholder to group the statements by shape
+NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+STRING = re.compile(r"'(?:[^']|'')*'")
+PARAMETER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """
+    The function normalizes a SQL statement so the statements only differing on their parameters
+    (e.g. the same lookup run once per row, the N+1 pattern) share the same shape.
+
+    :param sql: The SQL statement
+    :return: a string with the shape of the statement.
+    """
+    shape = STRING.sub("?", sql)
+    shape = NUMBER.sub("?", shape)
+    shape = PARAMETER_LIST.sub("(...)", shape.replace("%s", "?"))
+    return WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryInspector:
+    """
+    Records every statement run while serving a request through `connection.execute_wrapper`, on
+    every database alias.
+    """
+
+    def __init__(self, endpoint, slow_ms=None, repeated_threshold=None):
+        self.endpoint = endpoint
+        self.slow_ms = settings.QUERY_INSPECTOR_SLOW_MS if slow_ms is None else slow_ms
+        self.repeated_threshold = (
+            settings.QUERY_INSPECTOR_REPEATED_THRESHOLD
+            if repeated_threshold is None
+            else repeated_threshold
+        )
+        self.queries = []
+        self._connections = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
+
+    def __enter__(self):
+        self._connections = connections.all()
+        for connection in self._connections:
+            connection.execute_wrappers.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        for connection in self._connections:
+            # Removed by identity, the wrappers added meanwhile (e.g. the query tracker of a
+            # connection opened by the request) can sit after this one
+            connection.execute_wrappers[:] = [
+                wrapper
+                for wrapper in connection.execute_wrappers
+                if wrapper is not self
+            ]
+
+    def report(self):
+        """
+        The function summarizes the recorded statements, the slow ones and the shapes repeated at
+        least `repeated_threshold` times.
+
+        :return: a dictionary with the report of the request.
+        """
+        shapes = Counter(query_shape(query["sql"]) for query in self.queries)
+        return {
+            "endpoint": self.endpoint,
+            "queries": len(self.queries),
+            "duration_ms": round(sum(q["duration_ms"] for q in self.queries), 3),
+            "slow": [q for q in self.queries if q["duration_ms"] >= self.slow_ms],
+            "statements": [query["sql"] for query in self.queries],
+            "repeated": [
+                {"shape": shape, "count": count}
+                for shape, count in shapes.most_common()
+                if count >= self.repeated_threshold
+            ],
+        }
+
+
+class InspectorReports:
+    """
+    In-process reports of the inspected requests, aggregated per endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, report):
+        with self._lock:
+            endpoint = self._endpoints.setdefault(
+                report["endpoint"],
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "slow_queries": 0,
+                    "repeated": {},
+                    "last_report": None,
+                },
+            )
+            endpoint["requests"] += 1
+            endpoint["queries"] += report["queries"]
+            endpoint["max_queries"] = max(endpoint["max_queries"], report["queries"])
+            endpoint["slow_queries"] += len(report["slow"])
+            for repeated in report["repeated"]:
+                endpoint["repeated"][repeated["shape"]] = max(
+                    endpoint["repeated"].get(repeated["shape"], 0), repeated["count"]
+                )
+            endpoint["last_report"] = report
+
+    def get(self, endpoint):
+        with self._lock:
+            return self._endpoints.get(endpoint)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                name: {
+                    key: value for key, value in data.items() if key != "last_report"
+                }
+                for name, data in self._endpoints.items()
+            }
+
+
+inspector_reports = InspectorReports()
+
+
+def inspect_queries(endpoint, function, *args, **kwargs):
+    """
+    The function runs a callable (the dispatch of a view) recording its statements, the report is
+    added to `inspector_reports` and the slow and repeated statements are logged as warnings.
+
+    :param endpoint: The name the report is aggregated under, the view class
+    :param function: The callable serving the request
+    :return: the value returned by the callable.
+    """
+    inspector = QueryInspector(endpoint)
+    response = None
+    try:
+        with inspector:
+            response = function(*args, **kwargs)
+        return response
+    finally:
+        if getattr(response, "streaming", False):
+            # The rows of a streaming response are read while it's sent
+            response.streaming_content = inspect_stream(
+                inspector, response.streaming_content
+            )
+        else:
+            # Failed requests are reported too
+            record_report(inspector.report())
+
+
+def inspect_stream(inspector, content):
+    try:
+        yield from iterate_within(content, lambda: inspector)
+    finally:
+        record_report(inspector.report())
+
+
+def record_report(report):
+    endpoint = report["endpoint"]
+    inspector_reports.add(report)
+    for query in report["slow"]:
+        logger.warning(
+            "Slow query on %s (%s ms): %s", endpoint, query["duration_ms"], query["sql"]
+        )
+    for repeated in report["repeated"]:
+        logger.warning(
+            "Possible N+1 on %s, %s queries with the shape: %s",
+            endpoint,
+            repeated["count"],
+            repeated["shape"],
+        )
+
+
+class QueryBudget:
+    """
+    Assertions over the inspected requests, used by the `query_budget` pytest fixture.
+    """
+
+    def __init__(self, reports=inspector_reports):
+        self.reports = reports
+
+    def endpoint(self, endpoint):
+        data = self.reports.get(endpoint)
+        assert data is not None, f"No request served by {endpoint} was inspected"
+        return data
+
+    def assert_max_queries(self, endpoint, max_queries):
+        """
+        The function fails when a request served by the endpoint ran more than `max_queries`.
+
+        :param endpoint: The view class name
+        :param max_queries: The maximum amount of queries a request can run
+        """
+        data = self.endpoint(endpoint)
+        assert data["max_queries"] <= max_queries, (
+            f"{endpoint} ran {data['max_queries']} queries (budget {max_queries}): "
+            + "; ".join(data["last_report"]["statements"])
+        )
+
+    def assert_no_repeated_queries(self, endpoint):
+        data = self.endpoint(endpoint)
+        assert not data["repeated"], f"Possible N+1 on {endpoint}: {data['repeated']}"
@@ -0,0 +1,340 @@
+from collections import defaultdict
+from datetime import timedelta, timezone
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import Cast, NullIf, TruncDay, TruncHour
+
+from sprocket.models import (
+    ProductionChunk,
+    ProductionRollup,
+    RollupDirtyBucket,
+    SprocketProduction,
+)
+from sprocket.utils.aggregations import BUCKET_FUNCTIONS
+from sprocket.utils.columnar import refresh_chunks
+
+ONE_HOUR = timedelta(hours=1)
+ONE_DAY = timedelta(days=1)
+ROLLUP_FIELDS = ("sprocket_actual", "sprocket_goal")
+ROLLUP_FUNCTIONS = (("sum", Sum), ("min", Min), ("max", Max))
+
+
+def hour_start(value):
+    value = SprocketProduction._meta.get_field("date_produced").to_python(value)
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(value):
+    return hour_start(value).replace(hour=0)
+
+
+# Buckets each rollup granularity can answer, from the coarsest to the finest rollup
+ROLLUP_ROUTES = (
+    (ProductionRollup.DAY, ("day", "week"), day_start),
+    (ProductionRollup.HOUR, ("hour", "day", "week"), hour_start),
+)
+
+
+def hour_runs(hours):
+    """
+    The function merges a set of hours into contiguous `[start, end)` ranges, so a long backfill is
+    refreshed with a few range queries instead of one query per hour.
+
+    :param hours: An iterable of hour starts
+    :return: a list of tuples with the start and the (exclusive) end of every range.
+    """
+    runs = []
+    for hour in sorted(set(hours)):
+        if runs and runs[-1][1] == hour:
+            runs[-1][1] = hour + ONE_HOUR
+        else:
+            runs.append([hour, hour + ONE_HOUR])
+    return [tuple(run) for run in runs]
+
+
+def lock_pair(factory_id, sprocket_id):
+    """
+    The function serializes the refreshes of a factory and sprocket until the transaction ends, on
+    PostgreSQL two writers rebuilding the same buckets would otherwise both delete them and both
+    insert them again, the second one failing on the unique constraint.
+
+    :param factory_id: The factory of the rollups
+    :param sprocket_id: The sprocket of the rollups
+    """
+    connection = connections[router.db_for_write(ProductionRollup)]
+    if connection.vendor != "postgresql":
+        return
+    # One signed 64 bits key per pair, a collision only makes two pairs wait for each other
+    key = ((factory_id & 0xFFFFFFFF) << 32 | sprocket_id & 0xFFFFFFFF) - (1 << 63)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+def rollup_rows(aggregates, granularity, factory_id, sprocket_id):
+    return [
+        ProductionRollup(
+            granularity=granularity,
+            factory_id=factory_id,
+            sprocket_id=sprocket_id,
+            **aggregate,
+        )
+        for aggregate in aggregates
+    ]
+
+
+def refresh_range(factory_id, sprocket_id, start, end):
+    """
+    The function recomputes the hourly rollups of a factory and sprocket in `[start, end)` from the
+    production rows, and the daily rollups of the days touching that range from the hourly ones.
+    With `COLUMNAR_STORAGE_ENABLED` the production chunks of those days are repacked as well.
+
+    :param factory_id: The factory of the rollups
+    :param sprocket_id: The sprocket of the rollups
+    :param start: The first hour to recompute
+    :param end: The end (exclusive) of the hours to recompute
+    """
+    lock_pair(factory_id, sprocket_id)
+    pair = {"factory_id": factory_id, "sprocket_id": sprocket_id}
+    hourly = (
+        SprocketProduction.objects.filter(
+            deleted=False, date_produced__gte=start, date_produced__lt=end, **pair
+        )
+        .annotate(bucket_start=TruncHour("date_produced"))
+        .values("bucket_start")
+        .annotate(
+            rows=Count("id"),
+            **{
+                f"{field}_{name}": function(field)
+                for field in ROLLUP_FIELDS
+                for name, function in ROLLUP_FUNCTIONS
+            },
+        )
+    )
+    ProductionRollup.objects.filter(
+        granularity=ProductionRollup.HOUR,
+        bucket_start__gte=start,
+        bucket_start__lt=end,
+        **pair,
+    ).delete()
+    ProductionRollup.objects.bulk_create(
+        rollup_rows(hourly, ProductionRollup.HOUR, factory_id, sprocket_id)
+    )
+
+    day_from, day_to = day_start(start), day_start(end - ONE_HOUR) + ONE_DAY
+    daily = (
+        ProductionRollup.objects.filter(
+            granularity=ProductionRollup.HOUR,
+            bucket_start__gte=day_from,
+            bucket_start__lt=day_to,
+            **pair,
+        )
+        .annotate(day=TruncDay("bucket_start"))
+        .values("day")
+        # The annotations can't be named like the model fields, they get a `day_` prefix
+        .annotate(
+            day_rows=Sum("rows"),
+            **{
+                f"day_{field}_{name}": function(f"{field}_{name}")
+                for field in ROLLUP_FIELDS
+                for name, function in ROLLUP_FUNCTIONS
+            },
+        )
+    )
+    ProductionRollup.objects.filter(
+        granularity=ProductionRollup.DAY,
+        bucket_start__gte=day_from,
+        bucket_start__lt=day_to,
+        **pair,
+    ).delete()
+    ProductionRollup.objects.bulk_create(
+        rollup_rows(
+            (
+                {
+                    "bucket_start": row.pop("day"),
+                    **{key[len("day_") :]: value for key, value in row.items()},
+                }
+                for row in daily
+            ),
+            ProductionRollup.DAY,
+            factory_id,
+            sprocket_id,
+        )
+    )
+    if settings.COLUMNAR_STORAGE_ENABLED:
+        refresh_chunks(factory_id, sprocket_id, day_from, day_to)
+
+
+def refresh_hours(hours_by_pair):
+    """
+    The function refreshes the rollups of the given hours.
+
+    :param hours_by_pair: A dictionary of `(factory_id, sprocket_id)` to an iterable of hour starts
+    :return: the amount of hour ranges refreshed.
+    """
+    refreshed = 0
+    with transaction.atomic():
+        # Always locking the pairs in the same order, so concurrent writers can't deadlock
+        for (factory_id, sprocket_id), hours in sorted(hours_by_pair.items()):
+            for start, end in hour_runs(hours):
+                refresh_range(factory_id, sprocket_id, start, end)
+                refreshed += 1
+    return refreshed
+
+
+def group_hours(keys):
+    hours_by_pair = defaultdict(set)
+    for factory_id, sprocket_id, date_produced in keys:
+        hours_by_pair[(factory_id, sprocket_id)].add(hour_start(date_produced))
+    return hours_by_pair
+
+
+def mark_dirty(hours_by_pair):
+    RollupDirtyBucket.objects.bulk_create(
+        [
+            RollupDirtyBucket(
+                factory_id=factory_id, sprocket_id=sprocket_id, bucket_start=hour
+            )
+            for (factory_id, sprocket_id), hours in hours_by_pair.items()
+            for hour in hours
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def record_rollup_hours(hours_by_pair, refresh=None):
+    """
+    The function keeps the rollups in sync with written production rows, the touched hours are
+    refreshed right away or marked as dirty for `manage.py refresh_rollups` depending on the
+    `ROLLUP_REFRESH_ON_WRITE` setting.
+
+    :param hours_by_pair: A dictionary of `(factory_id, sprocket_id)` to a set of hour starts
+    :param refresh: Overrides the `ROLLUP_REFRESH_ON_WRITE` setting
+    """
+    if not hours_by_pair:
+        return
+    if refresh is None:
+        refresh = settings.ROLLUP_REFRESH_ON_WRITE
+    if refresh:
+        refresh_hours(hours_by_pair)
+    else:
+        mark_dirty(hours_by_pair)
+
+
+def record_rollup_changes(keys, refresh=None):
+    """
+    The function keeps the rollups in sync with individually written production rows.
+
+    :param keys: An iterable of `(factory_id, sprocket_id, date_produced)` tuples
+    :param refresh: Overrides the `ROLLUP_REFRESH_ON_WRITE` setting
+    """
+    record_rollup_hours(group_hours(keys), refresh)
+
+
+def refresh_dirty(limit=None):
+    """
+    The function refreshes the buckets marked as dirty and removes their marks.
+
+    :param limit: The maximum amount of dirty hours to process
+    :return: the amount of dirty hours processed.
+    """
+    with transaction.atomic():
+        dirty = RollupDirtyBucket.objects.select_for_update().order_by("bucket_start")
+        dirty = list(dirty[:limit] if limit else dirty)
+        hours_by_pair = defaultdict(set)
+        for mark in dirty:
+            hours_by_pair[(mark.factory_id, mark.sprocket_id)].add(mark.bucket_start)
+        refresh_hours(hours_by_pair)
+        RollupDirtyBucket.objects.filter(id__in=[mark.id for mark in dirty]).delete()
+    return len(dirty)
+
+
+def rebuild_all():
+    """
+    The function recomputes every rollup (and production chunk) from the production rows.
+
+    :return: the amount of hour ranges refreshed.
+    """
+    pairs = (
+        SprocketProduction.objects.filter(deleted=False)
+        .values("factory_id", "sprocket_id")
+        .annotate(first=Min("date_produced"), last=Max("date_produced"))
+        .order_by("factory_id", "sprocket_id")
+    )
+    with transaction.atomic():
+        ProductionRollup.objects.all().delete()
+        RollupDirtyBucket.objects.all().delete()
+        if settings.COLUMNAR_STORAGE_ENABLED:
+            ProductionChunk.objects.all().delete()
+        for pair in pairs:
+            start = hour_start(pair["first"])
+            end = hour_start(pair["last"]) + ONE_HOUR
+            refresh_range(pair["factory_id"], pair["sprocket_id"], start, end)
+    return len(pairs)
+
+
+def rollup_route(bucket, date_filters):
+    """
+    The function picks the coarsest rollup able to answer an aggregation, a rollup can be used when
+    the requested bucket is a multiple of its granularity and the `date_produced` range boundaries
+    are aligned to it.
+
+    :param bucket: The requested bucket (`minute`, `hour`, `day` or `week`)
+    :param date_filters: A dictionary of `date_produced` lookups (`gte`, `lt`, ...) to datetimes
+    :return: the rollup granularity to use or None to aggregate the production rows.
+    """
+    if not settings.ROLLUP_ROUTING_ENABLED:
+        return None
+    for granularity, buckets, truncate in ROLLUP_ROUTES:
+        aligned = all(
+            lookup in ("gte", "lt") and value == truncate(value)
+            for lookup, value in date_filters.items()
+        )
+        if bucket in buckets and aligned:
+            return granularity
+    return None
+
+
+def aggregate_rollups(granularity, filters, date_filters, bucket, group_by=()):
+    """
+    The function answers an aggregation from a rollup table, the output has the same shape as
+    `sprocket.utils.aggregations.aggregate_production`.
+
+    :param granularity: The rollup granularity to read
+    :param filters: A dictionary with the `factory_id`/`sprocket_id` filters
+    :param date_filters: A dictionary of `date_produced` lookups to datetimes
+    :param bucket: The requested bucket
+    :param group_by: An iterable with `factory_id` and/or `sprocket_id`
+    :return: a list of dictionaries, one per bucket and group, ordered by bucket.
+    """
+    queryset = ProductionRollup.objects.filter(
+        granularity=granularity,
+        **filters,
+        **{f"bucket_start__{lookup}": value for lookup, value in date_filters.items()},
+    )
+    # The annotations can't be named like the model fields they read, they get a `rollup_` prefix
+    aggregates = {"rollup_rows": Sum("rows")}
+    for field in ROLLUP_FIELDS:
+        aggregates.update(
+            {
+                f"rollup_{field}_sum": Sum(f"{field}_sum"),
+                f"rollup_{field}_avg": Cast(Sum(f"{field}_sum"), FloatField())
+                / Cast(Sum("rows"), FloatField()),
+                f"rollup_{field}_min": Min(f"{field}_min"),
+                f"rollup_{field}_max": Max(f"{field}_max"),
+            }
+        )
+    aggregates["rollup_attainment"] = Cast(
+        Sum("sprocket_actual_sum"), FloatField()
+    ) / NullIf(Cast(Sum("sprocket_goal_sum"), FloatField()), Value(0.0))
+    rows = (
+        queryset.annotate(bucket=BUCKET_FUNCTIONS[bucket]("bucket_start"))
+        .values("bucket", *group_by)
+        .annotate(**aggregates)
+        .order_by("bucket", *group_by)
+    )
+    return [
+        {key.replace("rollup_", "", 1): value for key, value in row.items()}
+        for row in rows
+    ]
@@ -0,0 +1,77 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def dumps_stdlib(data):
+    """
+    The function encodes data to JSON bytes using the standard library and `DjangoJSONEncoder`,
+    the same output `JsonResponse` produces.
+
+    :param data: The python object to encode
+    :return: the JSON document as bytes.
+    """
+    return json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+
+
+def dumps_orjson(data):
+    """
+    The function encodes data to JSON bytes using orjson, datetimes, decimals and any other type
+    orjson doesn't know are delegated to `DjangoJSONEncoder` so the output matches the stdlib one.
+
+    :param data: The python object to encode
+    :return: the JSON document as bytes.
+    """
+    return orjson.dumps(
+        data,
+        default=_django_encoder.default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+ENCODER_BACKENDS = {
+    "json": dumps_stdlib,
+    "orjson": dumps_orjson,
+}
+
+
+def get_encoder():
+    """
+    The function returns the encoder configured through the `JSON_ENCODER_BACKEND` setting, `auto`
+    picks orjson when it's installed and the standard library otherwise.
+
+    :return: a function that encodes python objects to JSON bytes.
+    """
+    backend = getattr(settings, "JSON_ENCODER_BACKEND", "auto")
+    if backend == "auto":
+        backend = "orjson" if orjson is not None else "json"
+    if backend == "orjson" and orjson is None:
+        raise ImportError("The orjson encoder backend requires the orjson package")
+    return ENCODER_BACKENDS[backend]
+
+
+def json_dumps(data):
+    return get_encoder()(data)
+
+
+class EnvelopeResponse(HttpResponse):
+    """
+    JSON response that assembles the API envelope (data, pagination metadata and `success`) and
+    encodes it once.
+    """
+
+    def __init__(self, payload, success=True, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=json_dumps({**payload, "success": success}), **kwargs)
+        # Rows serialized, read by the request metrics
+        data = payload.get("data")
+        self.rows = len(data) if isinstance(data, list) else int(data is not None)
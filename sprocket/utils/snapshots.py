@@ -0,0 +1,180 @@
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateTimeField,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from sprocket.models import Factory, SprocketProduction
+from sprocket.utils.cache import bump_model_version, invalidate_detail
+
+SNAPSHOT_FIELDS = (
+    "production_count",
+    "total_sprocket_goal",
+    "total_sprocket_actual",
+    "last_produced_at",
+    "sprocket_goal",
+    "sprocket_actual",
+)
+
+
+def summarize_rows(rows, summaries=None):
+    """
+    The function groups production rows by factory.
+
+    :param rows: An iterable of `SprocketProduction` instances
+    :param summaries: The summaries of the previous batches of the same load, updated in place
+    :return: a dictionary of factory id to a dictionary with the `count`, the `goal`/`actual` sums
+    and the `latest` row.
+    """
+    summaries = {} if summaries is None else summaries
+    for row in rows:
+        summary = summaries.setdefault(
+            row.factory_id, {"count": 0, "goal": 0, "actual": 0, "latest": row}
+        )
+        summary["count"] += 1
+        summary["goal"] += row.sprocket_goal
+        summary["actual"] += row.sprocket_actual
+        if row.date_produced >= summary["latest"].date_produced:
+            summary["latest"] = row
+    return summaries
+
+
+def apply_production(rows):
+    """
+    The function adds inserted production rows to the snapshot of their factories.
+
+    :param rows: An iterable of inserted `SprocketProduction` instances
+    :return: the list of updated factory ids.
+    """
+    return apply_summaries(summarize_rows(rows))
+
+
+def apply_summaries(summaries):
+    """
+    The function adds the summaries of inserted production rows to the snapshot of their factories,
+    the totals are incremented with `F()` expressions and the latest values are only replaced when
+    the rows have a newer one, so concurrent writers never lose an update. It runs one UPDATE per
+    factory, in the order of their ids so concurrent loads lock the factory rows in the same order
+    and can't deadlock.
+
+    :param summaries: A dictionary built by `summarize_rows`
+    :return: the list of updated factory ids.
+    """
+    now = timezone.now()
+    for factory_id, summary in sorted(summaries.items()):
+        latest = summary["latest"]
+        is_latest = Q(last_produced_at__isnull=True) | Q(
+            last_produced_at__lte=latest.date_produced
+        )
+        Factory.objects.filter(pk=factory_id).update(
+            production_count=F("production_count") + summary["count"],
+            total_sprocket_goal=F("total_sprocket_goal") + summary["goal"],
+            total_sprocket_actual=F("total_sprocket_actual") + summary["actual"],
+            sprocket_goal=Case(
+                When(is_latest, then=Value(latest.sprocket_goal)),
+                default=F("sprocket_goal"),
+                output_field=IntegerField(),
+            ),
+            sprocket_actual=Case(
+                When(is_latest, then=Value(latest.sprocket_actual)),
+                default=F("sprocket_actual"),
+                output_field=IntegerField(),
+            ),
+            last_produced_at=Case(
+                When(is_latest, then=Value(latest.date_produced)),
+                default=F("last_produced_at"),
+                output_field=DateTimeField(),
+            ),
+            last_updated=now,
+        )
+
+    # update() doesn't send post_save, so the cached values are invalidated here
+    if summaries:
+        bump_model_version(Factory)
+        for factory_id in summaries:
+            invalidate_detail(Factory, factory_id)
+    return sorted(summaries)
+
+
+def rebuild_snapshots(factory_ids=None):
+    """
+    The function recomputes the production snapshot of the factories from the live production rows,
+    e.g. after rows were updated or soft deleted. The totals and the latest row of every factory are
+    read with a single query, and only the factories whose snapshot changed are written (with a new
+    `last_updated`, so their validators change too).
+
+    :param factory_ids: An iterable with the factories to recompute, all of them by default
+    :return: the amount of factories updated.
+    """
+    with transaction.atomic():
+        factories = Factory.objects.all()
+        if factory_ids is not None:
+            factories = factories.filter(pk__in=factory_ids)
+            # Waits for the loads writing to these factories, the totals are read once they commit
+            list(factories.select_for_update().order_by("pk").values_list("pk"))
+        changed = write_snapshots(factories)
+    # Invalidated once committed, a read meanwhile can't cache the previous snapshot again
+    if changed:
+        bump_model_version(Factory)
+    for factory_id in changed:
+        invalidate_detail(Factory, factory_id)
+    return len(changed)
+
+
+def write_snapshots(factories):
+    """
+    The function writes the snapshot of the factories whose stored one differs from their live
+    production rows.
+
+    :param factories: A queryset with the factories to recompute
+    :return: the list of updated factory ids.
+    """
+    live = SprocketProduction.objects.filter(deleted=False, factory_id=OuterRef("pk"))
+    latest = live.order_by("-date_produced", "-id")
+
+    def total(aggregate, default):
+        # A correlated aggregate, grouped by the factory only
+        rows = live.order_by().values("factory_id").annotate(value=aggregate)
+        return Coalesce(Subquery(rows.values("value")), Value(default))
+
+    factories = list(
+        factories.annotate(
+            live_count=total(Count("id"), 0),
+            live_goal=total(Sum("sprocket_goal"), 0),
+            live_actual=total(Sum("sprocket_actual"), 0),
+            latest_date=Subquery(latest.values("date_produced")[:1]),
+            latest_goal=Subquery(latest.values("sprocket_goal")[:1]),
+            latest_actual=Subquery(latest.values("sprocket_actual")[:1]),
+        )
+    )
+    now = timezone.now()
+    changed = []
+    for factory in factories:
+        snapshot = {
+            "production_count": factory.live_count,
+            "total_sprocket_goal": factory.live_goal,
+            "total_sprocket_actual": factory.live_actual,
+            "last_produced_at": factory.latest_date,
+        }
+        if factory.latest_date is not None:
+            snapshot["sprocket_goal"] = factory.latest_goal
+            snapshot["sprocket_actual"] = factory.latest_actual
+        if all(getattr(factory, field) == value for field, value in snapshot.items()):
+            continue
+        for field, value in snapshot.items():
+            setattr(factory, field, value)
+        factory.last_updated = now
+        changed.append(factory)
+    Factory.objects.bulk_update(changed, [*SNAPSHOT_FIELDS, "last_updated"])
+    return [factory.id for factory in changed]
@@ -30,15 +30,3 @@ def check_keys_on_dict(keys, dictionary):
     returns a list of all the keys in `keys` that are not present in `dictionary`.
     """
     return [field for field in keys if field not in dictionary]
-
-
-def add_field_to_response(response, key, value):
-    # Get the underlying JSON data
-    json_data = json.loads(response.content)
-
-    # Add a new field to the JSON data
-    json_data[key] = value
-
-    # Set the modified JSON data back to the response
-    response.content = json.dumps(json_data)
-    return response
@@ -0,0 +1,245 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from sprocket.utils.exceptions import TooManyRequests
+from sprocket.utils.ingest import bulk_ingest
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue of unsaved `SprocketProduction` rows, a background thread writes them
+    with a single bulk insert whenever `flush_size` rows are pending or the oldest pending row waited
+    `flush_interval` seconds. A failed batch is retried with an exponential backoff, after
+    `max_retries` failures its rows are written one by one and the ones still failing are moved to
+    the dead-letter queue, so they don't block the rows behind them.
+    """
+
+    def __init__(
+        self,
+        max_size,
+        flush_size,
+        flush_interval,
+        writer=bulk_ingest,
+        max_retries=5,
+        retry_backoff=0.5,
+        max_retry_backoff=30.0,
+    ):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._pending = deque()
+        # Rows that couldn't be written, kept for inspection up to `max_size`
+        self.dead_letter = deque(maxlen=max_size)
+        self._failures = 0
+        self._retry_at = 0.0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.rejected_rows = 0
+        self.flush_errors = 0
+        self.dead_letter_rows = 0
+        self.last_flush_seconds = None
+        self.max_flush_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def put(self, rows):
+        """
+        The function queues a batch of validated rows, the whole batch is refused when it doesn't
+        fit in the queue.
+
+        :param rows: A list of unsaved `SprocketProduction` instances
+        :return: the depth of the queue after adding the rows.
+        """
+        with self._condition:
+            if self._closed:
+                raise TooManyRequests("The ingest buffer is shutting down")
+            if len(self._pending) + len(rows) > self.max_size:
+                self.rejected_rows += len(rows)
+                raise TooManyRequests("The ingest buffer is full, retry later")
+            now = time.monotonic()
+            self._pending.extend((now, row) for row in rows)
+            self.start()
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify()
+            return len(self._pending)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="sprocket-write-behind", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                ready = self._condition.wait_for(
+                    self._should_flush, timeout=self.flush_interval
+                )
+                if self._closed:
+                    # `close` writes the rows left
+                    return
+                if not ready:
+                    continue
+            # The thread keeps its own connection, drop it when it's broken or expired like the
+            # request_started/request_finished signals do for the request threads
+            close_old_connections()
+            self.flush(limit=self.flush_size)
+
+    def _should_flush(self):
+        if self._closed:
+            return True
+        # Backing off after a failed flush
+        if time.monotonic() < self._retry_at:
+            return False
+        if len(self._pending) >= self.flush_size:
+            return True
+        return bool(self._pending) and (
+            time.monotonic() - self._pending[0][0] >= self.flush_interval
+        )
+
+    def flush(self, limit=None):
+        """
+        The function writes the pending rows (up to `limit`) with one bulk insert, on a failure they
+        are queued again to be retried once the backoff elapses, or salvaged row by row when the
+        batch failed `max_retries` times in a row.
+
+        :param limit: The maximum amount of rows to write, all the pending ones by default
+        :return: the amount of rows written.
+        """
+        with self._flush_lock:
+            with self._condition:
+                size = len(self._pending) if limit is None else limit
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(size, len(self._pending)))
+                ]
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                self.writer([row for _, row in batch])
+                written = len(batch)
+            except Exception:
+                logger.exception("Flushing %s production rows failed", len(batch))
+                self.flush_errors += 1
+                self._failures += 1
+                if self._failures <= self.max_retries:
+                    backoff = self.retry_backoff * 2 ** (self._failures - 1)
+                    with self._condition:
+                        self._pending.extendleft(reversed(batch))
+                        self._retry_at = time.monotonic() + min(
+                            backoff, self.max_retry_backoff
+                        )
+                    return 0
+                written = self._salvage(batch)
+
+            self._failures = 0
+            self._retry_at = 0.0
+            elapsed = time.monotonic() - started
+            self.flushes += 1
+            self.flushed_rows += written
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self.max_wait_seconds = max(
+                self.max_wait_seconds, time.monotonic() - batch[0][0]
+            )
+            return written
+
+    def _salvage(self, batch):
+        """
+        The function writes the rows of a batch that keeps failing one at a time, the rows that
+        still fail (e.g. their factory was deleted after they were validated) are dead-lettered.
+
+        :param batch: A list of `(queued at, row)` tuples
+        :return: the amount of rows written.
+        """
+        written = 0
+        for _, row in batch:
+            try:
+                self.writer([row])
+                written += 1
+            except Exception:
+                logger.exception(
+                    "Dead-lettering a production row that can't be written"
+                )
+                self.dead_letter.append(row)
+                self.dead_letter_rows += 1
+        return written
+
+    def close(self):
+        """
+        The function stops the background thread and writes every pending row, it runs on the
+        interpreter shutdown.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        while self._pending:
+            if not self.flush():
+                break
+
+    def to_dict(self):
+        return {
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "rejected_rows": self.rejected_rows,
+            "flush_errors": self.flush_errors,
+            "dead_letter_rows": self.dead_letter_rows,
+            "last_flush_ms": (
+                None
+                if self.last_flush_seconds is None
+                else round(self.last_flush_seconds * 1000, 2)
+            ),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_production_buffer():
+    """
+    The function returns the write-behind buffer of the process, configured by the
+    `INGEST_BUFFER_*` settings.
+
+    :return: a `WriteBehindBuffer` instance.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer(
+                settings.INGEST_BUFFER_MAX_SIZE,
+                settings.INGEST_BUFFER_FLUSH_SIZE,
+                settings.INGEST_BUFFER_FLUSH_INTERVAL,
+                max_retries=settings.INGEST_BUFFER_MAX_RETRIES,
+                retry_backoff=settings.INGEST_BUFFER_RETRY_BACKOFF,
+            )
+    return _buffer
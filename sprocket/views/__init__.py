@@ -1,17 +1,52 @@
 from typing import Any
 from django.views import View
+from app.db.pool import pool_stats
+from app.db.router import can_read_replica, pin_to_primary, replica_reads
+from app.metrics import registry as metrics_registry
 from wsgiref.simple_server import WSGIRequestHandler
-from django.http import JsonResponse
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import connection, router, transaction
 from django.forms.models import model_to_dict
-from sprocket.utils.exceptions import BadRequest, MethodNotAllowed, NotFound
+from django.utils import timezone
+from sprocket.utils.exceptions import (
+    BadRequest,
+    BaseCustomException,
+    BatchValidationError,
+    MethodNotAllowed,
+    NotFound,
+)
+import csv
 import json
-from sprocket.utils.model_queries import (
-    query_filter_to_paginated_api_view,
-    query_order_to_paginated_api_view,
+import math
+from contextlib import nullcontext
+from sprocket.utils.cache import (
+    bump_model_version,
+    detail_cache_stats,
+    get_cached_detail,
+    get_detail_version,
+    invalidate_detail,
+    set_cached_detail,
+)
+from sprocket.utils.conditional import (
+    list_validators,
+    not_modified_response,
+    record_validators,
+    set_validators,
 )
-from sprocket.utils.utils import add_field_to_response, check_keys_on_dict
+from sprocket.utils.counting import COUNT_EXACT, COUNT_STRATEGIES, count_queryset
+from sprocket.utils.cursor_pagination import (
+    decode_cursor,
+    keyset_ordering,
+    keyset_page,
+)
+from sprocket.utils.model_queries import compile_query_spec
+from sprocket.utils.query_inspector import inspect_queries, inspector_reports
+from sprocket.utils.serialization import EnvelopeResponse, json_dumps
+from sprocket.utils.utils import check_keys_on_dict
+from sprocket.utils.write_behind import get_production_buffer
 
 
 # The `BaseView` class is a base class for handling HTTP requests and processing payloads in a Django
@@ -20,6 +55,23 @@ class BaseView(View):
     method = "POST"
     required_fields = []
     model = None
+    optional_fields = []
+    cache_detail = False
+    response_validators = None
+
+    def dispatch(self, request, *args, **kwargs):
+        # GET requests read from the replicas unless the client wrote in the last seconds
+        with replica_reads(can_read_replica(request)):
+            # The debug/CI query inspector records every statement run to serve the request
+            if settings.QUERY_INSPECTOR_ENABLED:
+                response = inspect_queries(
+                    type(self).__name__, super().dispatch, request, *args, **kwargs
+                )
+            else:
+                response = super().dispatch(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") and response.status_code < 400:
+            pin_to_primary(response)
+        return response
 
     def proccess_payload_post_put(self, request, **kwargs):
         """
@@ -68,23 +120,20 @@ class BaseView(View):
         """
         try:
             parameters = self.proccess_payload_post_put(request, **kwargs)
-            response = self.process_request(request, parameters)
+            payload = self.process_request(request, parameters)
         except NotImplementedError as e:
             try:
                 record = save_update_record(parameters)
                 record.full_clean()
                 record.save()
-                response = JsonResponse(
-                    {
-                        "data": model_to_dict(record),
-                    }
-                )
-                return response
+                payload = {
+                    "data": model_to_dict(record),
+                }
             except ObjectDoesNotExist:
                 raise NotFound
             except ValidationError as e:
                 raise BadRequest(f"Invalid data provided: {str(e)}")
-        return self.add_success(response)
+        return self.render(payload)
 
     def proccess_get_delete(self, request, get_delete_record, **kwargs):
         """
@@ -99,20 +148,117 @@ class BaseView(View):
         :return: the response object after processing the request and adding success to it.
         """
         parameters = self.proccess_payload_get_delete(request, **kwargs)
+        # Detail views accepting the `fields` parameter return a sparse fieldset of the record
+        fields = None
+        if "fields" in self.optional_fields:
+            fields = self.requested_fields(parameters, self.detail_fields())
+        variant = ",".join(fields or [])
+
+        # Single object reads are served from the pre-serialized body cached by model and id
+        cacheable = self.use_detail_cache(request, parameters)
+        if cacheable:
+            # Read before the record, a write landing meanwhile makes the body stored below unreachable
+            version = get_detail_version(self.model, parameters.get("id"))
+            entry = get_cached_detail(
+                self.model, parameters.get("id"), version, variant
+            )
+            if entry is not None:
+                self.response_validators = (entry["etag"], entry["last_modified"])
+                if entry["etag"]:
+                    not_modified = not_modified_response(
+                        request, *self.response_validators
+                    )
+                    if not_modified is not None:
+                        return not_modified
+                response = HttpResponse(entry["body"], content_type="application/json")
+                return self.add_validators(response)
+
         try:
-            response = self.process_request(request, parameters)
+            payload = self.process_request(request, parameters)
         except NotImplementedError:
-            record = get_delete_record(parameters)
-            response = JsonResponse(
-                {
-                    "data": model_to_dict(record),
-                }
+            # The cached body is shared by every client, it's read from the primary so a lagging
+            # replica can't cache a stale version
+            with replica_reads(False) if cacheable else nullcontext():
+                record = get_delete_record(parameters)
+            if request.method == "GET":
+                self.response_validators = record_validators(record, variant)
+                # A client holding the current version gets a 304 before the record is serialized
+                if self.response_validators:
+                    not_modified = not_modified_response(
+                        request, *self.response_validators
+                    )
+                    if not_modified is not None:
+                        return not_modified
+            payload = {
+                "data": model_to_dict(record, fields=fields),
+            }
+        response = self.add_validators(self.render(payload))
+        if cacheable:
+            set_cached_detail(
+                self.model,
+                parameters.get("id"),
+                version,
+                response.content,
+                *(self.response_validators or (None, None)),
+                variant=variant,
+            )
+        return response
+
+    def use_detail_cache(self, request, parameters):
+        # Views embedding data the detail cache doesn't track opt out per request
+        return self.cache_detail and request.method == "GET"
+
+    def detail_fields(self):
+        # The fields `model_to_dict` returns
+        return [
+            field.name for field in self.model._meta.concrete_fields if field.editable
+        ]
+
+    @staticmethod
+    def requested_fields(body, allowed_fields):
+        """
+        The function reads and validates the sparse fieldset sent through the `fields` parameter.
+
+        :param body: The `body` parameter is a dictionary with the parameters of the request
+        :param allowed_fields: The list of fields the view can return
+        :return: the list of requested fields, or None when the parameter isn't sent.
+        """
+        if not body.get("fields"):
+            return None
+        fields = [field for field in body["fields"].split(",") if field]
+        fields = list(dict.fromkeys(fields))
+        if not fields or any(field not in allowed_fields for field in fields):
+            raise BadRequest(
+                "The fields parameter only accepts: " + ",".join(allowed_fields)
             )
-        return self.add_success(response)
+        return fields
+
+    def add_validators(self, response):
+        """
+        The function adds the `ETag` and `Last-Modified` headers computed while processing a GET request
+        to its successful response.
+
+        :param response: The HTTP response
+        :return: the same HTTP response.
+        """
+        if self.response_validators and response.status_code == 200:
+            set_validators(response, *self.response_validators)
+        return response
 
     @staticmethod
-    def add_success(response, key="success", status=True):
-        return add_field_to_response(response, key, status)
+    def render(payload, success=True):
+        """
+        The function builds the HTTP response of a payload, the envelope (data, metadata and
+        `success`) is encoded once. Views that already built their own response (e.g. streaming
+        ones) are returned untouched.
+
+        :param payload: The dictionary returned by the view or an already built response
+        :param success: The value of the `success` field of the envelope
+        :return: the HTTP response.
+        """
+        if isinstance(payload, HttpResponseBase):
+            return payload
+        return EnvelopeResponse(payload, success=success)
 
     def validate_payload(self, payload: dict):
         """
@@ -124,7 +270,10 @@ class BaseView(View):
         """
         message = None
         missing_fields = check_keys_on_dict(self.required_fields, payload)
-        more_fields = len(list(payload.keys())) > len(self.required_fields)
+        payload_fields = [
+            key for key in payload.keys() if key not in self.optional_fields
+        ]
+        more_fields = len(payload_fields) > len(self.required_fields)
         if missing_fields:
             message = "You miss one or more required fields on the payload: "
         elif more_fields:
@@ -173,6 +322,8 @@ class BaseView(View):
             record = self.model.objects.get(id=parameters.get("id"))
             record.deleted = True
             record.save()
+            invalidate_detail(self.model, record.pk)
+            return record
 
         return self.proccess_get_delete(request, delete_record, **kwargs)
 
@@ -191,6 +342,36 @@ class PaginatedView(BaseView):
         # Get all objects from the model
         return self.model.objects.all()
 
+    def filter_queryset(self, request, body):
+        """
+        The function builds the queryset of a request applying the soft delete, filter and order
+        conditions sent through the query parameters.
+
+        :param request: The `request` parameter is the HTTP request object that contains information
+        about the current request being made to the server
+        :param body: The `body` parameter is a dictionary with the query parameters of the request
+        :return: a tuple with the filtered queryset and the list of ordering conditions applied.
+        """
+        queryset = self.base_query(request)
+
+        # Check if model has deleted field and then use it to filter deleted data
+        if hasattr(self.model, "deleted"):
+            queryset = queryset.filter(deleted=0)
+
+        # The filter and order parameters are compiled once into a validated (and memoized) spec
+        spec = compile_query_spec(
+            self.model,
+            tuple(self.allowed_order_filters),
+            body.get("filter", ""),
+            body.get("order", ""),
+            # Check if model has date_created field and then use it to order by default to keep
+            # consistency data
+            ("-date_created",) if hasattr(self.model, "date_created") else (),
+        )
+        queryset = spec.apply(queryset)
+        ordering_conditions = list(spec.ordering)
+        return queryset, ordering_conditions
+
     def process_request(self, request, body):
         """
         The function processes a request by filtering, ordering, and paginating data based on the
@@ -201,66 +382,328 @@ class PaginatedView(BaseView):
         method (GET, POST, etc.), headers, user authentication, and other metadata
         :param body: The `body` parameter is a dictionary that contains the request body data. It is
         used to retrieve the query parameters for filtering, ordering, pagination, and other options
-        :return: a JSON response containing the filtered and ordered data along with pagination
-        information. The returned JSON has the following structure:
+        :return: a dictionary containing the filtered and ordered data along with pagination
+        information, it's encoded by `BaseView.render`.
         """
-        # Get query parameters for filtering and ordering
-        filter_param = body.get("filter", "")
-        order_param = body.get("order", "")
-        ordering_conditions = []
+        queryset, ordering_conditions = self.filter_queryset(request, body)
 
-        queryset = self.base_query(request)
-
-        # Check if model has deleted field and then use it to filter deleted data
-        if hasattr(self.model, "deleted"):
-            queryset = queryset.filter(deleted=0)
-
-        # Apply filtering if filter_param is provided
-        if filter_param:
-            # Split the filters into individual filter conditions
-            filter_conditions = filter_param.split(",")
-            queryset = query_filter_to_paginated_api_view(
-                self.allowed_order_filters, filter_conditions, queryset
-            )
+        # A client holding the current version of the page gets a 304 before counting or fetching rows,
+        # invalid parameters are still rejected first
+        self.validate_list_params(body, ordering_conditions)
+        self.response_validators = list_validators(queryset, body)
+        if self.response_validators:
+            not_modified = not_modified_response(request, *self.response_validators)
+            if not_modified is not None:
+                return not_modified
 
-        # Apply ordering if order_param is provided
-        if order_param:
-            # Split the ordering into individual ordering conditions
-            ordering_conditions = order_param.split(",")
-        elif hasattr(self.model, "date_created"):
-            # Check if model has date_created field and then use it to order by default to keep consistency data
-            ordering_conditions = ["-date_created"]
-
-        if len(ordering_conditions) > 0:
-            queryset = query_order_to_paginated_api_view(
-                self.allowed_order_filters, ordering_conditions, queryset
-            )
+        # The cursor mode is opt-in, sending the `cursor` parameter (even empty) enables it
+        if "cursor" in body:
+            return self.process_cursor_request(body, queryset, ordering_conditions)
 
         # Pagination
-        page_number = body.get("page", 1)
-        size = body.get("size", 10)
-        paginator = Paginator(queryset, size)
+        size = self.page_size(body)
+        total = count_queryset(
+            queryset, body.get("count", COUNT_EXACT), bool(body.get("filter"))
+        )
         try:
-            page_obj = paginator.page(page_number)
-            data = list(
-                page_obj.object_list.values(
-                    *(self.schema_values if self.schema_values else [])
-                )
-            )
-        except Exception:
-            # Handle invalid page number gracefully
-            data = []
+            page_number = int(body.get("page", 1))
+        except ValueError:
+            page_number = 0
+
+        # Handle invalid page number gracefully
+        data = []
+        if page_number >= 1:
+            offset = (page_number - 1) * size
+            fields = self.list_fields(body)
+            data = list(queryset.values(*fields)[offset : offset + size])
 
         pagination_data = {
-            "total_pages": paginator.num_pages,
+            "total_pages": None if total is None else max(1, math.ceil(total / size)),
             "page": 1,
             "size": 10,
             **body,
         }
-        return JsonResponse({"data": data, **pagination_data})
+        return {"data": data, **pagination_data}
+
+    def list_fields(self, body):
+        """
+        The function returns the fields of every row, the ones sent through the `fields` parameter
+        or all the `schema_values`. Only the relations of the returned fields (and of the filter and
+        order conditions) are joined.
+
+        :param body: The `body` parameter is a dictionary with the query parameters of the request
+        :return: a list of field names, empty to return every concrete field.
+        """
+        return self.requested_fields(body, self.schema_values) or self.schema_values
+
+    def validate_list_params(self, body, ordering_conditions):
+        """
+        The function validates the pagination parameters of a request without running any query.
+
+        :param body: The `body` parameter is a dictionary with the query parameters of the request
+        :param ordering_conditions: The list of ordering conditions sent by the client
+        """
+        self.page_size(body)
+        self.list_fields(body)
+        if body.get("cursor"):
+            field, _ = self.cursor_ordering(ordering_conditions)
+            decode_cursor(self.model, field, body["cursor"])
+        elif body.get("count", COUNT_EXACT) not in COUNT_STRATEGIES:
+            raise BadRequest(
+                "The count parameter must be one of: " + ",".join(COUNT_STRATEGIES)
+            )
+
+    def cursor_ordering(self, ordering_conditions):
+        default_order = "-date_created" if hasattr(self.model, "date_created") else "id"
+        return keyset_ordering(
+            self.allowed_order_filters, ordering_conditions, default_order
+        )
+
+    @staticmethod
+    def page_size(body):
+        """
+        The function reads and validates the page size sent through the query parameters.
+
+        :param body: The `body` parameter is a dictionary with the query parameters of the request
+        :return: an integer with the page size.
+        """
+        try:
+            size = int(body.get("size", 10))
+        except ValueError:
+            raise BadRequest("The size parameter must be an integer")
+        if size < 1:
+            raise BadRequest("The size parameter must be greater than zero")
+        return size
+
+    def process_cursor_request(self, body, queryset, ordering_conditions):
+        """
+        The function paginates the queryset using a keyset (cursor) instead of OFFSET/LIMIT, so it
+        neither counts the rows nor scans the previous pages.
+
+        :param body: The `body` parameter is a dictionary with the query parameters of the request
+        :param queryset: The filtered queryset to paginate
+        :param ordering_conditions: The list of ordering conditions sent by the client
+        :return: a dictionary with the data and the `next_cursor`/`prev_cursor` tokens.
+        """
+        size = self.page_size(body)
+        field, descending = self.cursor_ordering(ordering_conditions)
+        data, next_cursor, prev_cursor = keyset_page(
+            queryset,
+            self.model,
+            field,
+            descending,
+            body.get("cursor"),
+            size,
+            self.list_fields(body),
+        )
+        return {
+            "data": data,
+            "size": 10,
+            **body,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
+
+
+class Echo:
+    """
+    File-like object that returns what is written, used to stream the rows written by csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+# The `BatchView` class is a base view that creates (POST) or updates (PUT) many records of the
+# model in a single request, every item is validated before anything is written.
+class BatchView(BaseView):
+    def proccess_payload_post_put(self, request, **kwargs):
+        """
+        The function decodes the JSON array of records sent on the body of the request.
+
+        :param request: The HTTP request
+        :return: the list of items of the batch.
+        """
+        body_unicode = getattr(request, "body", None).decode("utf-8")
+        items = json.loads(body_unicode) if body_unicode else []
+        self.validate(request, items)
+        return items
+
+    def validate(self, request, payload):
+        """
+        The function validates the request method and the size of the batch, the items themselves are
+        validated by `build_record`.
+
+        :param request: The HTTP request
+        :param payload: The decoded body of the request
+        """
+        if request.method != self.method:
+            raise MethodNotAllowed
+        if not isinstance(payload, list) or not payload:
+            raise BadRequest("The payload must be a non empty array of records")
+        if len(payload) > settings.BATCH_MAX_SIZE:
+            raise BadRequest(
+                f"A batch can't have more than {settings.BATCH_MAX_SIZE} records"
+            )
+
+    def process_request(self, request, items):
+        """
+        The function validates every item of the batch and, when all of them are valid, writes them
+        with a single bulk statement inside one transaction.
+
+        :param request: The HTTP request
+        :param items: The list of items of the batch
+        :return: a dictionary with the written records.
+        """
+        # The records to update are fetched with a single query
+        existing = {}
+        if self.method == "PUT":
+            ids = [item.get("id") for item in items if isinstance(item, dict)]
+            existing = self.model.objects.in_bulk(
+                [pk for pk in ids if isinstance(pk, int)]
+            )
+
+        records, errors, seen = [], [], set()
+        for index, item in enumerate(items):
+            try:
+                records.append(self.build_record(item, existing, seen))
+            except BaseCustomException as e:
+                errors.append({"index": index, **e.to_dict()})
+        if errors:
+            raise BatchValidationError(errors)
+
+        with transaction.atomic():
+            self.write_records(records)
+        if self.method == "PUT":
+            for record in records:
+                invalidate_detail(self.model, record.pk)
+        bump_model_version(self.model)
+        return {"data": [model_to_dict(record) for record in records]}
+
+    def build_record(self, item, existing, seen):
+        """
+        The function validates an item of the batch and builds (or updates) its record in memory.
+
+        :param item: The item of the batch
+        :param existing: A dictionary with the records to update by id
+        :param seen: A set with the ids already updated by the batch
+        :return: the validated record.
+        """
+        if not isinstance(item, dict):
+            raise BadRequest("Every item of the batch must be an object")
+        self.validate_payload(item)
+        if self.method == "PUT":
+            record = existing.get(item["id"])
+            if record is None:
+                raise NotFound
+            if record.pk in seen:
+                raise BadRequest("The record is repeated on the batch")
+            seen.add(record.pk)
+            for key, value in item.items():
+                setattr(record, key, value)
+        else:
+            record = self.model(**item)
+        try:
+            # The primary key is the only unique field, checking it would cost a query per item
+            record.full_clean(validate_unique=False)
+        except ValidationError as e:
+            raise BadRequest(f"Invalid data provided: {str(e)}")
+        return record
+
+    def write_records(self, records):
+        if self.method == "PUT":
+            # bulk_update skips the auto_now fields
+            now = timezone.now()
+            for record in records:
+                record.last_updated = now
+            fields = [field for field in self.required_fields if field != "id"]
+            self.model.objects.bulk_update(records, [*fields, "last_updated"])
+        elif connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(records)
+        else:
+            # The ids of the created records can't be read back from a bulk insert
+            for record in records:
+                record.save()
+
+
+# The `ExportView` class is a base view that streams the whole filtered and ordered result set of
+# a `PaginatedView` as NDJSON or CSV.
+class ExportView(PaginatedView):
+    export_formats = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    export_filename = "export"
+
+    def process_request(self, request, body):
+        """
+        The function streams the rows matching the filter and order parameters, they are read with
+        a server-side cursor in chunks so memory stays constant whatever the size of the export.
+
+        :param request: The `request` parameter is the HTTP request object
+        :param body: The `body` parameter is a dictionary with the query parameters of the request,
+        `format` selects between `ndjson` (default) and `csv`
+        :return: a streaming HTTP response.
+        """
+        export_format = body.get("format", "ndjson")
+        if export_format not in self.export_formats:
+            raise BadRequest(
+                "The format parameter must be one of: " + ",".join(self.export_formats)
+            )
+
+        queryset, _ = self.filter_queryset(request, body)
+        # The rows are read once the view returned, out of the `replica_reads` block of `dispatch`,
+        # so the database is picked now
+        queryset = queryset.using(router.db_for_read(queryset.model))
+        fields = self.list_fields(body)
+        rows = queryset.values(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        content = (
+            self.stream_csv(rows, fields)
+            if export_format == "csv"
+            else self.stream_ndjson(rows)
+        )
+        response = StreamingHttpResponse(
+            content, content_type=self.export_formats[export_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.export_filename}.{export_format}"'
+        )
+        return response
+
+    @staticmethod
+    def stream_ndjson(rows):
+        for row in rows:
+            yield json_dumps(row) + b"\n"
+
+    @staticmethod
+    def stream_csv(rows, header):
+        writer = csv.writer(Echo())
+        if header:
+            yield writer.writerow(header)
+        for row in rows:
+            if not header:
+                header = list(row.keys())
+                yield writer.writerow(header)
+            yield writer.writerow(
+                [
+                    value.isoformat() if hasattr(value, "isoformat") else value
+                    for value in row.values()
+                ]
+            )
 
 
 class ApiStatusView(View):
     def get(self, request: WSGIRequestHandler, **kwargs: Any) -> JsonResponse:
-        data = {"status": "OK"}
+        data = {"status": "OK", "cache": detail_cache_stats.to_dict()}
+        pools = pool_stats()
+        if pools:
+            data["db_pools"] = pools
+        if settings.INGEST_WRITE_BEHIND:
+            data["ingest_buffer"] = get_production_buffer().to_dict()
+        return JsonResponse(data)
+
+
+class ApiMetricsView(View):
+    def get(self, request: WSGIRequestHandler, **kwargs: Any) -> JsonResponse:
+        # Aggregated timings of the requests served by this worker, per view
+        data = {"status": "OK", "views": metrics_registry.to_dict()}
+        if settings.QUERY_INSPECTOR_ENABLED:
+            data["queries"] = inspector_reports.to_dict()
         return JsonResponse(data)
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+
+from sprocket.views import ApiMetricsView, ApiStatusView
+from sprocket.views.factory_views import GetFactory, GetFactoryChart
+from sprocket.views.sprocket_views import (
+    GetSprocket,
+    GetSprocketProduction,
+    GetSprocketProductionAggregate,
+    IngestSprocketProduction,
+    PostSprocket,
+    PostSprocketBatch,
+    PutSprocket,
+    PutSprocketBatch,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor():
+    """
+    The function returns the thread pool running the database work of the async views, its size
+    (`ASYNC_DB_WORKERS`) bounds the amount of queries running at the same time.
+
+    :return: a ThreadPoolExecutor shared by every async view.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix="sprocket-db"
+            )
+    return _executor
+
+
+def call_with_connection(function, *args, **kwargs):
+    # The pool threads keep their own connections, close the broken or expired ones like the
+    # request_started/request_finished signals do for the WSGI workers
+    close_old_connections()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_executor(function, *args, **kwargs):
+    """
+    The function runs a synchronous callable that touches the database in the bounded executor,
+    the event loop keeps serving other requests while it waits.
+
+    :param function: The synchronous callable
+    :return: the value returned by the callable.
+    """
+    loop = asyncio.get_running_loop()
+    # The call runs with a copy of the request context, like sync_to_async does, so the request
+    # metrics see its queries
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_db_executor(),
+        functools.partial(context.run, call_with_connection, function, *args, **kwargs),
+    )
+
+
+# The `AsyncViewMixin` class turns a `BaseView` into a native async view, the whole sync flow of a
+# request (validation, queries, serialization) runs as a single executor call so it keeps one
+# connection and never blocks the event loop.
+class AsyncViewMixin:
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return markcoroutinefunction(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        return await run_in_db_executor(super().dispatch, request, *args, **kwargs)
+
+
+class AsyncGetFactory(AsyncViewMixin, GetFactory):
+    pass
+
+
+class AsyncGetFactoryChart(AsyncViewMixin, GetFactoryChart):
+    pass
+
+
+class AsyncGetSprocket(AsyncViewMixin, GetSprocket):
+    pass
+
+
+class AsyncPostSprocket(AsyncViewMixin, PostSprocket):
+    pass
+
+
+class AsyncPutSprocket(AsyncViewMixin, PutSprocket):
+    pass
+
+
+class AsyncPostSprocketBatch(AsyncViewMixin, PostSprocketBatch):
+    pass
+
+
+class AsyncPutSprocketBatch(AsyncViewMixin, PutSprocketBatch):
+    pass
+
+
+class AsyncGetSprocketProduction(AsyncViewMixin, GetSprocketProduction):
+    pass
+
+
+class AsyncGetSprocketProductionAggregate(
+    AsyncViewMixin, GetSprocketProductionAggregate
+):
+    pass
+
+
+class AsyncIngestSprocketProduction(AsyncViewMixin, IngestSprocketProduction):
+    pass
+
+
+class AsyncApiStatusView(ApiStatusView):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return markcoroutinefunction(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # The status only reads in-process counters, it's answered right on the event loop
+        return super().dispatch(request, *args, **kwargs)
+
+
+class AsyncApiMetricsView(ApiMetricsView):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return markcoroutinefunction(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.forms.models import model_to_dict
+
 from sprocket.models import Factory
+from sprocket.utils.aggregations import parse_aggregation_filters
+from sprocket.utils.columnar import chart_series, production_series, read_series
+from sprocket.utils.embedding import embed_related, parse_includes
+from sprocket.utils.exceptions import NotFound
 from sprocket.views import BaseView
 
 
@@ -6,3 +13,71 @@ class GetFactory(BaseView):
     method = "GET"
     model = Factory
     required_fields = ["id"]
+    optional_fields = ["fields", "include"]
+    cache_detail = True
+
+    def use_detail_cache(self, request, parameters):
+        # The embedded sprockets and production change without writing the factory
+        return super().use_detail_cache(request, parameters) and not parameters.get(
+            "include"
+        )
+
+    def process_request(self, request, body):
+        """
+        The function returns the factory along with the related data requested through the
+        `include` parameter (`sprockets`, `recent_production` and/or `summary`), each relation is
+        loaded with a fixed amount of queries.
+
+        :param request: The `request` parameter is the HTTP request object
+        :param body: The `body` parameter is a dictionary with the parameters of the request
+        :return: a dictionary with the factory and its related data.
+        """
+        includes = parse_includes(body)
+        if not includes:
+            # Plain reads go through the cached detail flow
+            raise NotImplementedError
+        fields = self.requested_fields(body, self.detail_fields())
+
+        record = self.model.objects.filter(id=body.get("id")).first()
+        if record is None:
+            raise NotFound
+        return {
+            "data": model_to_dict(record, fields=fields),
+            "included": embed_related(record, includes),
+        }
+
+
+class GetFactoryChart(BaseView):
+    method = "GET"
+    model = Factory
+    required_fields = ["id"]
+    optional_fields = ["filter"]
+    allowed_filters = [
+        "sprocket_id",
+        "date_produced__gt",
+        "date_produced__gte",
+        "date_produced__lt",
+        "date_produced__lte",
+    ]
+
+    def process_request(self, request, body):
+        """
+        The function returns the production chart of a factory, a series of parallel arrays per
+        sprocket like the seed `chart_data`, read from the columnar chunks when they're kept.
+
+        :param request: The `request` parameter is the HTTP request object
+        :param body: The `body` parameter is a dictionary with the parameters of the request, the
+        `filter` accepts the sprocket and a `date_produced` range
+        :return: a dictionary with the series of the factory.
+        """
+        if not self.model.objects.filter(id=body.get("id")).exists():
+            raise NotFound
+        filters, date_filters = parse_aggregation_filters(
+            self.allowed_filters, body.get("filter", "")
+        )
+        filters["factory_id"] = body.get("id")
+        if settings.COLUMNAR_STORAGE_ENABLED:
+            source, series = "columnar", read_series(filters, date_filters)
+        else:
+            source, series = "production", production_series(filters, date_filters)
+        return {"data": [chart_series(item) for item in series], "source": source}
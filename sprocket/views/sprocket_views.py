@@ -1,5 +1,16 @@
-from sprocket.utils.utils import add_field_to_response
-from sprocket.views import PaginatedView, BaseView
+from django.conf import settings
+from sprocket.utils.aggregations import (
+    aggregate_production,
+    parse_aggregation_filters,
+    parse_aggregation_params,
+)
+from sprocket.utils.columnar import aggregate_chunks
+from sprocket.utils.exceptions import BadRequest, MethodNotAllowed
+from sprocket.utils.ingest import bulk_ingest, parse_events, validate_events
+from sprocket.utils.rollups import aggregate_rollups, rollup_route
+from sprocket.utils.serialization import EnvelopeResponse
+from sprocket.utils.write_behind import get_production_buffer
+from sprocket.views import BatchView, ExportView, PaginatedView, BaseView
 from sprocket.models import Sprocket, SprocketProduction
 
 
@@ -30,7 +41,9 @@ class GetSprocketProduction(PaginatedView):
         "sprocket_actual__gt",
         "date_produced",
         "date_produced__lt",
+        "date_produced__lte",
         "date_produced__gt",
+        "date_produced__gte",
         "date_created",
     ]
     schema_values = [
@@ -48,10 +61,117 @@ class GetSprocketProduction(PaginatedView):
     model = SprocketProduction
 
 
+class ExportSprocketProduction(ExportView):
+    method = "GET"
+    allowed_order_filters = GetSprocketProduction.allowed_order_filters
+    schema_values = GetSprocketProduction.schema_values
+    model = SprocketProduction
+    export_filename = "sprocket_production"
+
+
+class GetSprocketProductionAggregate(BaseView):
+    method = "GET"
+    model = SprocketProduction
+    allowed_filters = [
+        "factory_id",
+        "sprocket_id",
+        "date_produced__gt",
+        "date_produced__gte",
+        "date_produced__lt",
+        "date_produced__lte",
+    ]
+
+    def process_request(self, request, body):
+        """
+        The function aggregates the sprocket production by time bucket, the sums, averages,
+        minimums, maximums and the attainment ratio are computed in the database.
+
+        :param request: The `request` parameter is the HTTP request object
+        :param body: The `body` parameter is a dictionary with the query parameters of the request,
+        `bucket`, `group_by` and `filter` (factory, sprocket and `date_produced` range)
+        :return: a dictionary with one row per bucket and group.
+        """
+        bucket, group_by = parse_aggregation_params(body)
+        filters, date_filters = parse_aggregation_filters(
+            self.allowed_filters, body.get("filter", "")
+        )
+
+        # The coarsest rollup able to answer the request is used instead of the production rows,
+        # then the columnar chunks when they're kept
+        granularity = rollup_route(bucket, date_filters)
+        if granularity:
+            source = f"rollup_{granularity}"
+            data = aggregate_rollups(
+                granularity, filters, date_filters, bucket, group_by
+            )
+        elif settings.COLUMNAR_STORAGE_ENABLED:
+            source = "columnar"
+            data = aggregate_chunks(filters, date_filters, bucket, group_by)
+        else:
+            source = "production"
+            queryset = self.model.objects.filter(
+                deleted=0,
+                **filters,
+                **{
+                    f"date_produced__{lookup}": value
+                    for lookup, value in date_filters.items()
+                },
+            )
+            data = aggregate_production(queryset, bucket, group_by)
+        return {
+            "data": data,
+            "bucket": bucket,
+            "source": source,
+            **body,
+        }
+
+
+class IngestSprocketProduction(BaseView):
+    method = "POST"
+    model = SprocketProduction
+
+    def proccess_payload_post_put(self, request, **kwargs):
+        """
+        The function decodes the batch of production events sent as a JSON array or NDJSON.
+
+        :param request: The HTTP request
+        :return: the list of decoded events.
+        """
+        if request.method != self.method:
+            raise MethodNotAllowed
+        events = parse_events(request.body.decode("utf-8"), request.content_type)
+        if len(events) > settings.INGEST_MAX_EVENTS:
+            raise BadRequest(
+                f"A batch can't have more than {settings.INGEST_MAX_EVENTS} events"
+            )
+        return events
+
+    def process_request(self, request, events):
+        """
+        The function validates a batch of production events and writes the valid ones with the bulk
+        loader, the invalid ones are reported by index.
+
+        :param request: The HTTP request
+        :param events: The list of decoded events
+        :return: a dictionary with the accepted/rejected counts and the errors, or a 202 response
+        when the rows are queued on the write-behind buffer.
+        """
+        rows, errors = validate_events(events)
+        payload = {"accepted": len(rows), "rejected": len(errors), "errors": errors}
+        if settings.INGEST_WRITE_BEHIND:
+            # The rows are written by the background flusher, a full buffer answers a 429
+            get_production_buffer().put(rows)
+            return EnvelopeResponse({**payload, "buffered": True}, status=202)
+        bulk_ingest(rows)
+        return {**payload, "buffered": False}
+
+
 class GetSprocket(BaseView):
     method = "GET"
     model = Sprocket
     required_fields = ["id"]
+    optional_fields = ["fields"]
+    cache_detail = True
 
 
 class PostSprocket(BaseView):
@@ -64,3 +184,15 @@ class PutSprocket(BaseView):
     method = "PUT"
     model = Sprocket
     required_fields = ["id", "teeth", "pitch_diameter", "outside_diameter", "pitch"]
+
+
+class PostSprocketBatch(BatchView):
+    method = "POST"
+    model = Sprocket
+    required_fields = ["teeth", "pitch_diameter", "outside_diameter", "pitch"]
+
+
+class PutSprocketBatch(BatchView):
+    method = "PUT"
+    model = Sprocket
+    required_fields = ["id", "teeth", "pitch_diameter", "outside_diameter", "pitch"]